@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import XmprData, XmprDownloadLog
+from processor.utils.result_cache import analysis_cache
+from .models import AccumulationProduct, ArchiveBundle, XmprData, XmprDownloadLog, XmprStats
 
 
 class XmprDownloadLogInline(admin.TabularInline):
@@ -68,6 +69,49 @@ class XmprDataAdmin(admin.ModelAdmin):
     preview_png.short_description = "PNG Preview"
 
 
+@admin.register(XmprStats)
+class XmprStatsAdmin(admin.ModelAdmin):
+    list_display = ('xmpr_data', 'max', 'mean', 'std', 'nonzero_percent', 'computed_at')
+    list_filter = ('computed_at',)
+    search_fields = ('xmpr_data__csv',)
+    ordering = ('-xmpr_data__time',)
+    list_select_related = ('xmpr_data',)
+    readonly_fields = [f.name for f in XmprStats._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        # hit/miss counters of the analysis result cache, shown above the list
+        extra_context = {**(extra_context or {}), 'result_cache': analysis_cache.stats()}
+        return super().changelist_view(request, extra_context=extra_context)
+
+
+@admin.register(AccumulationProduct)
+class AccumulationProductAdmin(admin.ModelAdmin):
+    list_display = ('time', 'hours', 'scans', 'max', 'download_tiff', 'preview_png')
+    list_filter = ('hours', 'time')
+    ordering = ('-time', 'hours')
+    readonly_fields = [f.name for f in AccumulationProduct._meta.fields] + ['download_tiff', 'preview_png']
+
+    def has_add_permission(self, request):
+        return False
+
+    download_tiff = XmprDataAdmin.download_tiff
+    preview_png = XmprDataAdmin.preview_png
+
+
+@admin.register(ArchiveBundle)
+class ArchiveBundleAdmin(admin.ModelAdmin):
+    list_display = ('start', 'kind', 'period', 'files', 'size_display', 'updated_at')
+    list_filter = ('kind', 'period', 'start')
+    ordering = ('-start', 'kind', 'period')
+    readonly_fields = [f.name for f in ArchiveBundle._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(XmprDownloadLog)
 class XmprDownloadLogAdmin(admin.ModelAdmin):
     list_display = (
@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-18 06:34
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_paths(apps, schema_editor):
+    """
+    Keeps the oldest row per csv/png/tiff path; download logs of the removed
+    duplicates are moved to the kept row. Blank paths are not duplicates.
+    """
+    XmprData = apps.get_model('datasets', 'XmprData')
+    XmprDownloadLog = apps.get_model('datasets', 'XmprDownloadLog')
+
+    for field in ('csv', 'png', 'tiff'):
+        duplicates = (
+            XmprData.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+            .values(field).annotate(keep=Min('id'), n=Count('id')).filter(n__gt=1)
+        )
+        for row in duplicates:
+            extra = XmprData.objects.filter(**{field: row[field]}).exclude(id=row['keep'])
+            XmprDownloadLog.objects.filter(xmpr_data__in=extra).update(xmpr_data_id=row['keep'])
+            extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0005_alter_xmprdata_csv_alter_xmprdata_png_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_paths, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='xmprdata',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('csv', ''), _negated=True), fields=('csv',), name='datasets_xmprdata_unique_csv',
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='xmprdata',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('png', ''), _negated=True), fields=('png',), name='datasets_xmprdata_unique_png',
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='xmprdata',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('tiff', ''), _negated=True), fields=('tiff',), name='datasets_xmprdata_unique_tiff',
+            ),
+        ),
+    ]
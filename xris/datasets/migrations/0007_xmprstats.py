@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-18 06:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0006_unique_paths'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XmprStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('cols', models.PositiveIntegerField(default=0)),
+                ('min', models.FloatField(default=0)),
+                ('max', models.FloatField(db_index=True, default=0)),
+                ('mean', models.FloatField(db_index=True, default=0)),
+                ('std', models.FloatField(default=0)),
+                ('nonzero_count', models.PositiveIntegerField(default=0)),
+                ('nonzero_percent', models.FloatField(db_index=True, default=0)),
+                ('rain_distribution', models.JSONField(default=dict)),
+                ('row_means', models.JSONField(default=list)),
+                ('preview', models.JSONField(default=list)),
+                ('metadata', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('xmpr_data', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='datasets.xmprdata')),
+            ],
+            options={
+                'verbose_name_plural': 'Xmpr stats',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0007_xmprstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccumulationProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('time', models.DateTimeField(db_index=True)),
+                ('hours', models.PositiveSmallIntegerField(db_index=True)),
+                ('png', models.CharField(blank=True, max_length=512, null=True)),
+                ('tiff', models.CharField(blank=True, max_length=512, null=True)),
+                ('png_size', models.BigIntegerField(default=0)),
+                ('tiff_size', models.BigIntegerField(default=0)),
+                ('scans', models.PositiveIntegerField(default=0)),
+                ('max', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-time', 'hours'],
+                'constraints': [models.UniqueConstraint(fields=('time', 'hours'), name='datasets_accumulationproduct_unique_window')],
+            },
+        ),
+    ]
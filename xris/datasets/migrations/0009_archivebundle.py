@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0008_accumulationproduct'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveBundle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('xmpr', 'XMPR data'), ('rainmap', 'RainMap images')], max_length=10)),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('start', models.DateField(db_index=True)),
+                ('path', models.CharField(max_length=512)),
+                ('size', models.BigIntegerField(default=0)),
+                ('files', models.PositiveIntegerField(default=0)),
+                ('signature', models.CharField(max_length=40)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-start', 'kind', 'period'],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'period', 'start'), name='datasets_archivebundle_unique_period')],
+            },
+        ),
+    ]
@@ -1,6 +1,12 @@
+import os
+import numpy as np
+from datetime import timedelta
 from django.db import models
 from django.conf import settings
 from django.template.defaultfilters import filesizeformat
+from django.urls import reverse
+from processor.utils.result_cache import analysis_cache
+from processor.utils.stats import downsample_matrix, matrix_statistics, read_xmpr_csv
 
 class XmprData(models.Model):
     time = models.DateTimeField()
@@ -19,6 +25,12 @@ class XmprData(models.Model):
 
     class Meta:
         ordering = ['-time']
+        constraints = [
+            # blank paths (the fields are blank=True) may repeat
+            models.UniqueConstraint(fields=['csv'], condition=~models.Q(csv=''), name='datasets_xmprdata_unique_csv'),
+            models.UniqueConstraint(fields=['png'], condition=~models.Q(png=''), name='datasets_xmprdata_unique_png'),
+            models.UniqueConstraint(fields=['tiff'], condition=~models.Q(tiff=''), name='datasets_xmprdata_unique_tiff'),
+        ]
 
     def __str__(self):
         return f"XmprData {self.time:%Y-%m-%d %H:%M:%S}"
@@ -49,6 +61,219 @@ class XmprData(models.Model):
         return filesizeformat(self.total_file_size)
 
 
+class XmprStats(models.Model):
+    """
+    Per-scan statistics of the CSV matrix, computed once at ingest time
+    (processor.tasks.compute_xmpr_stats) so the explorer can read them from the DB.
+    """
+    xmpr_data = models.OneToOneField(XmprData, on_delete=models.CASCADE, related_name='stats')
+
+    rows = models.PositiveIntegerField(default=0)
+    cols = models.PositiveIntegerField(default=0)
+    min = models.FloatField(default=0)
+    max = models.FloatField(default=0, db_index=True)
+    mean = models.FloatField(default=0, db_index=True)
+    std = models.FloatField(default=0)
+    nonzero_count = models.PositiveIntegerField(default=0)
+    nonzero_percent = models.FloatField(default=0, db_index=True)
+
+    rain_distribution = models.JSONField(default=dict)   # % of cells per rainfall class
+    row_means = models.JSONField(default=list)
+    preview = models.JSONField(default=list)             # top-left 20x50 block of the matrix
+    metadata = models.JSONField(default=dict)            # datetime / lat / lon / alt from the CSV header
+
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Xmpr stats'
+
+    def __str__(self):
+        return f"Stats {self.xmpr_data}"
+
+    @classmethod
+    def compute(cls, xmpr_data):
+        """
+        Reads the scan CSV and stores (or refreshes) its statistics.
+        """
+        metadata, arr = read_xmpr_csv(os.path.join(settings.MEDIA_ROOT, xmpr_data.csv))
+        values = matrix_statistics(arr)
+        rows, cols = values.pop("shape")
+        stats, _ = cls.objects.update_or_create(
+            xmpr_data=xmpr_data,
+            defaults={**values, "rows": rows, "cols": cols, "metadata": metadata},
+        )
+        return stats
+
+    @classmethod
+    def analyze(cls, xmpr_data, payload='preview', max_size=100):
+        """
+        One analyze result for a scan, computing (and keeping) its stats on a miss.
+        """
+        try:
+            stats = xmpr_data.stats
+        except cls.DoesNotExist:
+            # not backfilled yet: compute once and keep it
+            try:
+                stats = cls.compute(xmpr_data)
+            except Exception as e:
+                return {"file": xmpr_data.csv, "error": str(e)}
+        return stats.as_analysis(payload, max_size)
+
+    def as_analysis(self, payload='preview', max_size=100):
+        """
+        The stats in the shape returned by the analyze endpoint. `payload` picks
+        the matrix: the stored preview, a block-averaged copy no larger than
+        `max_size` ("downsampled") or none ("stats"). `matrix_url` serves the
+        full matrix as a quantized binary array.
+        """
+        result = {
+            **self.metadata,
+            "file": self.xmpr_data.csv,
+            "shape": [self.rows, self.cols],
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "std": self.std,
+            "nonzero_count": self.nonzero_count,
+            "nonzero_percent": self.nonzero_percent,
+            "rain_distribution": self.rain_distribution,
+            "matrix": self.preview,
+            "row_means": self.row_means,
+            "matrix_url": reverse('datasets:xmpr_matrix', args=[self.xmpr_data_id]),
+        }
+
+        if payload == 'stats':
+            result.pop("matrix")
+            result.pop("row_means")
+        elif payload == 'downsampled':
+            full_path = os.path.join(settings.MEDIA_ROOT, self.xmpr_data.csv)
+            try:
+                matrix = analysis_cache.get_or_compute(
+                    full_path, f"downsampled:{max_size}",
+                    lambda: np.round(downsample_matrix(read_xmpr_csv(full_path)[1], max_size), 2),
+                )
+                result["matrix"] = matrix
+                result["matrix_shape"] = list(matrix.shape)
+            except Exception as e:
+                result["error"] = str(e)
+        return result
+
+
+class AccumulationProduct(models.Model):
+    """
+    Rolling rainfall accumulation (mm) over the `hours` ending at `time`,
+    written by processor.tasks.update_accumulations as GeoTIFF + PNG.
+    """
+    time = models.DateTimeField(db_index=True)
+    hours = models.PositiveSmallIntegerField(db_index=True)
+
+    png = models.CharField(max_length=512, blank=True, null=True)
+    tiff = models.CharField(max_length=512, blank=True, null=True)
+    png_size = models.BigIntegerField(default=0)
+    tiff_size = models.BigIntegerField(default=0)
+
+    scans = models.PositiveIntegerField(default=0)   # scans summed into the window
+    max = models.FloatField(default=0)               # highest accumulation (mm)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-time', 'hours']
+        constraints = [
+            models.UniqueConstraint(fields=['time', 'hours'], name='datasets_accumulationproduct_unique_window'),
+        ]
+
+    def __str__(self):
+        return f"{self.hours}h accumulation {self.time:%Y-%m-%d %H:%M:%S}"
+
+    @property
+    def png_url(self):
+        return f"{settings.MEDIA_URL}{self.png}" if self.png else ''
+
+    @property
+    def tiff_url(self):
+        return f"{settings.MEDIA_URL}{self.tiff}" if self.tiff else ''
+
+
+class ArchiveBundle(models.Model):
+    """
+    Prebuilt ZIP of every XmprData or RainMapImage file of a day or month,
+    written by processor.tasks.build_archive_bundles under BUNDLE_DIR and
+    served by the front proxy. `signature` hashes the period's catalog rows;
+    the bundle is rebuilt (under a new, immutable name) only when it changes.
+    """
+    KIND_XMPR = 'xmpr'
+    KIND_RAINMAP = 'rainmap'
+    KIND_CHOICES = [(KIND_XMPR, 'XMPR data'), (KIND_RAINMAP, 'RainMap images')]
+
+    PERIOD_DAY = 'day'
+    PERIOD_MONTH = 'month'
+    PERIOD_CHOICES = [(PERIOD_DAY, 'Day'), (PERIOD_MONTH, 'Month')]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    start = models.DateField(db_index=True)          # the day, or the 1st of the month
+
+    path = models.CharField(max_length=512)          # relative to BUNDLE_DIR
+    size = models.BigIntegerField(default=0)
+    files = models.PositiveIntegerField(default=0)
+    signature = models.CharField(max_length=40)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-start', 'kind', 'period']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'period', 'start'], name='datasets_archivebundle_unique_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.label}"
+
+    @property
+    def end(self):
+        """
+        First day after the period.
+        """
+        if self.period == self.PERIOD_MONTH:
+            return (self.start + timedelta(days=32)).replace(day=1)
+        return self.start + timedelta(days=1)
+
+    @property
+    def label(self):
+        return f"{self.start:%Y-%m}" if self.period == self.PERIOD_MONTH else f"{self.start:%Y-%m-%d}"
+
+    @property
+    def filename(self):
+        return os.path.basename(self.path)
+
+    @property
+    def size_display(self):
+        return filesizeformat(self.size)
+
+    def get_absolute_url(self):
+        return reverse('datasets:download_bundle', args=[self.pk])
+
+    @classmethod
+    def groups(cls, kind, year=None, month=None, days=14, months=12):
+        """
+        [(title, bundles)] for the download pages: the latest months and days,
+        narrowed to the page's year / month filters; empty groups are left out.
+        """
+        qs = cls.objects.filter(kind=kind)
+        if year:
+            qs = qs.filter(start__year=year)
+        if month:
+            qs = qs.filter(start__month=month)
+        groups = [
+            ('Months', list(qs.filter(period=cls.PERIOD_MONTH)[:months])),
+            ('Days', list(qs.filter(period=cls.PERIOD_DAY)[:days])),
+        ]
+        return [(title, bundles) for title, bundles in groups if bundles]
+
+
 class XmprDownloadLog(models.Model):
     xmpr_data = models.ForeignKey(XmprData, on_delete=models.CASCADE, related_name='download_logs')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
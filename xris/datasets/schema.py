@@ -1,6 +1,8 @@
 import graphene
+from urllib.parse import unquote
+from django.urls import reverse
 from graphene_django.types import DjangoObjectType
-from datasets.models import XmprData
+from datasets.models import AccumulationProduct, XmprData
 import datetime
 
 class XmprDataType(DjangoObjectType):
@@ -12,6 +14,7 @@ class XmprDataType(DjangoObjectType):
     tiff_size = graphene.Int()
     total_file_size = graphene.Int()
     total_file_size_display = graphene.String()
+    tile_url = graphene.String(description="XYZ template of the radar tiles: .../{z}/{x}/{y}.png")
 
     class Meta:
         model = XmprData
@@ -29,6 +32,12 @@ class XmprDataType(DjangoObjectType):
     def resolve_tiff(self, info):
         return self.tiff_url
 
+    def resolve_tile_url(self, info):
+        if not self.tiff:
+            return None
+        # reverse() percent-encodes the braces of the placeholders
+        return unquote(reverse('radar_tile', args=[self.id, '{z}', '{x}', '{y}']))
+
     def resolve_total_file_size(self, info):
         return self.total_file_size
 
@@ -41,6 +50,28 @@ class XmprDataPageType(graphene.ObjectType):
     items = graphene.List(XmprDataType)
 
 
+class AccumulationProductType(DjangoObjectType):
+    png = graphene.String()
+    tiff = graphene.String()
+    png_size = graphene.Int()
+    tiff_size = graphene.Int()
+
+    class Meta:
+        model = AccumulationProduct
+        fields = ("id", "time", "hours", "scans", "max", "created_at", "updated_at")
+
+    def resolve_png(self, info):
+        return self.png_url
+
+    def resolve_tiff(self, info):
+        return self.tiff_url
+
+
+class AccumulationProductPageType(graphene.ObjectType):
+    total_count = graphene.Int()
+    items = graphene.List(AccumulationProductType)
+
+
 class Query(graphene.ObjectType):
     latest_xmpr_data = graphene.Field(
         XmprDataPageType,
@@ -64,5 +95,30 @@ class Query(graphene.ObjectType):
         items = queryset.order_by('-time')[offset:offset + page_size]
         return XmprDataPageType(total_count=total, items=items)
 
+    latest_accumulations = graphene.Field(
+        AccumulationProductPageType,
+        hours=graphene.Int(required=False),  # 1, 3 or 24 (settings.ACCUMULATION_HOURS); all when omitted
+        page=graphene.Int(required=False, default_value=1),
+        page_size=graphene.Int(required=False, default_value=10),
+        date=graphene.String(required=False)  # Format: "YYYY-MM-DD"
+    )
+
+    def resolve_latest_accumulations(self, info, page, page_size, hours=None, date=None):
+        offset = (page - 1) * page_size
+        queryset = AccumulationProduct.objects.exclude(png__isnull=True).exclude(png__exact='')
+
+        if hours:
+            queryset = queryset.filter(hours=hours)
+        if date:
+            try:
+                target_date = datetime.datetime.strptime(date, "%Y-%m-%d").date()
+                queryset = queryset.filter(time__date=target_date)
+            except ValueError:
+                raise ValueError("Invalid date format. Expected 'YYYY-MM-DD'.")
+
+        total = queryset.count()
+        items = queryset.order_by('-time', 'hours')[offset:offset + page_size]
+        return AccumulationProductPageType(total_count=total, items=items)
+
 
 schema = graphene.Schema(query=Query)
@@ -1,3 +1,152 @@
-from django.test import TestCase
+import os
+import json
+import tempfile
+from datetime import datetime
+from unittest import mock
+from allauth.account.models import EmailAddress
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import make_aware
+from main.models import User
+from datasets.models import XmprData, XmprStats
+from processor.tasks import analyze_xmpr_entry
+from xris.celery import app as celery_app
 
-# Create your tests here.
+
+class UniquePathsMigrationTests(TransactionTestCase):
+    migrate_from = ("datasets", "0005_alter_xmprdata_csv_alter_xmprdata_png_and_more")
+    migrate_to = ("datasets", "0006_unique_paths")
+
+    def test_duplicates_removed_and_logs_kept(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.migrate_from])
+        apps = executor.loader.project_state([self.migrate_from]).apps
+        XmprData = apps.get_model("datasets", "XmprData")
+        XmprDownloadLog = apps.get_model("datasets", "XmprDownloadLog")
+
+        when = make_aware(datetime(2024, 12, 22, 10, 0))
+        kept, extra = (XmprData.objects.create(time=when, csv="c/a.csv", png="", tiff=None) for _ in range(2))
+        XmprDownloadLog.objects.create(xmpr_data=extra)
+        other = XmprData.objects.create(time=when, csv="c/b.csv", png="", tiff=None)  # blank png repeats
+
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.migrate_to])
+        apps = executor.loader.project_state([self.migrate_to]).apps
+        XmprData = apps.get_model("datasets", "XmprData")
+        self.assertEqual(sorted(XmprData.objects.values_list("id", flat=True)), [kept.id, other.id])
+        self.assertEqual(apps.get_model("datasets", "XmprDownloadLog").objects.get().xmpr_data_id, kept.id)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+def write_xmpr_csv(path, value):
+    """
+    Writes a small scan CSV: the 10 header lines, then a 3x4 matrix of `value`.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fh:
+        fh.write("20241222_100000_PPI,rain\n2.155930\n102.732700\n4\n4\n200.0\n0.0\n")
+        fh.write("0,90,180,270\n1.5,1.5,1.5,1.5\n" + "\n".join(",".join([str(value)] * 4) for _ in range(4)) + "\n")
+
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'analysis': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'analysis'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, XMPR_ANALYZE_INLINE_MAX=1)
+class AnalyzeXmprTests(TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", celery_app.conf.task_always_eager)
+        celery_app.conf.task_always_eager = True
+        cache.clear()
+        patchers = [
+            # the job endpoint reads the results back from the result backend
+            mock.patch.object(analyze_xmpr_entry, "store_eager_result", True),
+            # logins and unauthorized requests log the client's location and reverse DNS: keep them offline
+            mock.patch("main.middleware.get_ip_location", return_value={}),
+            mock.patch("main.middleware.get_reverse_dns", return_value=""),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=self.media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+        self.user = self.login("owner@example.com")
+        self.entries = []
+        for i in range(3):
+            csv = f"converted/2024/12/22/{i}.csv"
+            write_xmpr_csv(os.path.join(self.media.name, csv), i + 1)
+            self.entries.append(XmprData.objects.create(time=make_aware(datetime(2024, 12, 22, 10, i)), csv=csv))
+
+    def login(self, email):
+        user = User.objects.create_user(email, "secret")
+        EmailAddress.objects.create(user=user, email=email, verified=True, primary=True)
+        self.client.force_login(user)
+        return user
+
+    def analyze(self, entries, **data):
+        body = json.dumps({"ids": [entry.id for entry in entries], **data})
+        return self.client.post(reverse("datasets:analyze_xmpr_data"), body, content_type="application/json")
+
+    def poll(self, job_id, have=""):
+        return self.client.get(reverse("datasets:analyze_xmpr_job", args=[job_id]), {"have": have} if have else {})
+
+    def test_small_selection_is_analyzed_inline(self):
+        response = self.analyze(self.entries[:1])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["max"] for row in response.json()["data"]], [1.0])
+
+    def test_large_selection_runs_as_a_job(self):
+        response = self.analyze(self.entries)
+        self.assertEqual(response.status_code, 202)
+        started = response.json()
+        self.assertEqual(started["total"], 3)
+        self.assertEqual(started["summary"]["total_files"], 3)
+        self.assertEqual(started["status_url"], reverse("datasets:analyze_xmpr_job", args=[started["job_id"]]))
+
+        status = self.poll(started["job_id"]).json()
+        self.assertEqual((status["total"], status["completed"], status["done"]), (3, 3, True))
+        self.assertEqual([(row["index"], row["max"]) for row in status["data"]], [(0, 1.0), (1, 2.0), (2, 3.0)])
+
+        # ?have= leaves out what the caller already received
+        status = self.poll(started["job_id"], have="0,2,x").json()
+        self.assertEqual([row["index"] for row in status["data"]], [1])
+        self.assertEqual(status["completed"], 3)
+
+    def test_stored_stats_do_not_count_towards_the_cut_over(self):
+        for entry in self.entries[1:]:
+            XmprStats.compute(entry)
+        self.assertEqual(self.analyze(self.entries).status_code, 200)
+        # the downsampled payload always reads the CSVs
+        self.assertEqual(self.analyze(self.entries, payload="downsampled").status_code, 202)
+
+    def test_failed_child_reports_its_error(self):
+        analyze = XmprStats.analyze
+
+        def fail_second(entry, *args):
+            if entry.id == self.entries[1].id:
+                raise RuntimeError("scan unreadable")
+            return analyze(entry, *args)
+
+        with mock.patch.object(XmprStats, "analyze", side_effect=fail_second):
+            job_id = self.analyze(self.entries).json()["job_id"]
+        data = self.poll(job_id).json()["data"]
+        self.assertEqual(data[1], {"error": "scan unreadable", "index": 1})
+        self.assertEqual(data[2]["max"], 3.0)
+
+    def test_job_is_only_visible_to_its_owner(self):
+        job_id = self.analyze(self.entries).json()["job_id"]
+        self.login("other@example.com")
+        # SecurityMiddleware turns the 404 into a redirect home
+        self.assertRedirects(self.poll(job_id), reverse("main:home"), fetch_redirect_response=False)
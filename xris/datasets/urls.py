@@ -1,10 +1,18 @@
 from django.urls import path
-from datasets.views import analyze_xmpr_data, download_xmpr_data, xmpr_data
+from datasets.views import (
+    analyze_xmpr_data, analyze_xmpr_job, download_bundle, download_xmpr_data, point_timeseries, xmpr_data,
+    xmpr_matrix, zonal_stats,
+)
 
 app_name = 'datasets'
 
 urlpatterns = [
     path('xmpr/', xmpr_data, name='xmpr_data'),
     path('xmpr/download/', download_xmpr_data, name='download_xmpr_data'),
+    path('bundles/<int:pk>/', download_bundle, name='download_bundle'),
     path('analyze-xmpr/', analyze_xmpr_data, name='analyze_xmpr_data'),
+    path('analyze-xmpr/<int:pk>/matrix/', xmpr_matrix, name='xmpr_matrix'),
+    path('analyze-xmpr/jobs/<str:job_id>/', analyze_xmpr_job, name='analyze_xmpr_job'),
+    path('timeseries/', point_timeseries, name='point_timeseries'),
+    path('zonal-stats/', zonal_stats, name='zonal_stats'),
 ]
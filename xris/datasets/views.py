@@ -1,26 +1,42 @@
 import os
+import csv
+import base64
 import calendar
 import json
 import numpy as np
-from datetime import datetime
+import orjson
+from datetime import datetime, timedelta
 from django.conf import settings
-from django.http import JsonResponse, StreamingHttpResponse
-from django.shortcuts import render, redirect
-from django.utils.timezone import localtime
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import get_current_timezone, is_naive, localtime, make_aware, now
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import F, Q
 from django.contrib.auth.decorators import login_required
 from allauth.account.decorators import verified_email_required
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
 from django.contrib import messages
 from django.utils.http import urlencode
 from subscriptions.models import Subscription, SubscriptionPackage
 from main.models import ProjectConfig
-from .models import XmprData, XmprDownloadLog
-import zipstream
-from dateutil import parser
-import re
+from .models import ArchiveBundle, XmprData, XmprDownloadLog, XmprStats
+from processor.models import RainMapDownloadLog, RainMapImage
+from processor.tasks import analyze_xmpr_entry
+from processor.utils.coordinates import CoordinateSystem
+from processor.utils.datacube import site_cube
+from processor.utils.result_cache import analysis_cache, crc_cache
+from processor.utils.scan_csv import is_float
+from processor.utils.zonal import geojson_zones, zonal_series
+from processor.utils.stats import (
+    QUANTIZED_DTYPES, RAINFALL_CLASSES, downsample_matrix, quantize_matrix, read_xmpr_csv,
+)
+from processor.utils.zip_archive import ZipArchive, archive_response
 from django.core.cache import cache
+from celery import group
+from celery.result import GroupResult
 
 
 def get_client_ip(request):
@@ -28,6 +44,27 @@ def get_client_ip(request):
     return xff.split(',')[0] if xff else request.META.get('REMOTE_ADDR')
 
 
+# ?sort= value → ORDER BY expression (scans without stats sort last)
+XMPR_SORT_FIELDS = {
+    '-time': F('time').desc(),
+    'time': F('time').asc(),
+    '-max': F('stats__max').desc(nulls_last=True),
+    'max': F('stats__max').asc(nulls_last=True),
+    '-mean': F('stats__mean').desc(nulls_last=True),
+    'mean': F('stats__mean').asc(nulls_last=True),
+    '-nonzero_percent': F('stats__nonzero_percent').desc(nulls_last=True),
+    'nonzero_percent': F('stats__nonzero_percent').asc(nulls_last=True),
+}
+XMPR_SORT_CHOICES = [
+    ('-time', 'Newest first'),
+    ('time', 'Oldest first'),
+    ('-max', 'Max rainfall ↓'),
+    ('-mean', 'Mean rainfall ↓'),
+    ('-nonzero_percent', 'Rain coverage ↓'),
+    ('nonzero_percent', 'Rain coverage ↑'),
+]
+
+
 @login_required
 @verified_email_required
 def xmpr_data(request):
@@ -39,12 +76,17 @@ def xmpr_data(request):
     month = request.GET.get('month')
     limit = int(request.GET.get('limit', 10))
     page_num = request.GET.get('page')
+    sort = request.GET.get('sort', '-time')
+    if sort not in XMPR_SORT_FIELDS:
+        sort = '-time'
+    min_max = request.GET.get('min_max')
+    min_rain = request.GET.get('min_rain')
 
     qs = XmprData.objects.filter(
         Q(csv__isnull=False, csv_size__gt=0) |
         Q(png__isnull=False, png_size__gt=0) |
         Q(tiff__isnull=False, tiff_size__gt=0)
-    )
+    ).select_related('stats')
 
     if search:
         qs = qs.filter(Q(csv__icontains=search) | Q(png__icontains=search) | Q(tiff__icontains=search))
@@ -56,8 +98,12 @@ def xmpr_data(request):
         qs = qs.filter(time__year=year)
     if month:
         qs = qs.filter(time__month=month)
+    if is_float(min_max or ''):
+        qs = qs.filter(stats__max__gte=float(min_max))
+    if is_float(min_rain or ''):
+        qs = qs.filter(stats__nonzero_percent__gte=float(min_rain))
 
-    paginator = Paginator(qs.order_by('-time'), limit)
+    paginator = Paginator(qs.order_by(XMPR_SORT_FIELDS[sort], '-time'), limit)
     page_obj = paginator.get_page(page_num)
 
     year_list = [d.year for d in XmprData.objects.dates('time', 'year', order='DESC')]
@@ -76,8 +122,13 @@ def xmpr_data(request):
         'page_sizes': [10, 25, 50, 100],
         'year_list': year_list,
         'month_choices': month_choices,
+        'sort': sort,
+        'sort_choices': XMPR_SORT_CHOICES,
+        'min_max': min_max,
+        'min_rain': min_rain,
         'max_file_count': getattr(settings, 'XMPR_MAX_FILE_COUNT', 100),
         'max_total_size': getattr(settings, 'XMPR_MAX_TOTAL_SIZE_MB', 500),
+        'bundle_groups': ArchiveBundle.groups(ArchiveBundle.KIND_XMPR, year, month),
         'query_string': urlencode({k: v for k, v in {
             'search': search,
             'date_from': date_from,
@@ -85,6 +136,9 @@ def xmpr_data(request):
             'year': year,
             'month': month,
             'limit': limit,
+            'sort': sort if sort != '-time' else None,
+            'min_max': min_max,
+            'min_rain': min_rain,
         }.items() if v}),
         'active_subscription': active_subscription,
         'PACKAGE_FREE': SubscriptionPackage.PACKAGE_FREE,
@@ -132,132 +186,117 @@ def download_xmpr_data(request):
         messages.error(request, f"Total selected file size exceeds {max_total_size_bytes // (1024 * 1024)} MB.")
         return redirect('datasets:xmpr_data')
 
-    # --- Streamed ZIP generator ---
-    def zip_generator():
-        z = zipstream.ZipFile(mode='w', compression=zipstream.ZIP_DEFLATED)
+    # --- ZIP layout: deterministic (time order, scan timestamps), so ranges of it can be resumed ---
+    archive = ZipArchive(deflate_level=settings.DOWNLOAD_ZIP_DEFLATE_LEVEL, crc_cache=crc_cache)
+    written = []
+    for entry in qs.order_by('time', 'id').iterator(chunk_size=50):
+        time_local = localtime(entry.time)
+        has_written = False
 
-        for entry in qs.iterator(chunk_size=50):
-            time_local = localtime(entry.time)
-            has_written = False
+        for ext, rel_path in [('csv', entry.csv), ('png', entry.png), ('tiff', entry.tiff)]:
+            if not rel_path:
+                continue
 
-            for ext, rel_path in [('csv', entry.csv), ('png', entry.png), ('tiff', entry.tiff)]:
-                if not rel_path:
-                    continue
-
-                full_path = os.path.join(settings.MEDIA_ROOT, rel_path)
-                if not os.path.exists(full_path):
-                    continue  # optionally log missing files
-
-                arcname = f"{time_local:%Y/%m/%d}/{ext}/{os.path.basename(rel_path)}"
-                z.write(full_path, arcname)
+            full_path = os.path.join(settings.MEDIA_ROOT, rel_path)
+            arcname = f"{time_local:%Y/%m/%d}/{ext}/{os.path.basename(rel_path)}"
+            if archive.add(full_path, arcname, time_local):
                 has_written = True
 
-            if has_written:
-                log_key = f"xmpr_log_{user.id}_{entry.id}"
-                if not cache.get(log_key):
-                    XmprDownloadLog.objects.create(
-                        xmpr_data=entry,
-                        user=user,
-                        ip_address=get_client_ip(request)
-                    )
-                    cache.set(log_key, True, timeout=5)  # prevent duplicate logs for 5 seconds
-
-        yield from z
+        if has_written:
+            written.append(entry)
+
+    # --- Download logs (once per download, not per resumed range) ---
+    def log_downloads():
+        for entry in written:
+            log_key = f"xmpr_log_{user.id}_{entry.id}"
+            if not cache.get(log_key):
+                XmprDownloadLog.objects.create(
+                    xmpr_data=entry,
+                    user=user,
+                    ip_address=get_client_ip(request)
+                )
+                cache.set(log_key, True, timeout=5)  # prevent duplicate logs for 5 seconds
 
     # --- Response preparation ---
     zip_filename = f"xmpr_{datetime.now():%Y%m%d_%H%M%S}.zip"
-    response = StreamingHttpResponse(zip_generator(), content_type='application/zip')
-    response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
+    return archive_response(request, archive, zip_filename, on_start=log_downloads)
 
-    return response
 
-RAINFALL_THRESHOLDS = [
-    (80, "Extreme"),
-    (50, "Heavy"),
-    (30, "Very High"),
-    (20, "Moderate"),
-    (10, "Mild"),
-    (5,  "Light"),
-    (1,  "Very Light"),
-    (0,  "None"),
-]
+@login_required
+def download_bundle(request, pk):
+    """
+    A prebuilt day / month bundle. With BUNDLE_ACCEL_REDIRECT set the proxy
+    sends the file itself (sendfile, Range support); Django only checks the
+    subscription and logs the download.
+    """
+    user = request.user
+    bundle = get_object_or_404(ArchiveBundle, pk=pk)
+    redirect_to = 'datasets:xmpr_data' if bundle.kind == ArchiveBundle.KIND_XMPR else 'processor:rainmap_data'
 
-def is_float(value):
-    try:
-        float(value)
-        return True
-    except ValueError:
-        return False
-    
-def read_and_analyze_csv(path):
-    try:
-        full_path = os.path.join(settings.MEDIA_ROOT, path)
-        with open(full_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-        metadata = {}
-        try:
-            raw_line = lines[0].strip().split(',')[0]
-            parsed_dt = parser.parse(raw_line, dayfirst=False, fuzzy=True)
-            metadata["datetime"] = parsed_dt.strftime("%Y-%m-%d %H:%M:%S")
-        except Exception:
-            metadata["datetime"] = "Unknown"
-
-        for line in lines[1:10]:
-            parts = [x.strip() for x in re.split(r"[,\t]", line) if x.strip()]
-            if len(parts) == 1 and is_float(parts[0]):
-                val = float(parts[0])
-                for key in ["lat", "lon", "alt"]:
-                    if key not in metadata:
-                        metadata[key] = val
-                        break
-
-        matrix = []
-        max_len = 0
-        for line in lines[10:]:
-            row = [float(x) for x in re.split(r"[,\t]", line.strip()) if is_float(x)]
-            if row:
-                max_len = max(max_len, len(row))
-                matrix.append(row)
-
-        if not matrix:
-            return {"file": path, "error": "No valid matrix data"}
-
-        matrix = [r + [0.0] * (max_len - len(r)) for r in matrix]
-        arr = np.array(matrix)
-
-        arr_min = float(np.min(arr))
-        arr_max = float(np.max(arr))
-        arr_mean = float(np.mean(arr))
-        arr_std = float(np.std(arr))
-        nonzero_count = int(np.count_nonzero(arr))
-        nonzero_percent = round(nonzero_count / arr.size * 100, 2)
-        row_means = np.mean(arr, axis=1).tolist()
-
-        total_cells = arr.size
-        rain_distribution = {}
-        for i, (threshold, label) in enumerate(RAINFALL_THRESHOLDS):
-            upper = RAINFALL_THRESHOLDS[i - 1][0] if i > 0 else float('inf')
-            mask = (arr >= threshold) & (arr < upper)
-            rain_distribution[label] = round(np.count_nonzero(mask) / total_cells * 100, 2)
-
-        return {
-            **metadata,
-            "file": path,
-            "shape": arr.shape,
-            "min": arr_min,
-            "max": arr_max,
-            "mean": arr_mean,
-            "std": arr_std,
-            "nonzero_count": nonzero_count,
-            "nonzero_percent": nonzero_percent,
-            "rain_distribution": rain_distribution,
-            "matrix": arr.tolist(),
-            "row_means": row_means,
+    # --- Subscription check ---
+    subscription = Subscription.objects.filter(user=user, status=Subscription.STATUS_ACTIVE).first()
+    if not subscription or subscription.package.name != SubscriptionPackage.PACKAGE_PREMIUM:
+        messages.error(request, "Premium subscription is required to download files.")
+        return redirect(redirect_to)
+
+    full_path = os.path.join(settings.BUNDLE_DIR, bundle.path)
+    if not os.path.isfile(full_path):
+        messages.error(request, "This archive is being rebuilt, please try again shortly.")
+        return redirect(redirect_to)
+
+    # --- Download logs, one per bundled scan (not repeated for resumed ranges) ---
+    log_key = f"bundle_log_{user.id}_{bundle.id}"
+    if not request.headers.get('Range') and not cache.get(log_key):
+        tz = get_current_timezone()
+        window = {
+            'time__gte': make_aware(datetime.combine(bundle.start, datetime.min.time()), tz),
+            'time__lt': make_aware(datetime.combine(bundle.end, datetime.min.time()), tz),
         }
+        ip_address = get_client_ip(request)
+        if bundle.kind == ArchiveBundle.KIND_XMPR:
+            XmprDownloadLog.objects.bulk_create([
+                XmprDownloadLog(xmpr_data_id=pk_, user=user, ip_address=ip_address)
+                for pk_ in XmprData.objects.filter(**window).values_list('id', flat=True)
+            ], batch_size=1000)
+        else:
+            RainMapDownloadLog.objects.bulk_create([
+                RainMapDownloadLog(rainmap_id=pk_, user=user, ip_address=ip_address)
+                for pk_ in RainMapImage.objects.filter(**window).values_list('id', flat=True)
+            ], batch_size=1000)
+        cache.set(log_key, True, timeout=5)
+
+    if settings.BUNDLE_ACCEL_REDIRECT:
+        response = HttpResponse(content_type='application/zip')
+        response['X-Accel-Redirect'] = f"{settings.BUNDLE_ACCEL_REDIRECT.rstrip('/')}/{bundle.path}"
+        response['Content-Disposition'] = f'attachment; filename="{bundle.filename}"'
+        return response
+    return FileResponse(open(full_path, 'rb'), as_attachment=True, filename=bundle.filename, content_type='application/zip')
+
+RAINFALL_THRESHOLDS = RAINFALL_CLASSES
+
+# analyze endpoint payloads: the stored 20x50 preview, a block-averaged matrix or the stats alone
+ANALYZE_PAYLOADS = ('preview', 'downsampled', 'stats')
+ANALYZE_DEFAULT_MAX_SIZE = 100
+ANALYZE_JOB_PREFIX = "xmpr_analyze_job:"
+
+
+def fast_json_response(data, status=200):
+    """
+    JsonResponse equivalent serialized with orjson (NumPy arrays are written directly).
+    """
+    return HttpResponse(
+        orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY),
+        content_type='application/json',
+        status=status,
+    )
+
+
+def parse_max_size(value, default):
+    try:
+        return min(max(int(value), 1), settings.XMPR_ANALYZE_MAX_SIZE)
+    except (TypeError, ValueError):
+        return default
 
-    except Exception as e:
-        return {"file": path, "error": str(e)}
 
 @csrf_exempt
 @login_required
@@ -268,31 +307,295 @@ def analyze_xmpr_data(request):
         ids = data.get('ids', [])
         if not ids:
             return JsonResponse({'error': 'No IDs provided'}, status=400)
-
-        entries = XmprData.objects.filter(id__in=ids)
-        results = []
-        total_files, total_bytes = 0, 0
-
-        for entry in entries:
-            if entry.csv:
-                analysis = read_and_analyze_csv(entry.csv)
-                results.append(analysis)
-                total_files += 1
-                total_bytes += entry.csv_size or 0
-
-        avg_size = total_bytes / total_files if total_files else 0
-        total_size_mb = round(total_bytes / (1024 ** 2), 2)
-
-        return JsonResponse({
-            'data': results,
-            'summary': {
-                'total_files': total_files,
-                'total_size_bytes': total_bytes,
-                'average_file_size_bytes': avg_size,
-                'total_size_mb': total_size_mb,
-                'message': f"{total_files} file(s) analyzed ({total_size_mb:.2f} MB)"
-            }
+        payload = data.get('payload', 'preview')
+        if payload not in ANALYZE_PAYLOADS:
+            return JsonResponse({'error': f"payload must be one of {', '.join(ANALYZE_PAYLOADS)}"}, status=400)
+        max_size = parse_max_size(data.get('max_size'), ANALYZE_DEFAULT_MAX_SIZE)
+
+        entries = [
+            entry for entry in XmprData.objects.filter(id__in=ids).select_related('stats').order_by('time')
+            if entry.csv
+        ]
+        summary = analysis_summary(entries)
+
+        # CSVs this request would have to read; beyond a few, hand the work to the workers
+        csv_reads = sum(1 for entry in entries if payload == 'downsampled' or not hasattr(entry, 'stats'))
+        if csv_reads > settings.XMPR_ANALYZE_INLINE_MAX:
+            job = group(analyze_xmpr_entry.s(entry.id, payload, max_size) for entry in entries).apply_async()
+            job.save()
+            cache.set(
+                f"{ANALYZE_JOB_PREFIX}{job.id}",
+                {'user_id': request.user.id, 'payload': payload, 'summary': summary},
+                timeout=settings.XMPR_ANALYZE_JOB_TIMEOUT,
+            )
+            return fast_json_response({
+                'job_id': job.id,
+                'status_url': reverse('datasets:analyze_xmpr_job', args=[job.id]),
+                'total': len(entries),
+                'payload': payload,
+                'summary': summary,
+            }, status=202)
+
+        return fast_json_response({
+            'data': [XmprStats.analyze(entry, payload, max_size) for entry in entries],
+            'payload': payload,
+            'summary': summary,
         })
 
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+def analysis_summary(entries):
+    total_files = len(entries)
+    total_bytes = sum(entry.csv_size or 0 for entry in entries)
+    avg_size = total_bytes / total_files if total_files else 0
+    total_size_mb = round(total_bytes / (1024 ** 2), 2)
+    return {
+        'total_files': total_files,
+        'total_size_bytes': total_bytes,
+        'average_file_size_bytes': avg_size,
+        'total_size_mb': total_size_mb,
+        'message': f"{total_files} file(s) analyzed ({total_size_mb:.2f} MB)"
+    }
+
+
+@require_GET
+@login_required
+@verified_email_required
+def analyze_xmpr_job(request, job_id):
+    """
+    Progress of an analyze job. Returns the finished results in selection order,
+    leaving out the indexes listed in ?have= (comma-separated) that the caller
+    already received.
+    """
+    job_info = cache.get(f"{ANALYZE_JOB_PREFIX}{job_id}")
+    job = GroupResult.restore(job_id) if job_info and job_info['user_id'] == request.user.id else None
+    if job is None:
+        return JsonResponse({'error': 'Unknown or expired analysis job'}, status=404)
+
+    have = {int(i) for i in request.GET.get('have', '').split(',') if i.isdigit()}
+    data, completed = [], 0
+    for index, child in enumerate(job.results):
+        if not child.ready():
+            continue
+        completed += 1
+        if index in have:
+            continue
+        result = child.result if child.successful() else {'error': str(child.result)}
+        data.append({**result, 'index': index})
+
+    return fast_json_response({
+        'job_id': job_id,
+        'total': len(job.results),
+        'completed': completed,
+        'done': completed == len(job.results),
+        'data': data,
+        'payload': job_info['payload'],
+        'summary': job_info['summary'],
+    })
+
+
+@require_GET
+@login_required
+@verified_email_required
+def xmpr_matrix(request, pk):
+    """
+    The scan matrix quantized to uint8/uint16 (little-endian, row-major).
+
+    Query parameters:
+        dtype: uint8 or uint16 (default)
+        encoding: binary (application/octet-stream, default) or base64 (JSON)
+        max_size: Largest side; larger matrices are block-averaged
+
+    value = offset + code * scale; cells equal to nodata were NaN.
+    """
+    dtype = request.GET.get('dtype', 'uint16')
+    encoding = request.GET.get('encoding', 'binary')
+    if dtype not in QUANTIZED_DTYPES or encoding not in ('binary', 'base64'):
+        return JsonResponse({'error': 'Invalid dtype or encoding'}, status=400)
+    max_size = parse_max_size(request.GET.get('max_size'), settings.XMPR_ANALYZE_MAX_SIZE)
+
+    entry = get_object_or_404(XmprData, pk=pk, csv__isnull=False)
+    full_path = os.path.join(settings.MEDIA_ROOT, entry.csv)
+    if not entry.csv or not os.path.exists(full_path):
+        raise Http404("CSV not available")
+
+    def quantized():
+        _, arr = read_xmpr_csv(full_path)
+        codes, info = quantize_matrix(downsample_matrix(arr, max_size), dtype)
+        return codes.astype(codes.dtype.newbyteorder('<'), copy=False).tobytes(), info
+
+    try:
+        data, info = analysis_cache.get_or_compute(full_path, f"matrix:{dtype}:{max_size}", quantized)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+    if encoding == 'base64':
+        return fast_json_response({
+            **info,
+            'file': entry.csv,
+            'byteorder': 'little',
+            'data': base64.b64encode(data).decode('ascii'),
+        })
+
+    response = HttpResponse(data, content_type='application/octet-stream')
+    response['Content-Disposition'] = f'attachment; filename="{os.path.splitext(os.path.basename(entry.csv))[0]}.{dtype}"'
+    response['X-Matrix-Dtype'] = dtype
+    response['X-Matrix-Shape'] = ','.join(str(n) for n in info['shape'])
+    response['X-Matrix-Scale'] = repr(info['scale'])
+    response['X-Matrix-Offset'] = repr(info['offset'])
+    response['X-Matrix-Nodata'] = str(info['nodata'])
+    return response
+
+
+def parse_points(request):
+    """
+    Points of a time-series request: ?lat=&lon= or ?points=lat,lon;lat,lon
+    """
+    if request.GET.get('points'):
+        pairs = [p.split(',') for p in request.GET['points'].split(';') if p.strip()]
+    else:
+        pairs = [(request.GET.get('lat'), request.GET.get('lon'))]
+    points = []
+    for pair in pairs:
+        if len(pair) != 2 or not all(is_float(v or '') for v in pair):
+            raise ValueError(f"Invalid point: {','.join(str(v) for v in pair)}")
+        lat, lon = float(pair[0]), float(pair[1])
+        # is_float accepts nan / inf; lon 180 would be UTM zone 61
+        if not (-90 <= lat <= 90 and -180 <= lon < 180):
+            raise ValueError(f"Point out of range: {','.join(str(v) for v in pair)}")
+        points.append((lat, lon))
+    return points
+
+
+def parse_time(value, default):
+    if not value:
+        return default
+    dt = parse_datetime(value)
+    if dt is None:
+        raise ValueError(f"Invalid datetime: {value}")
+    return make_aware(dt) if is_naive(dt) else dt
+
+
+@require_GET
+@login_required
+@verified_email_required
+def point_timeseries(request):
+    """
+    Rainfall (mm/h) at one or more points over a time window, read from the
+    per-day datacubes (processor.utils.datacube) instead of the scan CSVs.
+
+    Query parameters:
+        lat, lon or points: One point, or several as lat,lon;lat,lon
+        start, end: ISO datetimes (default: the last 24 hours)
+        format: json (default) or csv
+    """
+    try:
+        points = parse_points(request)
+        end = parse_time(request.GET.get('end'), now())
+        start = parse_time(request.GET.get('start'), end - timedelta(hours=24))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if len(points) > settings.TIMESERIES_MAX_POINTS:
+        return JsonResponse({'error': f"At most {settings.TIMESERIES_MAX_POINTS} points per request"}, status=400)
+    if not start <= end <= start + timedelta(days=settings.TIMESERIES_MAX_DAYS):
+        return JsonResponse({'error': f"start must precede end by at most {settings.TIMESERIES_MAX_DAYS} days"}, status=400)
+
+    cube = site_cube()
+    # lat/lon → cube UTM coordinates once per point; other UTM zones fall outside the grid
+    xs, ys = [], []
+    try:
+        for lat, lon in points:
+            utm = CoordinateSystem.latlon2utm(lon, lat)
+            inside_zone = utm['epsg'] == cube.epsg
+            xs.append(utm['x'] if inside_zone else np.nan)
+            ys.append(utm['y'] if inside_zone else np.nan)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    stamps, values = cube.point_series(xs, ys, start, end)
+    tz = get_current_timezone()
+    times = [datetime.fromtimestamp(ts, tz=tz).isoformat() for ts in stamps.tolist()]
+    _, _, inside = cube.cells(cube.grid, xs, ys)
+
+    if request.GET.get('format') == 'csv':
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="rainfall_{start:%Y%m%d%H%M}_{end:%Y%m%d%H%M}.csv"'
+        writer = csv.writer(response)
+        writer.writerow(['time'] + [f"{lat},{lon}" for lat, lon in points])
+        for time_str, row in zip(times, values.tolist()):
+            writer.writerow([time_str] + ['' if np.isnan(v) else f"{v:.2f}" for v in row])
+        return response
+
+    return fast_json_response({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'units': 'mm/h',
+        'points': [
+            {'lat': lat, 'lon': lon, 'inside': bool(ok)} for (lat, lon), ok in zip(points, inside)
+        ],
+        'times': times,
+        'series': np.ascontiguousarray(np.round(values.T, 2)),
+    })
+
+
+@csrf_exempt
+@login_required
+@verified_email_required
+def zonal_stats(request):
+    """
+    Per-scan mean / max rainfall (mm/h), wet coverage (% of cells > 0) and
+    accumulated depth (mm) of polygons over a time window, from the datacubes.
+    Grid masks of the polygons are cached, so repeated basins are cheap.
+
+    JSON body:
+        geojson: Polygon / MultiPolygon geometry, Feature or FeatureCollection (lon/lat)
+        start, end: ISO datetimes (default: the last 24 hours)
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST a JSON body'}, status=405)
+    try:
+        data = json.loads(request.body)
+        zones = geojson_zones(data.get('geojson') or {})
+        end = parse_time(data.get('end'), now())
+        start = parse_time(data.get('start'), end - timedelta(hours=24))
+    except (ValueError, AttributeError, TypeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if not zones:
+        return JsonResponse({'error': 'No polygons provided'}, status=400)
+    if len(zones) > settings.ZONAL_MAX_ZONES:
+        return JsonResponse({'error': f"At most {settings.ZONAL_MAX_ZONES} polygons per request"}, status=400)
+    if not start <= end <= start + timedelta(days=settings.TIMESERIES_MAX_DAYS):
+        return JsonResponse({'error': f"start must precede end by at most {settings.TIMESERIES_MAX_DAYS} days"}, status=400)
+
+    cube = site_cube()
+    try:
+        result = zonal_series(cube, [zone['geometry'] for zone in zones], start, end)
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        return JsonResponse({'error': f"Invalid geometry: {e}"}, status=400)
+
+    tz = get_current_timezone()
+    cell_km2 = (cube.grid['cellsize'] / 1000) ** 2
+    return fast_json_response({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'units': {'mean': 'mm/h', 'max': 'mm/h', 'coverage': '%', 'accumulated': 'mm'},
+        'times': [datetime.fromtimestamp(ts, tz=tz).isoformat() for ts in result['stamps'].tolist()],
+        'zones': [
+            {
+                'id': zone['id'],
+                'cells': int(cells),
+                'area_km2': round(float(cells) * cell_km2, 2),
+                'accumulated_mm': round(float(accumulated), 2),
+                'mean': np.ascontiguousarray(np.round(mean, 2)),
+                'max': np.ascontiguousarray(np.round(peak, 2)),
+                'coverage': np.ascontiguousarray(np.round(cover, 1)),
+            }
+            for zone, cells, accumulated, mean, peak, cover in zip(
+                zones, result['cells'], result['accumulated_mm'], result['mean'], result['max'], result['coverage'],
+            )
+        ],
+    })
@@ -1,4 +1,5 @@
 import os
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from allauth.account.decorators import verified_email_required, login_required
@@ -36,7 +37,10 @@ def landing(request):
 def live_radar(request):
     xmpr_triggered = trigger_xmpr_pipeline()
     logger.info(f"XMPR triggered: {xmpr_triggered}")
-    return render(request, 'live_radar.html')
+    return render(request, 'live_radar.html', {
+        'tile_min_zoom': settings.TILE_MIN_ZOOM,
+        'tile_max_zoom': settings.TILE_MAX_ZOOM,
+    })
 
 @login_required
 @verified_email_required
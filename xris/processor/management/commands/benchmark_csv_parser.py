@@ -0,0 +1,82 @@
+import glob
+import os
+import tempfile
+import time
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from processor.utils.scan_csv import parse_header, parse_matrix, read_scan_lines
+
+
+def legacy_read(path: str):
+    with open(path, "r", encoding="utf-8") as fh:
+        lines = fh.readlines()
+    return parse_header(lines), parse_matrix(lines, fast=False)
+
+
+def fast_read(path: str):
+    lines = read_scan_lines(path)
+    return parse_header(lines), parse_matrix(lines)
+
+
+def write_synthetic_scan(path: str, n_beams: int = 360, n_rows: int = 602, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    rain = rng.gamma(0.6, 6.0, size=(n_rows - 9, n_beams)) * (rng.uniform(size=(n_rows - 9, n_beams)) > 0.4)
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(f"20241222_100000_PPI,rain\n2.155930\n102.732700\n{n_beams}\n{n_rows - 8}\n250.0\n0.0\n")
+        fh.write(",".join(f"{a:.3f}" for a in np.linspace(0.5, 359.5, n_beams)) + "\n")
+        fh.write(",".join("1.50" for _ in range(n_beams)) + "\n")
+        for row in rain:
+            fh.write(",".join(f"{v:.2f}" for v in row) + ",\n")
+
+
+class Command(BaseCommand):
+    help = "Benchmark the vectorized scan CSV parser against the token-by-token reader."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pattern", default="converted/**/*.csv", help="Glob relative to MEDIA_ROOT")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--synthetic", action="store_true",
+                            help="Benchmark generated 602-row scans instead of MEDIA_ROOT files")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            if options["synthetic"]:
+                paths = []
+                for i in range(options["limit"]):
+                    paths.append(os.path.join(tmp, f"scan_{i}.csv"))
+                    write_synthetic_scan(paths[-1], seed=i)
+            else:
+                pattern = os.path.join(settings.MEDIA_ROOT, options["pattern"])
+                paths = sorted(glob.glob(pattern, recursive=True))[-options["limit"]:]
+
+            if not paths:
+                self.stderr.write("No CSV files found (use --synthetic)")
+                return
+
+            legacy_ms = self.time_reader(legacy_read, paths, options["repeat"])
+            fast_ms = self.time_reader(fast_read, paths, options["repeat"])
+
+            mismatches = 0
+            for path in paths:
+                (ref_meta, ref), (meta, arr) = legacy_read(path), fast_read(path)
+                if ref_meta != meta or not np.array_equal(ref, arr, equal_nan=True):
+                    mismatches += 1
+                    self.stderr.write(f"Mismatch: {path}")
+
+        self.stdout.write(f"{len(paths)} file(s), {options['repeat']} run(s) each")
+        self.stdout.write(f"  token reader:      {legacy_ms:8.2f} ms/file")
+        self.stdout.write(f"  vectorized reader: {fast_ms:8.2f} ms/file")
+        style = self.style.SUCCESS if not mismatches else self.style.ERROR
+        self.stdout.write(style(f"Speed-up {legacy_ms / fast_ms:.1f}x, {mismatches} mismatching file(s)"))
+
+    @staticmethod
+    def time_reader(reader, paths, repeat) -> float:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for path in paths:
+                reader(path)
+            best = min(best, time.perf_counter() - start)
+        return best / len(paths) * 1000
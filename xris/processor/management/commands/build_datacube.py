@@ -0,0 +1,60 @@
+import os
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import localtime
+from datasets.models import XmprData
+from processor.utils.cube_index import read_index
+from processor.utils.datacube import site_cube
+from processor.utils.polar2mesh import parse_polar_scan, polar2mesh
+from processor.utils.scan_csv import read_scan_lines
+
+
+class Command(BaseCommand):
+    help = "Backfill the per-day rainfall datacubes from the converted scan CSVs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", help="First day (YYYY-MM-DD)")
+        parser.add_argument("--to", dest="date_to", help="Last day (YYYY-MM-DD)")
+        parser.add_argument("--force", action="store_true", help="Rewrite slices that are already stored")
+
+    def handle(self, *args, **options):
+        qs = XmprData.objects.exclude(csv__isnull=True).exclude(csv='').order_by('time')
+        try:
+            if options["date_from"]:
+                qs = qs.filter(time__date__gte=datetime.strptime(options["date_from"], "%Y-%m-%d").date())
+            if options["date_to"]:
+                qs = qs.filter(time__date__lte=datetime.strptime(options["date_to"], "%Y-%m-%d").date())
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        cube = site_cube()
+        stored = {}  # day → timestamps already in the cube
+        appended = skipped = failed = upgraded = 0
+
+        for entry in qs.iterator(chunk_size=200):
+            day = localtime(entry.time).date()
+            if day not in stored:
+                # days of an older layout are unreadable until rebuilt, even if complete
+                try:
+                    upgraded += cube.upgrade(day)
+                except Exception as e:
+                    self.stderr.write(f"{day}: {e}")
+                stored[day] = set(read_index(cube.paths(day)["idx"]).tolist())
+            if not options["force"] and int(entry.time.timestamp()) in stored[day]:
+                skipped += 1
+                continue
+
+            try:
+                lines = read_scan_lines(os.path.join(settings.MEDIA_ROOT, entry.csv))
+                mesh = polar2mesh(parse_polar_scan(lines), settings.POLAR2MESH_CACHE_DIR)
+                cube.append(entry.time, mesh["data"])
+                appended += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"{entry.csv}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{appended} slice(s) appended, {skipped} already stored, {failed} failed, "
+            f"{upgraded} day(s) rebuilt"
+        ))
@@ -0,0 +1,80 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from datasets.models import XmprData
+from processor.utils.image import save_palette_png
+
+
+def convert_to_palette(full_path: str) -> tuple[str, int, int, str]:
+    """
+    Rewrites an RGBA overlay as an indexed-colour PNG with identical pixels.
+    Returns (path, old size, new size, status).
+    """
+    old_size = os.path.getsize(full_path)
+    try:
+        with Image.open(full_path) as img:
+            if img.mode == "P":
+                return full_path, old_size, old_size, "skipped"
+            rgba = np.asarray(img.convert("RGBA"))
+    except OSError as e:
+        return full_path, old_size, old_size, f"error: {e}"
+
+    packed = rgba.view(np.uint32).reshape(rgba.shape[:2])
+    colors, indices = np.unique(packed, return_inverse=True)
+    if len(colors) > 256:
+        return full_path, old_size, old_size, "skipped"
+
+    lut = colors.view(np.uint8).reshape(-1, 4)
+    tmp_path = f"{full_path}.tmp.png"
+    try:
+        save_palette_png(indices.reshape(packed.shape).astype(np.uint8), lut, tmp_path)
+        new_size = os.path.getsize(tmp_path)
+        if new_size >= old_size:
+            os.remove(tmp_path)
+            return full_path, old_size, old_size, "skipped"
+        os.replace(tmp_path, full_path)
+    except OSError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return full_path, old_size, old_size, f"error: {e}"
+
+    return full_path, old_size, new_size, "converted"
+
+
+class Command(BaseCommand):
+    help = "Convert existing RGBA radar PNGs under images/png to indexed-colour PNGs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="images/png", help="Folder relative to MEDIA_ROOT")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        media_root = settings.MEDIA_ROOT
+        png_root = os.path.join(media_root, options["path"])
+
+        paths = [
+            os.path.join(root, name)
+            for root, _, files in os.walk(png_root)
+            for name in files if name.lower().endswith(".png")
+        ]
+        self.stdout.write(f"Found {len(paths)} PNG files under {png_root}")
+
+        converted = saved = 0
+        with ProcessPoolExecutor(max_workers=max(options["workers"], 1)) as pool:
+            for full_path, old_size, new_size, status in pool.map(convert_to_palette, paths, chunksize=32):
+                if status.startswith("error"):
+                    self.stderr.write(f"{full_path}: {status}")
+                if status != "converted":
+                    continue
+
+                rel_path = os.path.relpath(full_path, media_root)
+                XmprData.objects.filter(png=rel_path).update(png_size=new_size)
+                converted += 1
+                saved += old_size - new_size
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Converted {converted} PNG files, saved {saved / (1024 ** 2):.2f} MB"
+        ))
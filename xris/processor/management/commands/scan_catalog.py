@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from processor.tasks import scan_and_insert_by_file_key
+
+
+class Command(BaseCommand):
+    help = "Catalog processed outputs and RainMap JPEGs (incremental unless --full)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true",
+                            help="Walk every date folder and rebuild the scan manifest")
+
+    def handle(self, *args, **options):
+        result = scan_and_insert_by_file_key(full=options["full"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Full' if result['full_scan'] else 'Incremental'} scan: "
+            f"{result['rainmap_inserted']} RainMap, {result['dataset_inserted']} dataset, "
+            f"{result['processor_inserted']} processor records inserted"
+        ))
+        for kind, report in result["orphans"].items():
+            if report["count"]:
+                self.stdout.write(self.style.WARNING(f"{kind}: {report['count']}"))
+                for path in report["paths"]:
+                    self.stdout.write(f"  {path}")
@@ -0,0 +1,67 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from processor.tasks import dispatch_csv_files
+from processor.utils.file_ops import move_raw_files
+from processor.utils.watcher import DirectoryWatcher, SettledFiles
+
+
+class Command(BaseCommand):
+    help = (
+        "Ingestion daemon: watches MEDIA_ROOT/rain-RT and MEDIA_ROOT/csv and dispatches "
+        "every file as soon as it is completely written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll", action="store_true", help="Poll instead of using inotify")
+        parser.add_argument("--settle", type=float, default=settings.XMPR_WATCH_SETTLE_SECONDS,
+                            help="Seconds a file must stay unchanged before it is ingested")
+        parser.add_argument("--interval", type=float, default=settings.XMPR_WATCH_POLL_INTERVAL,
+                            help="Polling interval in seconds")
+
+    def handle(self, *args, **options):
+        media_root = settings.MEDIA_ROOT
+        self.raw_dir = os.path.join(media_root, "rain-RT")
+        self.csv_dir = os.path.join(media_root, "csv")
+        for path in (self.raw_dir, self.csv_dir):
+            os.makedirs(path, exist_ok=True)
+
+        watcher = DirectoryWatcher([self.raw_dir, self.csv_dir], options["interval"],
+                                   use_inotify=not options["poll"],
+                                   sweep_interval=options["interval"] * settings.XMPR_WATCH_SWEEP_INTERVALS)
+        pending = SettledFiles(options["settle"])
+        dispatched = set()
+        self.stdout.write(f"Watching {self.raw_dir} and {self.csv_dir} ({watcher.mode})")
+
+        # files that arrived while the daemon was down
+        for path in watcher.list_files():
+            pending.add(path)
+
+        try:
+            while True:
+                timeout = min(options["settle"] / 2, 1.0) if pending.pending else options["interval"]
+                for path in watcher.wait(timeout):
+                    if path not in dispatched:
+                        pending.add(path)
+
+                ready = pending.ready()
+                if ready:
+                    self.ingest(ready)
+                    dispatched.update(ready)
+                # processed files are moved away; forget them so a re-delivered name is seen again
+                dispatched = {path for path in dispatched if os.path.exists(path)}
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
+
+    def ingest(self, paths: list[str]) -> None:
+        raw_files = [os.path.basename(p) for p in paths if os.path.dirname(p) == self.raw_dir]
+        csv_files = [
+            os.path.relpath(p, settings.MEDIA_ROOT) for p in paths
+            if p.startswith(self.csv_dir + os.sep) and p.lower().endswith(".csv")
+        ]
+
+        if raw_files:
+            move_raw_files(raw_files)
+            self.stdout.write(f"Archived {len(raw_files)} rain-RT file(s)")
+        if csv_files and dispatch_csv_files(csv_files) is not None:
+            self.stdout.write(f"Dispatched {len(csv_files)} CSV(s)")
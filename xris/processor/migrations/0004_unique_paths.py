@@ -0,0 +1,63 @@
+# Generated by Django 5.2 on 2026-10-18 06:34
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_paths(apps, schema_editor):
+    """
+    Keeps the oldest row per file path; RainMap download logs of the removed
+    duplicates are moved to the kept image. Blank (unset) paths are not duplicates.
+    """
+    XmprData = apps.get_model('processor', 'XmprData')
+    RainMapImage = apps.get_model('processor', 'RainMapImage')
+    RainMapDownloadLog = apps.get_model('processor', 'RainMapDownloadLog')
+
+    for model, fields in ((XmprData, ('csv', 'image', 'geotiff')), (RainMapImage, ('image',))):
+        for field in fields:
+            duplicates = (
+                model.objects.exclude(**{field: ''})
+                .values(field).annotate(keep=Min('id'), n=Count('id')).filter(n__gt=1)
+            )
+            for row in duplicates:
+                extra = model.objects.filter(**{field: row[field]}).exclude(id=row['keep'])
+                if model is RainMapImage:
+                    RainMapDownloadLog.objects.filter(rainmap__in=extra).update(rainmap_id=row['keep'])
+                extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processor', '0003_rainmapimage_rainmapdownloadlog'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_paths, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='rainmapimage',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('image', ''), _negated=True), fields=('image',),
+                name='processor_rainmapimage_unique_image',
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='xmprdata',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('csv', ''), _negated=True), fields=('csv',), name='processor_xmprdata_unique_csv',
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='xmprdata',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('image', ''), _negated=True), fields=('image',), name='processor_xmprdata_unique_image',
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='xmprdata',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('geotiff', ''), _negated=True), fields=('geotiff',),
+                name='processor_xmprdata_unique_geotiff',
+            ),
+        ),
+    ]
@@ -19,6 +19,16 @@ class XmprData(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # an unset FileField is stored as '' and may repeat
+            models.UniqueConstraint(fields=['csv'], condition=~models.Q(csv=''), name='processor_xmprdata_unique_csv'),
+            models.UniqueConstraint(fields=['image'], condition=~models.Q(image=''), name='processor_xmprdata_unique_image'),
+            models.UniqueConstraint(
+                fields=['geotiff'], condition=~models.Q(geotiff=''), name='processor_xmprdata_unique_geotiff',
+            ),
+        ]
+
     def __str__(self):
         return f"XmprData - {self.time.strftime('%Y-%m-%d %H:%M:%S')}"
 
@@ -31,6 +41,11 @@ class RainMapImage(models.Model):
     image = models.ImageField(upload_to=upload_to_jpeg)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image'], condition=~models.Q(image=''), name='processor_rainmapimage_unique_image'),
+        ]
+
     def __str__(self):
         return f"RainMap - {self.time.strftime('%Y-%m-%d %H:%M:%S')}"
 
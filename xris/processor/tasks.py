@@ -10,24 +10,75 @@ from django.utils.timezone import make_aware
 from django.conf import settings
 from celery import shared_task
 import logging
-from datasets.models import XmprData as DatasetXmprData
+from datasets.models import AccumulationProduct, ArchiveBundle, XmprData as DatasetXmprData, XmprStats
 from processor.models import XmprData as ProcessorXmprData, RainMapImage
 from datetime import timedelta
 from processor.utils.formatter import TranslateFormat
 from processor.utils.coordinates import CoordinateSystem
 from processor.utils.gdal_tools import ModGdal
 from processor.utils.image import ascii2img
+from processor.utils.polar2mesh import parse_polar_scan, polar2mesh, write_mesh
+from processor.utils.scan_csv import MIN_DATA_ROWS, data_row_count, read_scan_lines
+from processor.utils.datacube import site_cube
+from processor.utils.accumulation import accumulation_lock, advance_accumulations, utc
+from processor.utils.loop import LOOP_VERSION, loop_version, png_frame, png_stamp, prune_loops, read_latest, write_loop
+from processor.utils.result_cache import frame_cache
+from processor.utils.bundles import bundle_name, catalog_signature, month_start, remove_bundle, write_bundle
+from processor.utils.zip_archive import ZipArchive
 from processor.utils.file_ops import file_delete, move_raw_files, move_csv_files
+from processor.utils.catalog import (
+    add_orphans, changed_date_folders, date_folder_watermarks, hold_watermarks, load_manifest, orphan_report,
+    save_manifest,
+)
 from processor.helpers import get_file_key_and_datetime, get_datetime_from_jpg
 from django.core.cache import cache
-from django.utils.timezone import now
-from celery import chain
+from django.db import connection, transaction
+from django.utils.timezone import localtime, now
+from celery import chain, chord, group
 
 
 logger = logging.getLogger(__name__)
 
+def _bulk_insert(model, rows: list[dict], batch_size: int) -> list[int]:
+    """
+    Inserts the rows, batch_size per INSERT ... ON CONFLICT DO NOTHING
+    RETURNING id: rows colliding on any unique path column are skipped by the
+    DB, and only the rows this call inserted are reported (not those of a
+    concurrent scanner). bulk_create(ignore_conflicts=True) returns no ids.
+
+    Returns:
+        list: Ids of the inserted rows.
+    """
+    meta = model._meta
+    fields = [f for f in meta.concrete_fields if not f.primary_key]
+    qn = connection.ops.quote_name
+    columns = ", ".join(qn(f.column) for f in fields)
+    values = f"({', '.join(['%s'] * len(fields))})"
+
+    ids = []
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), batch_size):
+            objs = [model(**row) for row in rows[i:i + batch_size]]
+            params = [f.get_db_prep_save(f.pre_save(obj, True), connection) for obj in objs for f in fields]
+            cursor.execute(
+                f"INSERT INTO {qn(meta.db_table)} ({columns}) VALUES {', '.join([values] * len(objs))} "
+                f"ON CONFLICT DO NOTHING RETURNING {qn(meta.pk.column)}",
+                params,
+            )
+            ids.extend(row[0] for row in cursor.fetchall())
+    return ids
+
+
 @shared_task
-def scan_and_insert_by_file_key(_result=None):
+def scan_and_insert_by_file_key(_result=None, full=False):
+    """
+    Catalogs processed outputs and RainMap JPEGs.
+
+    With CATALOG_INCREMENTAL (default) only the YYYY/MM/DD folders whose mtime
+    changed since the last scan are walked; the watermarks are kept in the
+    CATALOG_MANIFEST_PATH manifest. full=True walks everything (see the
+    scan_catalog management command).
+    """
     SOURCE_DIR = Path(settings.MEDIA_ROOT).resolve()
     TARGET_EXTS = {'.csv', '.png', '.tif', '.tiff', '.jpg'}
     default_dirs = ["converted", "images/png", "images/tif", "RainMAP_JPEG"]
@@ -35,15 +86,34 @@ def scan_and_insert_by_file_key(_result=None):
     dir_names = [d.strip() for d in env_dirs.split(',')] if env_dirs else default_dirs
     TARGET_DIRS = [SOURCE_DIR / d for d in dir_names]
 
-    folder_map = defaultdict(lambda: {'csv': [], 'png': [], 'tiff': [], 'jpg': []})
-    rainmap_inserted = 0
+    full = full or not settings.CATALOG_INCREMENTAL
+    manifest = load_manifest(settings.CATALOG_MANIFEST_PATH)
+    watermarks = {d: date_folder_watermarks(SOURCE_DIR / d) for d in dir_names}
+
+    if full:
+        walk_roots = list(TARGET_DIRS)
+        changed = None
+    else:
+        # A CSV and its PNG/TIFF live in different bases: rescan a date folder everywhere
+        changed = set()
+        for d in dir_names:
+            changed |= changed_date_folders(manifest["bases"].get(d, {}), watermarks[d])
+        walk_roots = [base_dir / key for base_dir in TARGET_DIRS for key in sorted(changed)]
+        logger.info(f"Incremental scan: {len(changed)} changed date folder(s)")
+
+    # date folder → kind → file key → entry
+    folder_map = defaultdict(lambda: {'csv': {}, 'png': {}, 'tiff': {}})
+    orphans = orphan_report()
+    rainmap_rows = []
+    empty_folders = set()  # folders holding zero-byte files, not yet catalogued
+    batch_size = settings.CATALOG_BULK_BATCH_SIZE
 
     # Phase 1: Walk and bucket files by date folder
-    for base_dir in TARGET_DIRS:
-        if not base_dir.exists():
+    for walk_root in walk_roots:
+        if not walk_root.exists():
             continue
 
-        for root, _, files in os.walk(base_dir):
+        for root, _, files in os.walk(walk_root):
             for file in sorted(files):
                 ext = Path(file).suffix.lower()
                 if ext not in TARGET_EXTS:
@@ -53,6 +123,7 @@ def scan_and_insert_by_file_key(_result=None):
                 try:
                     size = full_path.stat().st_size
                     if size == 0:
+                        empty_folders.add(Path(root))
                         continue
                 except Exception:
                     continue
@@ -73,72 +144,97 @@ def scan_and_insert_by_file_key(_result=None):
 
                 if ext == '.jpg':
                     dt = get_datetime_from_jpg(file)
-                    if dt and not RainMapImage.objects.filter(image=rel_path).exists():
-                        RainMapImage.objects.create(time=dt, image=rel_path)
-                        rainmap_inserted += 1
+                    if dt:
+                        rainmap_rows.append({'time': dt, 'image': rel_path})
                     continue
 
-                if ext == '.csv':
-                    folder_map[date_folder]['csv'].append(entry)
-                elif ext == '.png':
-                    folder_map[date_folder]['png'].append(entry)
-                elif ext in ['.tif', '.tiff']:
-                    folder_map[date_folder]['tiff'].append(entry)
+                key, dt = get_file_key_and_datetime(file)
+                if not key or not dt:
+                    add_orphans(orphans, 'unparsed', [rel_path])
+                    continue
+                entry['time'] = dt
 
-    dataset_inserted = 0
-    processor_inserted = 0
+                kind = 'tiff' if ext in ('.tif', '.tiff') else ext[1:]
+                folder_map[date_folder][kind].setdefault(key, entry)
 
-    # Phase 2: Match within folder and insert records
-    for date_folder, group in folder_map.items():
-        for csv_entry in group['csv']:
-            key, dt = get_file_key_and_datetime(csv_entry['file'])
-            if not key or not dt:
-                continue
+    with transaction.atomic():
+        rainmap_inserted = len(_bulk_insert(RainMapImage, rainmap_rows, batch_size))
 
-            png_entry = next((p for p in group['png'] if p['file'].startswith(key)), None)
-            tiff_entry = next((t for t in group['tiff'] if t['file'].startswith(key)), None)
+    dataset_rows = []
+    processor_rows = []
 
+    # Phase 2: Match within folder and insert records
+    for date_folder, buckets in folder_map.items():
+        add_orphans(orphans, 'png_without_csv',
+                    [e['path'] for k, e in buckets['png'].items() if k not in buckets['csv']])
+        add_orphans(orphans, 'tiff_without_csv',
+                    [e['path'] for k, e in buckets['tiff'].items() if k not in buckets['csv']])
+
+        for key, csv_entry in buckets['csv'].items():
+            png_entry = buckets['png'].get(key)
+            tiff_entry = buckets['tiff'].get(key)
+
+            if not png_entry:
+                add_orphans(orphans, 'csv_without_png', [csv_entry['path']])
+            if not tiff_entry:
+                add_orphans(orphans, 'csv_without_tiff', [csv_entry['path']])
             if not (png_entry and tiff_entry):
-                logger.debug(f"Incomplete match for {key} in {date_folder}")
                 continue
 
-            if not DatasetXmprData.objects.filter(csv=csv_entry['path']).exists() \
-                and not DatasetXmprData.objects.filter(png=png_entry['path']).exists() \
-                and not DatasetXmprData.objects.filter(tiff=tiff_entry['path']).exists():
-                DatasetXmprData.objects.create(
-                    time=dt,
-                    csv=csv_entry['path'],
-                    csv_size=csv_entry['size'],
-                    png=png_entry['path'],
-                    png_size=png_entry['size'],
-                    tiff=tiff_entry['path'],
-                    tiff_size=tiff_entry['size'],
-                )
-                dataset_inserted += 1
-
-            if not ProcessorXmprData.objects.filter(csv=csv_entry['path']).exists() \
-                and not ProcessorXmprData.objects.filter(image=png_entry['path']).exists() \
-                and not ProcessorXmprData.objects.filter(geotiff=tiff_entry['path']).exists():
-                ProcessorXmprData.objects.create(
-                    time=dt,
-                    csv=csv_entry['path'],
-                    image=png_entry['path'],
-                    geotiff=tiff_entry['path'],
-                )
-                processor_inserted += 1
+            dt = csv_entry['time']
+            dataset_rows.append({
+                'time': dt,
+                'csv': csv_entry['path'],
+                'csv_size': csv_entry['size'],
+                'png': png_entry['path'],
+                'png_size': png_entry['size'],
+                'tiff': tiff_entry['path'],
+                'tiff_size': tiff_entry['size'],
+            })
+            processor_rows.append({
+                'time': dt,
+                'csv': csv_entry['path'],
+                'image': png_entry['path'],
+                'geotiff': tiff_entry['path'],
+            })
+
+    with transaction.atomic():
+        dataset_ids = _bulk_insert(DatasetXmprData, dataset_rows, batch_size)
+        dataset_inserted = len(dataset_ids)
+        processor_inserted = len(_bulk_insert(ProcessorXmprData, processor_rows, batch_size))
 
     logger.info(f"Inserted RainMap JPEGs: {rainmap_inserted}")
     logger.info(f"Inserted into DatasetXmprData: {dataset_inserted}")
     logger.info(f"Inserted into ProcessorXmprData: {processor_inserted}")
+    for kind, report in orphans.items():
+        if report['count']:
+            logger.warning(f"Orphaned artefacts ({kind}): {report['count']}")
 
     if _result:
         logger.info(f"Previous move task: {_result['succeeded']} succeeded, {_result['failed']} failed")
 
+    # Only advance the watermarks once everything is in the DB, and not past empty files
+    for d, base_dir in zip(dir_names, TARGET_DIRS):
+        held = {
+            "/".join(folder.relative_to(base_dir).parts[:3])
+            for folder in empty_folders if folder.is_relative_to(base_dir)
+        }
+        watermarks[d] = hold_watermarks(watermarks[d], held)
+    save_manifest(watermarks, settings.CATALOG_MANIFEST_PATH, full=full)
+
+    if dataset_ids:
+        # rows are new, so none of them has stats yet
+        compute_xmpr_stats.delay(dataset_ids)
+        build_radar_loop.delay()
+
     return {
         "input_result": _result,
+        "full_scan": full,
+        "changed_folders": None if changed is None else len(changed),
         "rainmap_inserted": rainmap_inserted,
         "dataset_inserted": dataset_inserted,
-        "processor_inserted": processor_inserted
+        "processor_inserted": processor_inserted,
+        "orphans": orphans,
     }
 
 
@@ -146,9 +242,11 @@ def scan_and_insert_by_file_key(_result=None):
 def process_csv_file(csv_relative_path: str):
     """
     • Skip CSVs with <10 data rows
-    • Convert CSV -> SSV (no extension)
-    • Run polar2mesh
+    • Convert CSV -> SSV (no extension) and run polar2mesh, or interpolate
+      in-process when POLAR2MESH_ENGINE = "numpy"
     • Convert mesh -> GeoTIFF & PNG
+    • PROCESSOR_PIPELINE = "memory" parses the CSV once and keeps the mesh
+      in memory for both outputs (no SSV / mesh files under temp/)
     • Insert into DB (if new)
     """
     media_root = settings.MEDIA_ROOT
@@ -157,11 +255,11 @@ def process_csv_file(csv_relative_path: str):
 
     # ────────────────────────── CSV sanity check ─────────────────────────
     try:
-        with open(csv_path, "r") as fh:
-            data_rows = [ln for ln in fh if ln.strip()]
-        if len(data_rows) < 11:
-            logger.warning(f"Skip {csv_relative_path}: only {len(data_rows)-1} data rows")
-            return f"Too few rows ({len(data_rows)-1})"
+        lines = read_scan_lines(csv_path)
+        n_rows = data_row_count(lines)
+        if n_rows < MIN_DATA_ROWS:
+            logger.warning(f"Skip {csv_relative_path}: only {n_rows} data rows")
+            return f"Too few rows ({n_rows})"
     except Exception as e:
         logger.error(f"Cannot read {csv_relative_path}: {e}")
         return f"Read-error: {e}"
@@ -172,28 +270,41 @@ def process_csv_file(csv_relative_path: str):
 
     polar_path = os.path.join(tmp_dir, f"polar_{basename}")
     mesh_path  = os.path.join(tmp_dir, f"mesh_{basename}")
+    mesh       = None
 
     try:
         logger.info(f"▶︎  Processing {csv_path}")
 
-        # 1. CSV → SSV
-        TranslateFormat.to_ssv(csv_path, polar_path)
-        if not os.path.isfile(polar_path) or os.path.getsize(polar_path) == 0:
-            err = f"SSV not created: {polar_path}"
-            logger.error(err)
-            return err
-        logger.info(f"SSV OK  → {polar_path}")
-
-        # 2. polar2mesh
-        cmd = [str(settings.POLAR2MESH_PATH), polar_path, mesh_path]
-        logger.debug("CMD  " + " ".join(cmd))
-        subprocess.run(cmd, check=True,
-                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if not os.path.isfile(mesh_path) or os.path.getsize(mesh_path) == 0:
+        if settings.PROCESSOR_PIPELINE == "memory":
+            # 1-2. CSV → mesh array, kept in memory
+            mesh = polar2mesh(parse_polar_scan(lines), settings.POLAR2MESH_CACHE_DIR)
+        elif settings.POLAR2MESH_ENGINE == "numpy":
+            # 1-2. CSV → mesh, in-process
+            scan = parse_polar_scan(lines)
+            write_mesh(polar2mesh(scan, settings.POLAR2MESH_CACHE_DIR), mesh_path)
+        else:
+            # 1. CSV → SSV
+            TranslateFormat.to_ssv(csv_path, polar_path)
+            if not os.path.isfile(polar_path) or os.path.getsize(polar_path) == 0:
+                err = f"SSV not created: {polar_path}"
+                logger.error(err)
+                return err
+            logger.info(f"SSV OK  → {polar_path}")
+
+            # 2. polar2mesh
+            cmd = [str(settings.POLAR2MESH_PATH), polar_path, mesh_path]
+            logger.debug("CMD  " + " ".join(cmd))
+            subprocess.run(cmd, check=True,
+                           stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+        if mesh is not None:
+            logger.info(f"Mesh OK → {mesh['rows']}x{mesh['cols']} in memory")
+        elif not os.path.isfile(mesh_path) or os.path.getsize(mesh_path) == 0:
             err = f"Mesh not created: {mesh_path}"
             logger.error(err)
             return err
-        logger.info(f"Mesh OK → {mesh_path}")
+        else:
+            logger.info(f"Mesh OK → {mesh_path}")
 
         # 3. datetime from filename
         date_part, time_part = basename.split("_", 2)[:2]
@@ -216,14 +327,28 @@ def process_csv_file(csv_relative_path: str):
         png_path = os.path.join(png_dir, f"{basename}.png")
 
         # 6. mesh → GeoTIFF
-        ModGdal.ascii2tiff(utm["epsg"], mesh_path, tif_path)
+        if mesh is not None:
+            ModGdal.array2tiff(utm["epsg"], mesh, tif_path)
+        else:
+            ModGdal.ascii2tiff(utm["epsg"], mesh_path, tif_path)
         logger.info(f"TIFF  → {tif_path}")
 
         # 7. mesh → colour PNG
-        data = np.loadtxt(mesh_path, delimiter=" ", skiprows=6)
+        if mesh is not None:
+            data = mesh["data"]
+        else:
+            data = np.loadtxt(mesh_path, delimiter=" ", skiprows=6)
         ascii2img(data, png_path)
         logger.info(f"PNG   → {png_path}")
 
+        # 7b. mesh → datacube slice (a failure here does not fail the scan)
+        if settings.DATACUBE_ENABLED:
+            try:
+                offset = site_cube().append(dt, data)
+                logger.info(f"Cube  → {dt:%Y%m%d} slice {offset}")
+            except Exception as e:
+                logger.error(f"Datacube append failed for {basename}: {e}")
+
         # 8. Determine converted CSV path (instead of 'csv/...')
         converted_csv_path = os.path.join("converted", y, m, d, os.path.basename(csv_path))
 
@@ -253,26 +378,56 @@ def process_csv_file(csv_relative_path: str):
         file_delete(polar_path, mesh_path)
         logger.debug("Temp cleaned")
 
+# Cache key marking a CSV as owned by a dispatched chord (value: the dispatch token)
+CSV_CLAIM_PREFIX = "xmpr_csv_claim:"
+
+
+def _claim_keys(csv_relative_paths: list[str]) -> list[str]:
+    return [f"{CSV_CLAIM_PREFIX}{rel}" for rel in csv_relative_paths]
+
+
 @shared_task
-def move_and_process_files():
-    logger.info("=== move_and_process_files start ===")
+def process_csv_batch(csv_relative_paths: list[str], token: str | None = None):
+    """
+    Chord member: runs process_csv_file for a batch of CSVs.
+    Returns [(csv_relative_path, result), ...].
 
-    # 1) Move any raw rain-RT files
-    move_raw_files()
-    logger.info("Moved rain-RT files")
+    The batch may have been queued for a while: its claims are renewed for
+    another PROCESSOR_CLAIM_TIMEOUT first, and a CSV claimed meanwhile by
+    another dispatch is left to it (result None).
+    """
+    keys = _claim_keys(csv_relative_paths)
+    current = cache.get_many(keys)
+    owned = [rel for rel, key in zip(csv_relative_paths, keys) if token is None or current.get(key, token) == token]
+    cache.set_many({f"{CSV_CLAIM_PREFIX}{rel}": token or True for rel in owned},
+                   timeout=settings.PROCESSOR_CLAIM_TIMEOUT)
 
-    csv_root = os.path.join(settings.MEDIA_ROOT, "csv")
+    return [(rel, process_csv_file(rel) if rel in owned else None) for rel in csv_relative_paths]
+
+
+@shared_task
+def release_csv_claims(csv_relative_paths: list[str]):
+    """
+    Errback of the dispatch chord: when a batch fails the callback never runs,
+    so the CSVs are released for the next move_and_process_files.
+    """
+    cache.delete_many(_claim_keys(csv_relative_paths))
+    logger.warning(f"Released {len(csv_relative_paths)} CSV claim(s) of a failed chord")
+
+
+@shared_task
+def finalize_csv_batches(batch_results: list):
+    """
+    Chord callback: moves succeeded CSVs to converted/ and failed ones to
+    failed/, then hands the summary to scan_and_insert_by_file_key.
+    """
     succeeded = []
     failed = []
 
-    # 2) Process all CSVs
-    for root, _, files in os.walk(csv_root):
-        for name in files:
-            if not name.lower().endswith(".csv"):
-                continue
-
-            rel = os.path.relpath(os.path.join(root, name), settings.MEDIA_ROOT)
-            res = process_csv_file(rel)
+    for batch in batch_results:
+        for rel, res in batch:
+            if res is None:
+                continue  # owned by another dispatch
             if res == 1:
                 succeeded.append(rel)
                 logger.info(f"✓ Processed: {rel}")
@@ -300,7 +455,11 @@ def move_and_process_files():
         move_csv_files(failed_files, success=False)
         logger.info("Moved failed files to failed/")
 
-    logger.info("=== move_and_process_files end ===")
+    cache.delete_many(_claim_keys(succeeded + failed_files))
+
+    # 5) The batch's slices are in the datacube: roll the accumulations forward
+    if succeeded and settings.DATACUBE_ENABLED and settings.ACCUMULATION_HOURS:
+        update_accumulations.delay()
 
     return {
         "total": total,
@@ -310,6 +469,361 @@ def move_and_process_files():
     }
 
 
+def dispatch_csv_files(csv_relative_paths: list[str]):
+    """
+    Fans the CSVs out as a chord of process_csv_batch subtasks (PROCESSOR_BATCH_SIZE
+    files each). The callback moves the files and then catalogs the outputs.
+    CSVs already claimed by a running chord are skipped; the claims are
+    released by the callback, or by release_csv_claims if a batch fails.
+    """
+    claim_timeout = settings.PROCESSOR_CLAIM_TIMEOUT
+    token = uuid.uuid4().hex
+    claimed = [rel for rel in csv_relative_paths
+               if cache.add(f"{CSV_CLAIM_PREFIX}{rel}", token, timeout=claim_timeout)]
+    if not claimed:
+        return None
+
+    batch_size = max(settings.PROCESSOR_BATCH_SIZE, 1)
+    batches = [claimed[i:i + batch_size] for i in range(0, len(claimed), batch_size)]
+
+    callback = chain(finalize_csv_batches.s(), scan_and_insert_by_file_key.s())
+    callback.link_error(release_csv_claims.si(claimed))
+    result = chord(process_csv_batch.s(batch, token) for batch in batches)(callback)
+    logger.info(f"Dispatched {len(claimed)} CSV(s) in {len(batches)} batch(es)")
+    return result
+
+
+@shared_task
+def move_and_process_files():
+    logger.info("=== move_and_process_files start ===")
+
+    # 1) Move any raw rain-RT files
+    move_raw_files()
+    logger.info("Moved rain-RT files")
+
+    csv_root = os.path.join(settings.MEDIA_ROOT, "csv")
+    csv_files = []
+
+    # 2) Collect all CSVs
+    for root, _, files in os.walk(csv_root):
+        for name in sorted(files):
+            if not name.lower().endswith(".csv"):
+                continue
+            csv_files.append(os.path.relpath(os.path.join(root, name), settings.MEDIA_ROOT))
+
+    # 3) Fan out; with nothing to process, still catalog (e.g. new RainMap JPEGs)
+    result = dispatch_csv_files(csv_files)
+    if result is None:
+        scan_and_insert_by_file_key.delay()
+
+    logger.info("=== move_and_process_files end ===")
+
+    return {
+        "total": len(csv_files),
+        "dispatched": result is not None,
+    }
+
+
+@shared_task
+def convert_tiff_batch(tiff_relative_paths: list[str]):
+    """
+    Rewrites a batch of GeoTIFFs as COGs and updates DatasetXmprData.tiff_size.
+    Returns {"converted": n, "skipped": n, "failed": [paths]}.
+    """
+    converted, skipped, failed = 0, 0, []
+    for rel in tiff_relative_paths:
+        full_path = os.path.join(settings.MEDIA_ROOT, rel)
+        try:
+            if ModGdal.is_cog(full_path):
+                skipped += 1
+                continue
+            size = ModGdal.tiff2cog(full_path)
+        except RuntimeError as e:
+            logger.error(f"✗ {rel}: {e}")
+            failed.append(rel)
+            continue
+
+        DatasetXmprData.objects.filter(tiff=rel).update(tiff_size=size)
+        converted += 1
+
+    return {"converted": converted, "skipped": skipped, "failed": failed}
+
+
+@shared_task
+def backfill_cog(subdir="images/tif", batch_size=50):
+    """
+    Converts the existing GeoTIFF tree to COG in parallel: one convert_tiff_batch
+    subtask per `batch_size` files, spread over the workers.
+    """
+    tif_root = os.path.join(settings.MEDIA_ROOT, subdir)
+    paths = sorted(
+        os.path.relpath(os.path.join(root, name), settings.MEDIA_ROOT)
+        for root, _, files in os.walk(tif_root)
+        for name in files if name.lower().endswith((".tif", ".tiff"))
+    )
+    batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    group(convert_tiff_batch.s(batch) for batch in batches).delay()
+
+    logger.info(f"Dispatched COG backfill: {len(paths)} GeoTIFF(s) in {len(batches)} batch(es)")
+    return {"total": len(paths), "batches": len(batches)}
+
+
+@shared_task
+def compute_xmpr_stats(xmpr_ids: list[int]):
+    """
+    Stores the XmprStats of a batch of scans. Returns {"computed": n, "failed": [ids]}.
+    """
+    computed, failed = 0, []
+    for entry in DatasetXmprData.objects.filter(id__in=xmpr_ids).exclude(csv__isnull=True):
+        try:
+            XmprStats.compute(entry)
+            computed += 1
+        except (OSError, ValueError) as e:
+            logger.error(f"✗ Stats for {entry.csv}: {e}")
+            failed.append(entry.id)
+    return {"computed": computed, "failed": failed}
+
+
+@shared_task
+def analyze_xmpr_entry(xmpr_id: int, payload: str = 'preview', max_size: int = 100):
+    """
+    One result of a multi-file analyze request (datasets.views.analyze_xmpr_data
+    runs these as a group and the explorer polls for them).
+    """
+    entry = DatasetXmprData.objects.select_related('stats').filter(id=xmpr_id).first()
+    if entry is None or not entry.csv:
+        return {"file": None, "error": f"No CSV for scan {xmpr_id}"}
+
+    result = XmprStats.analyze(entry, payload, max_size)
+    if isinstance(result.get("matrix"), np.ndarray):
+        # the result backend stores JSON
+        result["matrix"] = result["matrix"].tolist()
+    return result
+
+
+STATS_LOCK_EXPIRE = 600  # seconds
+
+
+@shared_task
+def backfill_xmpr_stats(batch_size=100):
+    """
+    Fans out compute_xmpr_stats over every scan that has no stats yet, to fill
+    in the archive (new scans get theirs right after the catalog scan).
+    """
+    lock_key = "xmpr_stats_backfill_lock"
+    if not cache.add(lock_key, True, timeout=STATS_LOCK_EXPIRE):
+        return {"total": 0, "batches": 0}
+
+    ids = list(
+        DatasetXmprData.objects.filter(stats__isnull=True).exclude(csv__isnull=True).exclude(csv='')
+        .order_by('-time').values_list('id', flat=True)
+    )
+    batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+    if batches:
+        group(compute_xmpr_stats.s(batch) for batch in batches).delay()
+
+    logger.info(f"Dispatched stats for {len(ids)} scan(s) in {len(batches)} batch(es)")
+    return {"total": len(ids), "batches": len(batches)}
+
+
+def write_accumulation(acc, dt, grid: dict) -> AccumulationProduct:
+    """
+    Writes a rolling accumulation as GeoTIFF + PNG under images/accumulation
+    and catalogues it (one AccumulationProduct per window end and length).
+    """
+    data = acc.data
+    name = f"{dt:%Y%m%d_%H%M%S}_{acc.hours}h"
+    folder = (f"{dt:%Y}", f"{dt:%m}", f"{dt:%d}")
+    tif_rel = os.path.join("images", "accumulation", "tif", *folder, f"{name}.tif")
+    png_rel = os.path.join("images", "accumulation", "png", *folder, f"{name}.png")
+    tif_path = os.path.join(settings.MEDIA_ROOT, tif_rel)
+    png_path = os.path.join(settings.MEDIA_ROOT, png_rel)
+
+    # -1 outside the radar range, like the scan meshes
+    mesh = {
+        "rows": grid["rows"], "cols": grid["cols"],
+        "west": grid["west"], "east": grid["west"] + grid["cols"] * grid["cellsize"],
+        "north": grid["north"], "south": grid["north"] - grid["rows"] * grid["cellsize"],
+        "data": np.where(np.isnan(data), -1, data),
+    }
+    ModGdal.array2tiff(grid["epsg"], mesh, tif_path)
+    ascii2img(mesh["data"], png_path, palette="accumulation")
+
+    product, _ = AccumulationProduct.objects.update_or_create(
+        time=dt, hours=acc.hours,
+        defaults={
+            "tiff": tif_rel, "tiff_size": os.path.getsize(tif_path),
+            "png": png_rel, "png_size": os.path.getsize(png_path),
+            "scans": len(acc.members),
+            "max": float(np.nanmax(data)) if np.isfinite(data).any() else 0.0,
+        },
+    )
+    return product
+
+
+@shared_task
+def update_accumulations():
+    """
+    Rolls the accumulation windows (settings.ACCUMULATION_HOURS) forward to
+    the latest datacube scan, writing one product per window and scan.
+    Queued after every CSV batch; overlapping runs wait on a file lock.
+    """
+    if not (settings.DATACUBE_ENABLED and settings.ACCUMULATION_HOURS):
+        return {"products": 0, "failed": 0}
+
+    cube = site_cube()
+    written, failed = 0, 0
+    with accumulation_lock(settings.ACCUMULATION_STATE_DIR):
+        steps = advance_accumulations(cube, settings.ACCUMULATION_STATE_DIR, settings.ACCUMULATION_HOURS, now())
+        for end, accumulations in steps:
+            dt = localtime(utc(end))
+            for acc in accumulations:
+                try:
+                    write_accumulation(acc, dt, cube.grid)
+                    written += 1
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"✗ {acc.hours}h accumulation at {dt:%Y-%m-%d %H:%M}: {e}")
+
+    logger.info(f"Accumulations: {written} product(s) written, {failed} failed")
+    return {"products": written, "failed": failed}
+
+
+@shared_task
+def build_radar_loop():
+    """
+    Re-encodes the animated loop of the latest RADAR_LOOP_FRAMES scans when a
+    scan is catalogued. Frames come from frame_cache, so only the new scan's
+    PNG is decoded; an unchanged scan list is a no-op.
+    """
+    entries = list(
+        DatasetXmprData.objects.exclude(png__isnull=True).exclude(png='')
+        .order_by('-time').values('id', 'time', 'png')[:settings.RADAR_LOOP_FRAMES]
+    )[::-1]
+    if not entries:
+        return {"version": None, "built": False}
+
+    size, frame_ms = settings.RADAR_LOOP_FRAME_SIZE, settings.RADAR_LOOP_FRAME_MS
+    scans = [(e['id'], e['png'], *png_stamp(os.path.join(settings.MEDIA_ROOT, e['png']))) for e in entries]
+    version = loop_version(scans, size, frame_ms)
+    latest = read_latest(settings.RADAR_LOOP_DIR)
+    if latest and latest['version'] == version:
+        return {"version": version, "built": False}
+
+    frames, times = [], []
+    for entry in entries:
+        full_path = os.path.join(settings.MEDIA_ROOT, entry['png'])
+        try:
+            frames.append(frame_cache.get_or_compute(
+                full_path, f"loop_frame:v{LOOP_VERSION}:{size}", lambda: png_frame(full_path, size),
+            ))
+            times.append(entry['time'])
+        except OSError as e:
+            logger.warning(f"Loop frame skipped, {entry['png']}: {e}")
+    if not frames:
+        return {"version": None, "built": False}
+
+    write_loop(settings.RADAR_LOOP_DIR, version, frames, times, frame_ms, settings.RADAR_LOOP_COLUMNS)
+    pruned = prune_loops(settings.RADAR_LOOP_DIR, settings.RADAR_LOOP_KEEP)
+    logger.info(f"Radar loop {version}: {len(frames)} frame(s), {pruned} old version(s) removed")
+    return {"version": version, "built": True, "frames": len(frames)}
+
+
+def _bundle_rows(kind: str, start: datetime, end: datetime) -> list[tuple]:
+    # catalog rows of the bundled files in archive order; (id, time, ...paths and sizes)
+    if kind == ArchiveBundle.KIND_XMPR:
+        qs = DatasetXmprData.objects.values_list('id', 'time', 'csv', 'png', 'tiff', 'csv_size', 'png_size', 'tiff_size')
+    else:
+        qs = RainMapImage.objects.values_list('id', 'time', 'image')
+    return list(qs.filter(time__gte=start, time__lt=end).order_by('time', 'id'))
+
+
+def _bundle_archive(kind: str, rows: list[tuple]) -> tuple[ZipArchive, int]:
+    # same member layout as the download views
+    archive, files = ZipArchive(deflate_level=settings.DOWNLOAD_ZIP_DEFLATE_LEVEL), 0
+    for row in rows:
+        time_local = localtime(row[1])
+        if kind == ArchiveBundle.KIND_XMPR:
+            members = [(f"{time_local:%Y/%m/%d}/{ext}/{os.path.basename(rel)}", rel)
+                       for ext, rel in zip(('csv', 'png', 'tiff'), row[2:5]) if rel]
+        else:
+            members = [(f"{time_local:%Y/%m/%d}/{os.path.basename(row[2])}", row[2])] if row[2] else []
+        for arcname, rel in members:
+            files += archive.add(os.path.join(settings.MEDIA_ROOT, rel), arcname, time_local)
+    return archive, files
+
+
+@shared_task
+def build_archive_bundles(days: int | None = None):
+    """
+    Nightly (CELERY_BEAT_SCHEDULE): builds the per-day XmprData and
+    RainMapImage bundles of the last BUNDLE_LOOKBACK_DAYS days (today
+    excluded) and the bundles of complete months, skipping every period whose
+    catalog signature is unchanged. A rebuilt bundle gets a new file name;
+    the previous one is removed once the row points at it.
+    """
+    today = localtime(now()).date()
+    first_day = today - timedelta(days=days or settings.BUNDLE_LOOKBACK_DAYS)
+    first = month_start(first_day)
+    start = make_aware(datetime(first.year, first.month, first.day))
+    end = make_aware(datetime(today.year, today.month, today.day))
+    built, unchanged, removed, failed = 0, 0, 0, 0
+
+    for kind, _ in ArchiveBundle.KIND_CHOICES:
+        days_rows, months_rows = defaultdict(list), defaultdict(list)
+        for row in _bundle_rows(kind, start, end):
+            day = localtime(row[1]).date()
+            days_rows[day].append(row)
+            months_rows[month_start(day)].append(row)
+
+        periods = {(ArchiveBundle.PERIOD_DAY, day): rows for day, rows in days_rows.items() if day >= first_day}
+        if settings.BUNDLE_MONTHLY:
+            periods.update({
+                (ArchiveBundle.PERIOD_MONTH, month): rows
+                for month, rows in months_rows.items() if month < month_start(today)
+            })
+
+        existing = {
+            (b.period, b.start): b
+            for b in ArchiveBundle.objects.filter(kind=kind, start__gte=first, start__lt=today)
+        }
+        for (period, period_start), rows in sorted(periods.items()):
+            signature = catalog_signature(rows)
+            bundle = existing.get((period, period_start))
+            if bundle and bundle.signature == signature and os.path.exists(os.path.join(settings.BUNDLE_DIR, bundle.path)):
+                unchanged += 1
+                continue
+
+            rel_path = bundle_name(kind, period_start, period == ArchiveBundle.PERIOD_MONTH, signature)
+            try:
+                archive, files = _bundle_archive(kind, rows)
+                if not files:
+                    continue
+                size = write_bundle(settings.BUNDLE_DIR, rel_path, archive)
+            except (OSError, ValueError) as e:
+                failed += 1
+                logger.error(f"✗ {kind} {period} bundle {period_start}: {e}")
+                continue
+
+            ArchiveBundle.objects.update_or_create(
+                kind=kind, period=period, start=period_start,
+                defaults={"path": rel_path, "size": size, "files": files, "signature": signature},
+            )
+            if bundle and bundle.path != rel_path:
+                remove_bundle(settings.BUNDLE_DIR, bundle.path)
+            built += 1
+
+        # periods whose files are all gone from the catalog
+        for key, bundle in existing.items():
+            if key not in periods and (key[0] == ArchiveBundle.PERIOD_MONTH or key[1] >= first_day):
+                remove_bundle(settings.BUNDLE_DIR, bundle.path)
+                bundle.delete()
+                removed += 1
+
+    logger.info(f"Archive bundles: {built} built, {unchanged} unchanged, {removed} removed, {failed} failed")
+    return {"built": built, "unchanged": unchanged, "removed": removed, "failed": failed}
+
+
 LOCK_EXPIRE = 120  # seconds
 
 def trigger_xmpr_pipeline(force=False):
@@ -317,6 +831,10 @@ def trigger_xmpr_pipeline(force=False):
     lock_key = "xmpr_pipeline_lock"
     now_time = now()
 
+    if not force and not settings.XMPR_TRIGGER_ON_REQUEST:
+        # the watch_rain_rt daemon ingests new scans
+        return False
+
     if not force and cache.get(cache_key):
         logger.info("Skipped pipeline trigger: ran recently")
         return False
@@ -328,12 +846,8 @@ def trigger_xmpr_pipeline(force=False):
     cache.set(lock_key, True, timeout=LOCK_EXPIRE)
 
     try:
-        task_chain = chain(
-            move_and_process_files.s(),
-            scan_and_insert_by_file_key.s()
-        )
-        task_chain.delay()
-        logger.info("Dispatched chained XMPR pipeline")
+        move_and_process_files.delay()
+        logger.info("Dispatched XMPR pipeline")
 
         cache.set(cache_key, now_time, timeout=LOCK_EXPIRE)
         return True
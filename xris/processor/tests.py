@@ -1,3 +1,1039 @@
-from django.test import TestCase
+import io
+import os
+import json
+import zipfile
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock, skipUnless
+import numpy as np
+from PIL import Image
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import Resolver404, resolve
+from django.utils.timezone import make_aware
+from processor.utils import polar2mesh as p2m
+from processor.utils.polar2mesh import read_polar_scan, polar2mesh, write_mesh
+from processor.utils.image import ascii2img, classify, get_color, palette_lut, palette_png_bytes, render_rgba
+from processor.utils import catalog
+from processor.utils.watcher import DirectoryWatcher, INotify, SettledFiles
+from processor.utils.stats import downsample_matrix, matrix_statistics, quantize_matrix
+from processor.utils.scan_csv import parse_matrix
+from processor.utils.result_cache import ResultCache
+from processor.utils.datacube import CUBE_LAYOUT, CUBE_NODATA, DataCube, dequantize, scan_durations
+from processor.utils.cube_index import append_index
+from processor.utils.coordinates import _utm_proj
+from processor.utils.zonal import geojson_zones, geometry_rings, rasterize, zonal_series
+from processor.utils.accumulation import RollingAccumulation, SliceReader
+from processor.utils import loop
+from processor.utils.zip_archive import ZIP32_LIMIT, ZIP32_MAX_MEMBERS, ZipArchive, archive_response, parse_range
+from processor.utils.bundles import bundle_name, catalog_signature, write_bundle
+from processor.models import RainMapImage, XmprData as ProcessorXmprData
+from datasets.models import XmprData as DatasetXmprData
+from datasets.schema import XmprDataType
+from processor.views import radar_tile
+from processor import tasks
+from processor.tasks import _bulk_insert
+from xris.celery import app as celery_app
 
-# Create your tests here.
+
+def write_scan_csv(path, n_beams=360, n_gates=150, dr=200.0, oset=-5.3, seed=0):
+    """
+    Writes a synthetic radar scan CSV with jittered, unsorted beam azimuths.
+    """
+    rng = np.random.default_rng(seed)
+    azi = (np.arange(n_beams) + 0.5) * 360.0 / n_beams + rng.uniform(-0.2, 0.2, n_beams)
+    azi = np.roll(azi, n_beams // 3)
+    rain = rng.gamma(0.6, 6.0, size=(n_gates - 1, n_beams))
+    rain *= rng.uniform(size=rain.shape) > 0.4
+
+    with open(path, "w") as fh:
+        fh.write("20241222_100000_PPI,rain\n2.155930\n102.732700\n")
+        fh.write(f"{n_beams}\n{n_gates}\n{dr}\n{oset}\n")
+        fh.write(",".join(f"{a:.3f}" for a in azi) + "\n")
+        fh.write(",".join("1.50" for _ in azi) + "\n")
+        for row in rain:
+            fh.write(",".join(f"{v:.2f}" for v in row) + "\n")
+
+
+def read_mesh(path):
+    with open(path) as fh:
+        header = dict(fh.readline().split(":") for _ in range(6))
+    return {k: float(v) for k, v in header.items()}, np.loadtxt(path, skiprows=6)
+
+
+def polar2mesh_available():
+    return os.access(settings.POLAR2MESH_PATH, os.X_OK)
+
+
+@skipUnless(polar2mesh_available(), "polar2mesh binary not available")
+class Polar2MeshParityTests(SimpleTestCase):
+    """
+    The in-process engine must reproduce the Fortran mesh (f0.3 precision).
+    """
+
+    GEOMETRIES = [
+        dict(n_beams=360, n_gates=150, dr=200.0, oset=-5.3, seed=1),
+        dict(n_beams=400, n_gates=300, dr=100.0, oset=17.0, seed=2),
+        dict(n_beams=512, n_gates=121, dr=250.0, oset=355.0, seed=3),
+    ]
+
+    def run_fortran(self, csv_path, tmp):
+        ssv_path = os.path.join(tmp, "polar")
+        mesh_path = os.path.join(tmp, "mesh_fortran")
+        with open(csv_path) as src, open(ssv_path, "w") as dst:
+            dst.write(src.read().replace(",", " "))
+        subprocess.run([str(settings.POLAR2MESH_PATH), ssv_path, mesh_path],
+                       check=True, capture_output=True)
+        return read_mesh(mesh_path)
+
+    def test_matches_fortran_mesh(self):
+        for geometry in self.GEOMETRIES:
+            with self.subTest(**geometry), tempfile.TemporaryDirectory() as tmp:
+                csv_path = os.path.join(tmp, "scan.csv")
+                write_scan_csv(csv_path, **geometry)
+                ref_header, ref_data = self.run_fortran(csv_path, tmp)
+
+                mesh = polar2mesh(read_polar_scan(csv_path))
+                mesh_path = os.path.join(tmp, "mesh_numpy")
+                write_mesh(mesh, mesh_path)
+                header, data = read_mesh(mesh_path)
+
+                self.assertEqual(header, ref_header)
+                self.assertEqual(data.shape, ref_data.shape)
+                np.testing.assert_allclose(mesh["data"], ref_data, rtol=0, atol=1e-3 + 1e-9)
+                np.testing.assert_array_equal(data, mesh["data"])
+                self.assertTrue(np.array_equal(ref_data == -1.0, data == -1.0))
+
+
+def gdal_available():
+    try:
+        from osgeo import gdal
+    except ImportError:
+        return False
+    return gdal.GetDriverByName("GTiff") is not None
+
+
+@skipUnless(gdal_available(), "GDAL not available")
+class PipelineParityTests(TestCase):
+    """
+    PROCESSOR_PIPELINE = "memory" must write the same GeoTIFF and PNG as the disk pipeline.
+    """
+
+    def run_pipeline(self, pipeline, csv_path):
+        from osgeo import gdal
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        os.makedirs(os.path.join(media.name, "csv"))
+        with open(csv_path) as src, open(os.path.join(media.name, "csv", os.path.basename(csv_path)), "w") as dst:
+            dst.write(src.read())
+
+        with override_settings(MEDIA_ROOT=media.name, PROCESSOR_PIPELINE=pipeline, POLAR2MESH_ENGINE="numpy",
+                               GEOTIFF_PROFILE="gtiff", DATACUBE_ENABLED=False):
+            self.assertEqual(tasks.process_csv_file(f"csv/{os.path.basename(csv_path)}"), 1)
+        ProcessorXmprData.objects.all().delete()
+
+        day = os.path.join("2024", "12", "22")
+        ds = gdal.Open(os.path.join(media.name, "images", "tif", day, "20241222_100000_PPI.tif"))
+        try:
+            geotransform, data = ds.GetGeoTransform(), ds.GetRasterBand(1).ReadAsArray()
+        finally:
+            ds = None
+        with open(os.path.join(media.name, "images", "png", day, "20241222_100000_PPI.png"), "rb") as fh:
+            png = fh.read()
+        return geotransform, data, png
+
+    def test_memory_matches_disk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "20241222_100000_PPI.csv")
+            write_scan_csv(csv_path, seed=4)
+            disk = self.run_pipeline("disk", csv_path)
+            memory = self.run_pipeline("memory", csv_path)
+
+        self.assertEqual(memory[0], disk[0])
+        np.testing.assert_array_equal(memory[1], disk[1])
+        self.assertEqual(memory[2], disk[2])
+
+
+class Polar2MeshWeightCacheTests(SimpleTestCase):
+    def setUp(self):
+        p2m._WEIGHT_CACHE.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def scan(self, **geometry):
+        csv_path = os.path.join(self.tmp.name, "scan.csv")
+        write_scan_csv(csv_path, **geometry)
+        return read_polar_scan(csv_path)
+
+    def test_cached_weights_give_identical_mesh(self):
+        scan = self.scan(seed=4)
+        cache_dir = os.path.join(self.tmp.name, "weights")
+        fresh = polar2mesh(scan, cache_dir)["data"]
+
+        p2m._WEIGHT_CACHE.clear()
+        from_disk = polar2mesh(scan, cache_dir)["data"]
+        from_memory = polar2mesh(scan, cache_dir)["data"]
+
+        self.assertEqual(os.listdir(cache_dir), [p2m.geometry_key(scan)])
+        np.testing.assert_array_equal(fresh, from_disk)
+        np.testing.assert_array_equal(fresh, from_memory)
+
+    def test_azimuths_share_the_tables(self):
+        scan = self.scan(seed=5)
+        moved = dict(scan, oset=scan["oset"] + 1.0)
+        jittered = dict(scan, azi=scan["azi"] + 0.01)
+        longer = dict(scan, nr=scan["nr"] + 1)
+
+        keys = {p2m.geometry_key(s) for s in (scan, moved, jittered)}
+        self.assertEqual(len(keys), 1)
+        self.assertNotIn(p2m.geometry_key(longer), keys)
+
+        cold = [polar2mesh(s)["data"] for s in (moved, jittered)]
+        p2m._WEIGHT_CACHE.clear()
+        polar2mesh(scan)
+        np.testing.assert_array_equal(polar2mesh(moved)["data"], cold[0])
+        np.testing.assert_array_equal(polar2mesh(jittered)["data"], cold[1])
+
+    def test_cache_dir_keeps_recent_geometries(self):
+        cache_dir = os.path.join(self.tmp.name, "weights")
+        scans = [self.scan(n_beams=n, n_gates=20) for n in range(8, 8 + p2m.WEIGHT_DIR_SIZE + 2)]
+        for i, scan in enumerate(scans):
+            polar2mesh(scan, cache_dir)
+            os.utime(os.path.join(cache_dir, p2m.geometry_key(scan)), (i, i))
+
+        kept = {p2m.geometry_key(s) for s in scans[2:]}
+        self.assertEqual(set(os.listdir(cache_dir)), kept)
+
+
+def legacy_ascii2img(data, png_path, alpha=200):
+    """
+    The original per-pixel renderer, kept as the reference implementation.
+    """
+    rows, cols = data.shape
+    img = Image.new("RGBA", (cols, rows), (0, 0, 0, 0))
+    pixels = img.load()
+    for y in range(rows):
+        for x in range(cols):
+            val = data[y, x]
+            if val <= 0:
+                pixels[x, y] = (0, 0, 0, 0)
+            else:
+                r, g, b = get_color(val)
+                pixels[x, y] = (r, g, b, alpha)
+    img.save(png_path, "PNG")
+
+
+class RainfallRendererTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def assert_pixel_identical(self, data, alpha=200):
+        ref_path = os.path.join(self.tmp.name, "legacy.png")
+        new_path = os.path.join(self.tmp.name, "vectorized.png")
+        legacy_ascii2img(data, ref_path, alpha)
+        ascii2img(data, new_path, alpha)
+
+        with Image.open(ref_path) as ref, Image.open(new_path) as new:
+            self.assertEqual(new.size, ref.size)
+            self.assertEqual(new.mode, "P")
+            self.assertIn("transparency", new.info)
+            np.testing.assert_array_equal(
+                np.asarray(new.convert("RGBA")), np.asarray(ref.convert("RGBA"))
+            )
+
+    def test_threshold_edges(self):
+        edges = [-1.0, -0.0, 0.0, 1e-9, 0.5, 1.0, 4.999, 5.0, 10.0, 19.999, 20.0,
+                 30.0, 49.999, 50.0, 79.999, 80.0, 500.0, np.nan, np.inf]
+        self.assert_pixel_identical(np.array(edges, dtype=np.float64).reshape(1, -1))
+
+    def test_random_mesh(self):
+        rng = np.random.default_rng(7)
+        data = np.round(rng.gamma(0.5, 12.0, size=(121, 97)), 3)
+        data[rng.uniform(size=data.shape) < 0.3] = -1.0
+        data[rng.uniform(size=data.shape) < 0.1] = 0.0
+        self.assert_pixel_identical(data)
+        self.assert_pixel_identical(data, alpha=255)
+
+    def test_polar2mesh_output(self):
+        csv_path = os.path.join(self.tmp.name, "scan.csv")
+        write_scan_csv(csv_path, n_beams=180, n_gates=60, dr=250.0, seed=8)
+        self.assert_pixel_identical(polar2mesh(read_polar_scan(csv_path))["data"])
+
+    def test_png_bytes_match_file(self):
+        data = np.array([[0.0, 0.5, 12.0], [80.0, -1.0, 3.0]])
+        png_path = os.path.join(self.tmp.name, "overlay.png")
+        ascii2img(data, png_path)
+
+        with open(png_path, "rb") as fh:
+            self.assertEqual(palette_png_bytes(classify(data), palette_lut()), fh.read())
+
+    def test_render_rgba_shape(self):
+        rgba = render_rgba(np.zeros((3, 5)))
+        self.assertEqual(rgba.shape, (3, 5, 4))
+        self.assertFalse(rgba.any())
+
+
+class CatalogWatermarkTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def touch(self, rel_path):
+        path = os.path.join(self.tmp.name, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "w").close()
+        return path
+
+    def test_only_touched_folders_change(self):
+        self.touch("2024/12/21/a.csv")
+        day = os.path.dirname(self.touch("2024/12/22/a.csv"))
+        before = catalog.date_folder_watermarks(self.tmp.name)
+        self.assertEqual(sorted(before), ["2024/12/21", "2024/12/22"])
+
+        self.touch("2024/12/22/b.csv")
+        os.utime(day, ns=(0, before["2024/12/22"] + 1))
+        self.touch("2024/12/23/a.csv")
+        after = catalog.date_folder_watermarks(self.tmp.name)
+
+        self.assertEqual(catalog.changed_date_folders(before, after), {"2024/12/22", "2024/12/23"})
+        self.assertEqual(catalog.changed_date_folders(after, after), set())
+
+        held = catalog.hold_watermarks(after, {"2024/12/23"})
+        self.assertEqual(catalog.changed_date_folders(held, after), {"2024/12/23"})
+
+    def test_manifest_round_trip(self):
+        path = os.path.join(self.tmp.name, "cache", "manifest.json")
+        self.assertEqual(catalog.load_manifest(path)["bases"], {})
+
+        watermarks = {"converted": {"2024/12/22": 123}}
+        catalog.save_manifest(watermarks, path, full=True)
+        self.assertEqual(catalog.load_manifest(path)["bases"], watermarks)
+
+    def test_orphan_report_caps_paths(self):
+        report = catalog.orphan_report()
+        paths = [f"images/png/{i}.png" for i in range(catalog.ORPHAN_SAMPLE_SIZE + 5)]
+        catalog.add_orphans(report, "png_without_csv", paths)
+
+        self.assertEqual(report["png_without_csv"]["count"], len(paths))
+        self.assertEqual(report["png_without_csv"]["paths"], paths[:catalog.ORPHAN_SAMPLE_SIZE])
+        self.assertEqual(report["tiff_without_csv"], {"count": 0, "paths": []})
+
+
+class SettledFilesTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_file_is_ready_once_unchanged(self):
+        path = os.path.join(self.tmp.name, "scan.csv")
+        with open(path, "w") as fh:
+            fh.write("head")
+
+        pending = SettledFiles(settle_seconds=0)
+        pending.add(path)
+        self.assertEqual(pending.ready(), [])  # first look records size/mtime
+
+        with open(path, "a") as fh:
+            fh.write(",rain")
+        self.assertEqual(pending.ready(), [])  # still growing
+
+        self.assertEqual(pending.ready(), [path])
+        self.assertEqual(pending.pending, {})
+
+    def test_vanished_and_empty_files(self):
+        empty = os.path.join(self.tmp.name, "empty.csv")
+        open(empty, "w").close()
+
+        pending = SettledFiles(settle_seconds=0)
+        pending.add(empty)
+        pending.add(os.path.join(self.tmp.name, "gone.csv"))
+        pending.ready()
+
+        self.assertEqual(pending.ready(), [])
+        self.assertEqual(list(pending.pending), [empty])
+
+
+@skipUnless(INotify is not None, "inotify not available")
+class DirectoryWatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_overflow_relists_the_trees(self):
+        from inotify_simple import Event, flags
+
+        watcher = DirectoryWatcher([self.tmp.name], poll_interval=1)
+        os.makedirs(os.path.join(self.tmp.name, "2024/12/22"))
+        path = os.path.join(self.tmp.name, "2024/12/22/scan.csv")
+        with open(path, "w") as fh:
+            fh.write("scan")
+
+        overflow = Event(wd=-1, mask=flags.Q_OVERFLOW, cookie=0, name="")
+        with mock.patch.object(watcher.inotify, "read", return_value=[overflow]):
+            self.assertEqual(watcher.wait(0), [path])
+        self.assertIn(os.path.dirname(path), watcher.watches.values())  # lost folder is watched again
+
+    def test_periodic_sweep(self):
+        path = os.path.join(self.tmp.name, "scan.csv")
+        with open(path, "w") as fh:
+            fh.write("scan")
+        watcher = DirectoryWatcher([self.tmp.name], poll_interval=1, sweep_interval=60)
+        self.assertEqual(watcher.wait(0), [])  # no event, not due yet
+        watcher._swept -= 60
+        self.assertEqual(watcher.wait(0), [path])
+
+
+class MatrixStatisticsTests(SimpleTestCase):
+    def test_distribution_classes(self):
+        arr = np.array([[0.0, 0.5, 1.0, 5.0], [10.0, 20.0, 30.0, 50.0], [80.0, 200.0, 0.0, -1.0]])
+        stats = matrix_statistics(arr)
+
+        self.assertEqual(stats["shape"], [3, 4])
+        self.assertEqual(stats["max"], 200.0)
+        self.assertEqual(stats["nonzero_count"], 10)
+        self.assertEqual(stats["rain_distribution"], {
+            "Extreme": 16.67, "Heavy": 8.33, "Very High": 8.33, "Moderate": 8.33,
+            "Mild": 8.33, "Light": 8.33, "Very Light": 8.33, "None": 25.0,
+        })
+        self.assertEqual(stats["preview"], arr.tolist())
+
+    def test_downsample_block_means(self):
+        arr = np.arange(35, dtype=np.float64).reshape(5, 7)
+        small = downsample_matrix(arr, 3)
+
+        self.assertEqual(small.shape, (2, 3))
+        self.assertAlmostEqual(small[0, 0], arr[:3, :3].mean())
+        self.assertAlmostEqual(small[1, 2], arr[3:, 6:].mean())  # partial edge block
+        self.assertIs(downsample_matrix(arr, 7), arr)
+
+    def test_quantize_round_trip(self):
+        arr = np.array([[0.0, 12.345, np.nan], [80.0, 3.2, 250.0]])
+        codes, info = quantize_matrix(arr, "uint16")
+
+        self.assertEqual(codes.dtype, np.uint16)
+        self.assertEqual(codes[0, 2], info["nodata"])
+        restored = info["offset"] + codes.astype(np.float64) * info["scale"]
+        valid = np.isfinite(arr)
+        self.assertLessEqual(np.abs(restored[valid] - arr[valid]).max(), info["scale"] / 2 + 1e-9)
+
+
+class ScanCsvParserTests(SimpleTestCase):
+    HEADER = ["20241222_100000_PPI,rain", "2.1", "102.7", "4", "5", "250", "0", "1,2,3,4", "1,1,1,1", "0,0,0,0"]
+
+    def assert_same_as_token_reader(self, body, fill_value=0.0):
+        lines = self.HEADER + body
+        fast = parse_matrix(lines, fill_value)
+        np.testing.assert_array_equal(fast, parse_matrix(lines, fill_value, fast=False))
+        return fast
+
+    def test_regular_block(self):
+        arr = self.assert_same_as_token_reader(["1.5,0,2,3,", "", "4\t5,6,7.25"])
+        self.assertEqual(arr.shape, (2, 4))
+
+    def test_ragged_rows_are_filled(self):
+        arr = self.assert_same_as_token_reader(["1,2,3,4", "5,6", "7,8,9"], fill_value=-1.0)
+        np.testing.assert_array_equal(arr[1], [5, 6, -1, -1])
+
+    def test_non_numeric_tokens_are_dropped(self):
+        arr = self.assert_same_as_token_reader(["1,,2,x,3", "end", "4,5,6"])
+        np.testing.assert_array_equal(arr, [[1, 2, 3], [4, 5, 6]])
+
+    def test_synthetic_scan(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "scan.csv")
+            write_scan_csv(csv_path, seed=9)
+            with open(csv_path) as fh:
+                lines = fh.read().splitlines()
+
+        arr = parse_matrix(lines)
+        self.assertEqual(arr.shape, (148, 360))
+        np.testing.assert_array_equal(arr, parse_matrix(lines, fast=False))
+
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'analysis': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'analysis'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResultCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(3):
+            self.paths.append(os.path.join(self.tmp.name, f"{i}.csv"))
+            with open(self.paths[-1], "w") as fh:
+                fh.write(f"{i}\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_cache(self, local_max_bytes=10_000):
+        return ResultCache("test", "analysis", local_max_bytes, max_item_bytes=5_000, timeout=60)
+
+    def test_tiers_and_counters(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return np.arange(10)
+
+        first = self.make_cache()
+        np.testing.assert_array_equal(first.get_or_compute(self.paths[0], "v", compute), np.arange(10))
+        first.get_or_compute(self.paths[0], "v", compute)
+        # another process: misses its own LRU but finds the shared tier
+        self.make_cache().get_or_compute(self.paths[0], "v", compute)
+
+        self.assertEqual(len(calls), 1)
+        stats = first.stats()
+        self.assertEqual((stats["local_hits"], stats["misses"]), (1, 1))
+
+    def test_rewritten_file_is_a_new_key(self):
+        cache = self.make_cache()
+        self.assertEqual(cache.get_or_compute(self.paths[0], "v", lambda: "old"), "old")
+        with open(self.paths[0], "w") as fh:
+            fh.write("changed\n")
+        self.assertEqual(cache.get_or_compute(self.paths[0], "v", lambda: "new"), "new")
+
+    def test_local_byte_budget(self):
+        cache = self.make_cache(local_max_bytes=3_000)
+        for path in self.paths:
+            cache.get_or_compute(path, "v", lambda: b"x" * 1_200)
+
+        self.assertLessEqual(cache._local_bytes, 3_000)
+        self.assertEqual(len(cache._local), 2)  # the oldest entry was evicted
+
+    def test_stats_without_redis(self):
+        with mock.patch("processor.utils.result_cache.cache.get_many", side_effect=ConnectionError("down")):
+            stats = self.make_cache().stats()
+
+        self.assertEqual((stats["lookups"], stats["hit_rate"]), (0, 0.0))
+
+
+class DataCubeTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cube = DataCube(self.tmp.name, radius_cells=2, slots=3, block=4)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def scan_time(self, minute):
+        return make_aware(datetime(2024, 12, 22, 10, minute))
+
+    def test_append_and_window(self):
+        big = np.arange(49, dtype=np.float64).reshape(7, 7)   # cropped to the 5x5 grid
+        small = np.array([[1.0, 2.0, 3.0], [4.0, -1.0, 6.0], [7.0, 8.0, 9.0]])  # padded
+        self.assertEqual(self.cube.append(self.scan_time(10), big), 0)
+        self.assertEqual(self.cube.append(self.scan_time(5), small), 1)  # out of order
+        self.assertEqual(self.cube.append(self.scan_time(10), big * 2), 0)  # reprocessed scan
+
+        (grid, stamps, offsets, cube), = self.cube.window(self.scan_time(0), self.scan_time(30))
+        self.assertEqual(cube.shape, (2, 2, 3, 4, 4))  # 2x2 tiles of 4x4 cells, 3 slots
+        self.assertEqual(offsets.tolist(), [1, 0])
+        np.testing.assert_allclose(dequantize(DataCube.slice_at(grid, cube, 0)), big[1:6, 1:6] * 2)
+        small_slice = DataCube.slice_at(grid, cube, 1)
+        self.assertEqual(small_slice[0, 0], CUBE_NODATA)
+        self.assertTrue(np.isnan(dequantize(small_slice)[2, 2]))  # mesh nodata
+        self.assertEqual(dequantize(small_slice)[1, 3], 3.0)
+
+        self.cube.append(self.scan_time(15), small)
+        with self.assertRaises(ValueError):
+            self.cube.append(self.scan_time(20), small)  # no slot left
+
+    def write_layout1_day(self):
+        # a slice-major day as first written: no layout / block / slots in the .json
+        paths = self.cube.paths(self.scan_time(0).date())
+        os.makedirs(os.path.dirname(paths["u16"]))
+        grid = {k: v for k, v in self.cube.grid.items() if k not in ("layout", "block", "slots")}
+        with open(paths["json"], "w") as fh:
+            json.dump(grid, fh)
+        slices = [self.cube.embed(np.full((5, 5), float(m))) for m in (10, 5)]
+        np.stack(slices).tofile(paths["u16"])
+        append_index(paths["idx"], int(self.scan_time(10).timestamp()))
+        append_index(paths["idx"], int(self.scan_time(5).timestamp()))
+        return paths
+
+    def test_older_layout_is_rebuilt_on_append(self):
+        paths = self.write_layout1_day()
+        # reads skip the day rather than rewrite it
+        self.assertEqual(list(self.cube.window(self.scan_time(0), self.scan_time(30))), [])
+
+        self.assertEqual(self.cube.append(self.scan_time(15), np.full((5, 5), 15.0)), 2)
+        (grid, stamps, offsets, cube), = self.cube.window(self.scan_time(0), self.scan_time(30))
+        self.assertEqual((grid["layout"], cube.shape), (CUBE_LAYOUT, (2, 2, 3, 4, 4)))
+        self.assertEqual(offsets.tolist(), [1, 0, 2])
+        np.testing.assert_allclose(dequantize(DataCube.slice_at(grid, cube, 1)), 5.0)
+        np.testing.assert_allclose(dequantize(DataCube.slice_at(grid, cube, 2)), 15.0)
+
+        with open(paths["json"], "w") as fh:
+            json.dump({**grid, "layout": 99}, fh)
+        with self.assertRaises(ValueError):
+            self.cube.append(self.scan_time(20), np.zeros((5, 5)))
+
+    def test_upgrade(self):
+        self.write_layout1_day()
+        day = self.scan_time(0).date()
+        self.assertTrue(self.cube.upgrade(day))
+        self.assertFalse(self.cube.upgrade(day))
+        self.assertFalse(self.cube.upgrade(day + timedelta(days=1)))  # nothing stored
+
+        (grid, stamps, offsets, cube), = self.cube.window(self.scan_time(0), self.scan_time(30))
+        self.assertEqual(offsets.tolist(), [1, 0])
+        np.testing.assert_allclose(dequantize(DataCube.slice_at(grid, cube, 0)), 10.0)
+
+    def test_point_series(self):
+        for minute in (10, 0, 5):
+            self.cube.append(self.scan_time(minute), np.full((5, 5), float(minute)))
+        grid = self.cube.grid
+        x = [grid["west"] + 450, grid["west"] - 1]  # column 4, outside
+        y = [grid["north"] - 450, grid["north"] - 50]  # row 4
+
+        stamps, values = self.cube.point_series(x, y, self.scan_time(0), self.scan_time(7))
+        self.assertEqual(values.shape, (2, 2))
+        np.testing.assert_array_equal(values[:, 0], [0.0, 5.0])
+        self.assertTrue(np.isnan(values[:, 1]).all())
+        self.assertEqual(stamps.tolist(), [int(self.scan_time(m).timestamp()) for m in (0, 5)])
+
+    def test_cells(self):
+        grid = self.cube.grid
+        x = [grid["west"] + 50, grid["west"] + 450, grid["west"] - 1]
+        y = [grid["north"] - 50, grid["north"] - 250, grid["north"] - 50]
+        row, col, inside = DataCube.cells(grid, x, y)
+        self.assertEqual(row[:2].tolist(), [0, 2])
+        self.assertEqual(col[:2].tolist(), [0, 4])
+        self.assertEqual(inside.tolist(), [True, True, False])
+
+    def test_scan_durations(self):
+        np.testing.assert_array_equal(scan_durations([0, 300, 600, 4200]), [300, 300, 300, 600])
+        np.testing.assert_array_equal(scan_durations([900], previous=600), [300])
+
+    def test_rasterize_with_hole(self):
+        grid = self.cube.grid
+        w, n = grid["west"], grid["north"]
+        outer = np.array([[w, n], [w + 500, n], [w + 500, n - 500], [w, n - 500]])
+        hole = np.array([[w + 100, n - 100], [w + 400, n - 100], [w + 400, n - 400], [w + 100, n - 400]])
+        self.assertEqual(len(rasterize([outer], grid)), 25)
+        inner = rasterize([outer, hole], grid)
+        self.assertEqual(len(inner), 16)
+        self.assertNotIn(12, inner.tolist())  # centre cell lies in the hole
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_zonal_series(self):
+        for minute in (0, 5, 10):
+            data = np.zeros((5, 5))
+            data[:, :2] = minute  # wet western columns
+            self.cube.append(self.scan_time(minute), data)
+        grid = self.cube.grid
+        proj = _utm_proj(grid["epsg"] - 32600)
+        x = grid["west"] + np.array([0, 200, 200, 0, 0])
+        y = grid["north"] - np.array([0, 0, 500, 500, 0])
+        lon, lat = proj(x, y, inverse=True)
+        zones = geojson_zones({"type": "FeatureCollection", "features": [
+            {"type": "Feature", "properties": {"name": "west"},
+             "geometry": {"type": "Polygon", "coordinates": [np.column_stack([lon, lat]).tolist()]}},
+            {"type": "Feature", "properties": {},
+             "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1]]]}},  # off the grid
+        ]})
+        self.assertEqual([zone["id"] for zone in zones], ["west", 1])
+
+        result = zonal_series(self.cube, [zone["geometry"] for zone in zones], self.scan_time(0), self.scan_time(10))
+        self.assertEqual(result["cells"].tolist(), [10, 0])
+        np.testing.assert_allclose(result["mean"][0], [0, 5, 10])
+        np.testing.assert_allclose(result["coverage"][0], [0, 100, 100])
+        self.assertTrue(np.isnan(result["max"][1]).all())
+        self.assertAlmostEqual(result["accumulated_mm"][0], (5 + 10) / 12, places=4)
+
+        for ring in ([[0, 0], [1, 95], [1, 1]], [[0, 0], [float("nan"), 0], [1, 1]]):
+            with self.assertRaises(ValueError):
+                geometry_rings({"type": "Polygon", "coordinates": [ring]})
+
+
+class RollingAccumulationTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cube = DataCube(os.path.join(self.tmp.name, "cube"), radius_cells=2, slots=40, block=4)
+        self.t0 = int(make_aware(datetime(2024, 12, 22, 10, 0)).timestamp())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add_scan(self, minute):
+        data = np.full((5, 5), float(minute % 7))
+        data[0, 0] = -1  # outside the radar range
+        self.cube.append(datetime.fromtimestamp(self.t0 + minute * 60).astimezone(), data)
+        return self.t0 + minute * 60
+
+    def recompute(self, stamps, end, hours=1):
+        fresh = RollingAccumulation(self.tmp.name, hours, self.cube.grid)
+        fresh.sync(np.array(sorted(stamps)), end, SliceReader(self.cube))
+        return fresh.data
+
+    def test_incremental_matches_recompute(self):
+        acc = RollingAccumulation(self.tmp.name, 1, self.cube.grid)
+        stamps = [self.add_scan(m) for m in range(0, 60, 5)]
+        acc.sync(np.array(stamps), stamps[-1], SliceReader(self.cube))
+        np.testing.assert_allclose(acc.data, self.recompute(stamps, stamps[-1]))
+        self.assertTrue(np.isnan(acc.data[0, 0]))
+
+        stamps += [self.add_scan(m) for m in (65, 70, 90)]  # first scans expire
+        stamps.append(self.add_scan(62))  # late scan splits an interval
+        reads = acc.sync(np.array(sorted(stamps)), stamps[-2], SliceReader(self.cube))
+        self.assertLess(reads, len(stamps))
+        np.testing.assert_allclose(acc.data, self.recompute(stamps, stamps[-2]), atol=1e-9)
+
+        acc.save()
+        loaded = RollingAccumulation(self.tmp.name, 1, self.cube.grid).load()
+        self.assertEqual(loaded.members, acc.members)
+        np.testing.assert_array_equal(loaded.data, acc.data)
+
+    def test_depth_is_rate_times_interval(self):
+        stamps = [self.add_scan(m) for m in (0, 10, 40)]  # 40: gap capped at 10 minutes
+        data = self.recompute(stamps, stamps[-1])
+        # first scan: median interval (20 min, capped to 10) x 0 mm/h; 3 mm/h x 10 min; 5 mm/h x 10 min
+        self.assertAlmostEqual(float(data[1, 1]), 3 / 6 + 5 / 6, places=5)
+
+
+class RadarLoopTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(4)
+        self.data = rng.gamma(0.6, 20.0, size=(40, 40)) * (rng.uniform(size=(40, 40)) > 0.5)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_png_frame_recovers_classes(self):
+        for indexed in (True, False):
+            path = os.path.join(self.tmp.name, f"{indexed}.png")
+            ascii2img(self.data, path, indexed=indexed)
+            np.testing.assert_array_equal(loop.png_frame(path, 40), classify(self.data))
+        self.assertEqual(loop.png_frame(path, 20).shape, (20, 20))
+
+    def test_rerendered_png_is_a_new_version(self):
+        path = os.path.join(self.tmp.name, "a.png")
+        ascii2img(self.data, path)
+        before = loop.loop_version([(1, "a.png", *loop.png_stamp(path))], 40, 200)
+        ascii2img(self.data * 2, path)
+        os.utime(path, ns=(0, 0))
+        self.assertNotEqual(loop.loop_version([(1, "a.png", *loop.png_stamp(path))], 40, 200), before)
+        self.assertEqual(loop.png_stamp(os.path.join(self.tmp.name, "missing.png")), (None, None))
+
+    def test_write_loop_and_prune(self):
+        frames = [classify(self.data * k) for k in (0.5, 1, 2)]
+        times = [make_aware(datetime(2024, 12, 22, 10, m)) for m in (0, 5, 10)]
+        version = loop.loop_version([(1, "a.png"), (2, "b.png"), (3, "c.png")], 40, 200)
+        manifest = loop.write_loop(self.tmp.name, version, frames, times, frame_ms=200, columns=2)
+
+        self.assertEqual(loop.read_latest(self.tmp.name), manifest)
+        with Image.open(os.path.join(self.tmp.name, version, "loop.webp")) as img:
+            self.assertEqual((img.n_frames, img.size), (3, (40, 40)))
+        with Image.open(os.path.join(self.tmp.name, version, "loop.gif")) as img:
+            self.assertEqual(img.n_frames, 3)
+        with Image.open(os.path.join(self.tmp.name, version, "strip.png")) as img:
+            self.assertEqual(img.size, (80, 80))  # 2 columns x 2 rows
+            np.testing.assert_array_equal(np.asarray(img)[40:, :40], frames[2])
+
+        other = loop.loop_version([(2, "b.png"), (3, "c.png")], 40, 200)
+        self.assertNotEqual(other, version)
+        loop.write_loop(self.tmp.name, other, frames[1:], times[1:], frame_ms=200, columns=2)
+        os.utime(os.path.join(self.tmp.name, version), (0, 0))
+        self.assertEqual(loop.prune_loops(self.tmp.name, keep=1), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, version)))
+
+
+class ArchiveReader(io.RawIOBase):
+    """
+    Seekable file over a stored archive's byte ranges (nothing materialized).
+    """
+
+    def __init__(self, archive):
+        self.archive, self.pos = archive, 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=0):
+        self.pos = (0, self.pos, self.archive.size)[whence] + offset
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def readinto(self, buffer):
+        data = b"".join(self.archive.iter_range(self.pos, min(self.pos + len(buffer), self.archive.size)))
+        buffer[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+
+class ZipArchiveTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(5)
+        self.files = {}
+        for name, data in [
+            ("scan.png", rng.bytes(70_000)),
+            ("scan.tiff", rng.bytes(3_000_000)),
+            ("scan.csv", b"1.00,0.00,2.50\n" * 20_000),
+        ]:
+            self.files[name] = data
+            with open(os.path.join(self.tmp.name, name), "wb") as fh:
+                fh.write(data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, names, deflate_level=6):
+        archive = ZipArchive(deflate_level=deflate_level)
+        when = datetime(2024, 12, 22, 10, 5, 30)
+        for name in names:
+            self.assertTrue(archive.add(os.path.join(self.tmp.name, name), f"2024/12/22/{name}", when))
+        self.assertFalse(archive.add(os.path.join(self.tmp.name, "missing.png"), "missing.png"))
+        return archive, b"".join(archive)
+
+    def test_stored_archive_is_sized_up_front(self):
+        archive, data = self.build(["scan.png", "scan.tiff"])
+        self.assertEqual(archive.size, len(data))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertIsNone(zf.testzip())
+            for info in zf.infolist():
+                self.assertEqual(info.compress_type, zipfile.ZIP_STORED)
+                self.assertEqual(info.date_time, (2024, 12, 22, 10, 5, 30))
+                self.assertEqual(zf.read(info), self.files[os.path.basename(info.filename)])
+
+    def test_csv_is_deflated(self):
+        archive, data = self.build(["scan.csv", "scan.png"])
+        self.assertIsNone(archive.size)
+        self.assertLess(len(data), len(self.files["scan.csv"]))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertEqual(zf.getinfo("2024/12/22/scan.csv").compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(zf.read("2024/12/22/scan.csv"), self.files["scan.csv"])
+
+        archive, data = self.build(["scan.csv"], deflate_level=0)
+        self.assertEqual(archive.size, len(data))
+
+    def test_ranges_match_the_full_stream(self):
+        names = ["scan.png", "scan.tiff", "scan.csv"]
+        _, data = self.build(names, deflate_level=0)
+        size = len(data)
+        for start, stop in [(0, size), (10, 5000), (70_100, 3_100_000), (size - 200, size), (size - 1, size)]:
+            archive, _ = self.build(names, deflate_level=0)  # fresh: CRCs are read from the files
+            self.assertEqual(b"".join(archive.iter_range(start, stop)), data[start:stop])
+
+        self.assertEqual(parse_range("bytes=100-", size), (100, size))
+        self.assertEqual(parse_range("bytes=-100", size), (size - 100, size))
+        self.assertEqual(parse_range("bytes=5-9", size), (5, 10))
+        self.assertFalse(parse_range(f"bytes={size}-", size))
+        self.assertIsNone(parse_range("bytes=0-1,5-9", size))
+
+    def test_archive_response_resumes(self):
+        archive, data = self.build(["scan.png", "scan.tiff"])
+        factory, started = RequestFactory(), []
+
+        response = archive_response(factory.get("/"), archive, "a.zip", on_start=lambda: started.append(1))
+        self.assertEqual((response.status_code, int(response["Content-Length"])), (200, len(data)))
+        self.assertEqual(b"".join(response.streaming_content), data)
+
+        request = factory.get("/", HTTP_RANGE="bytes=1000-", HTTP_IF_RANGE=archive.etag)
+        response = archive_response(request, archive, "a.zip", on_start=lambda: started.append(2))
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 1000-{len(data) - 1}/{len(data)}")
+        self.assertEqual(b"".join(response.streaming_content), data[1000:])
+        self.assertEqual(started, [1])  # resumed ranges are not logged again
+
+        request = factory.get("/", HTTP_RANGE="bytes=1000-", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(archive_response(request, archive, "a.zip").status_code, 200)
+        request = factory.get("/", HTTP_RANGE=f"bytes={len(data)}-")
+        self.assertEqual(archive_response(request, archive, "a.zip").status_code, 416)
+
+    def test_zip64_member_count(self):
+        path = os.path.join(self.tmp.name, "tiny.txt")
+        with open(path, "wb") as fh:
+            fh.write(b"abc")
+        archive = ZipArchive(deflate_level=0)
+        for i in range(ZIP32_MAX_MEMBERS + 1):
+            archive.add(path, f"{i:05d}.txt")
+
+        data = b"".join(archive)
+        self.assertEqual(archive.size, len(data))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertEqual(len(zf.infolist()), ZIP32_MAX_MEMBERS + 1)
+            self.assertEqual(zf.read("65535.txt"), b"abc")
+
+    def test_zip64_sizes_and_offsets(self):
+        big = os.path.join(self.tmp.name, "big.tiff")
+        with open(big, "wb") as fh:
+            fh.truncate(ZIP32_LIMIT + 1)  # sparse
+        archive = ZipArchive()
+        when = datetime(2024, 12, 22, 10, 5, 30)
+        archive.add(big, "big.tiff", when)
+        archive.add(os.path.join(self.tmp.name, "scan.png"), "scan.png", when)
+        archive._crcs[0] = 0  # not read below: only the directory and the second member are
+
+        with zipfile.ZipFile(ArchiveReader(archive)) as zf:
+            self.assertEqual(zf.getinfo("big.tiff").file_size, ZIP32_LIMIT + 1)
+            self.assertGreater(zf.getinfo("scan.png").header_offset, ZIP32_LIMIT)
+            self.assertEqual(zf.read("scan.png"), self.files["scan.png"])
+
+    def test_write_bundle(self):
+        rows = [(1, datetime(2024, 12, 22, 10, 0), "a.png"), (2, datetime(2024, 12, 22, 10, 5), "b.png")]
+        signature = catalog_signature(rows)
+        self.assertNotEqual(catalog_signature(rows[:1]), signature)
+        rel_path = bundle_name("rainmap", datetime(2024, 12, 22).date(), False, signature)
+        self.assertEqual(rel_path, os.path.join("2024", "12", f"rainmap_20241222_{signature[:12]}.zip"))
+
+        archive, data = self.build(["scan.png", "scan.tiff"])
+        root = os.path.join(self.tmp.name, "bundles")
+        self.assertEqual(write_bundle(root, rel_path, archive), len(data))
+        with open(os.path.join(root, rel_path), "rb") as fh:
+            self.assertEqual(fh.read(), data)
+        self.assertEqual(os.listdir(os.path.join(root, "2024", "12")), [os.path.basename(rel_path)])
+
+
+class CatalogInsertTests(TestCase):
+    def test_bulk_insert_reports_only_new_rows(self):
+        when = make_aware(datetime(2024, 12, 22, 10, 0))
+        rows = [{"time": when, "image": f"RainMAP_JPEG/2024/12/22/{i}.jpg"} for i in range(5)]
+        first = _bulk_insert(RainMapImage, rows[:3] + rows[:1], batch_size=2)  # a repeat within the run
+        self.assertEqual(len(first), 3)
+        self.assertEqual(sorted(first), sorted(RainMapImage.objects.values_list("id", flat=True)))
+
+        second = _bulk_insert(RainMapImage, rows, batch_size=2)
+        self.assertEqual(
+            sorted(RainMapImage.objects.filter(id__in=second).values_list("image", flat=True)),
+            [row["image"] for row in rows[3:]],
+        )
+        self.assertIsNotNone(RainMapImage.objects.get(id=second[0]).created_at)
+
+    def test_blank_paths_may_repeat(self):
+        when = make_aware(datetime(2024, 12, 22, 10, 0))
+        rows = [{"time": when, "csv": f"c/{i}.csv", "image": "", "geotiff": ""} for i in range(3)]
+        self.assertEqual(len(_bulk_insert(ProcessorXmprData, rows, batch_size=500)), 3)
+
+
+class UniquePathsMigrationTests(TransactionTestCase):
+    migrate_from = ("processor", "0003_rainmapimage_rainmapdownloadlog")
+    migrate_to = ("processor", "0004_unique_paths")
+
+    def test_duplicates_removed_and_logs_kept(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.migrate_from])
+        apps = executor.loader.project_state([self.migrate_from]).apps
+        RainMapImage, XmprData = apps.get_model("processor", "RainMapImage"), apps.get_model("processor", "XmprData")
+        RainMapDownloadLog = apps.get_model("processor", "RainMapDownloadLog")
+
+        when = make_aware(datetime(2024, 12, 22, 10, 0))
+        kept, extra = (RainMapImage.objects.create(time=when, image="r/a.jpg") for _ in range(2))
+        RainMapDownloadLog.objects.create(rainmap=extra)
+        for i in range(2):
+            XmprData.objects.create(time=when, csv="c/a.csv", image=f"p/{i}.png", geotiff="")
+
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.migrate_to])
+        apps = executor.loader.project_state([self.migrate_to]).apps
+        self.assertEqual(list(apps.get_model("processor", "RainMapImage").objects.values_list("id", flat=True)), [kept.id])
+        self.assertEqual(apps.get_model("processor", "RainMapDownloadLog").objects.get().rainmap_id, kept.id)
+        self.assertEqual(apps.get_model("processor", "XmprData").objects.count(), 1)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ACCUMULATION_HOURS=[], PROCESSOR_BATCH_SIZE=1)
+class CsvDispatchTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.tmp.name))
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", eager)
+        cache.clear()
+        self.paths = []
+        for name in ("20241222_100000_PPI.csv", "20241222_100500_PPI.csv"):
+            self.paths.append(f"csv/2024/12/22/{name}")
+            os.makedirs(os.path.join(self.tmp.name, "csv/2024/12/22"), exist_ok=True)
+            with open(os.path.join(self.tmp.name, self.paths[-1]), "w") as fh:
+                fh.write("scan\n")
+
+    def claims(self):
+        return cache.get_many([f"{tasks.CSV_CLAIM_PREFIX}{rel}" for rel in self.paths])
+
+    def test_chord_moves_and_unclaims(self):
+        results = {self.paths[0]: 1, self.paths[1]: "Processing failed: bad scan"}
+        with mock.patch.object(tasks, "process_csv_file", side_effect=results.get), \
+                mock.patch.object(tasks.scan_and_insert_by_file_key, "run", return_value={}) as scan:
+            tasks.dispatch_csv_files(self.paths)
+
+        summary = scan.call_args.args[0]
+        self.assertEqual((summary["succeeded"], summary["failed_files"]), (1, [self.paths[1]]))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "converted/2024/12/22/20241222_100000_PPI.csv")))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "failed/2024/12/22/20241222_100500_PPI.csv")))
+        self.assertEqual(self.claims(), {})
+
+    def test_claimed_csvs_are_not_dispatched_twice(self):
+        with mock.patch.object(tasks, "chord") as chord:
+            tasks.dispatch_csv_files(self.paths[:1])
+            tasks.dispatch_csv_files(self.paths)
+        (header,), _ = chord.call_args
+        self.assertEqual([sig.args[0] for sig in header], [self.paths[1:]])
+
+        # a batch of an earlier, expired dispatch leaves the CSV to the new owner
+        token = list(self.claims().values())[0]
+        with mock.patch.object(tasks, "process_csv_file", return_value=1) as process:
+            self.assertEqual(tasks.process_csv_batch(self.paths[:1], "stale"), [(self.paths[0], None)])
+            tasks.process_csv_batch(self.paths[:1], token)
+        self.assertEqual(process.call_count, 1)
+
+    def test_failed_batch_releases_claims(self):
+        with mock.patch.object(tasks, "chord") as chord:
+            tasks.dispatch_csv_files(self.paths)
+        callback = chord.return_value.call_args.args[0]
+        self.assertEqual(len(self.claims()), 2)
+
+        # what a worker does when a header task fails: the callback's errbacks run
+        with mock.patch.object(celery_app.backend, "fail_from_current_stack"):
+            celery_app.backend.chord_error_from_stack(callback, RuntimeError("batch failed"))
+        self.assertEqual(self.claims(), {})
+
+
+TILE_CACHES = dict(LOCMEM_CACHES, tiles={'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiles'})
+
+
+@override_settings(CACHES=TILE_CACHES)
+class RadarTileTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        with open(os.path.join(self.media.name, "scan.tif"), "wb") as fh:
+            fh.write(b"tiff")
+        self.scan = DatasetXmprData.objects.create(time=make_aware(datetime(2024, 12, 22)), tiff="scan.tif")
+
+    def test_tile_url_template(self):
+        url = XmprDataType.resolve_tile_url(self.scan, None)
+        self.assertEqual(url, f"/tiles/{self.scan.id}/{{z}}/{{x}}/{{y}}.png")
+        # the placeholders reverse but never resolve to a tile
+        with self.assertRaises(Resolver404):
+            resolve(url)
+
+    def test_renders_uncached_when_cache_is_down(self):
+        broken = mock.Mock(**{"get.side_effect": ConnectionError("down"), "set.side_effect": ConnectionError("down")})
+        with override_settings(MEDIA_ROOT=self.media.name), \
+                mock.patch("processor.views.caches", {"tiles": broken}), \
+                mock.patch("processor.views.render_tile", return_value=b"png") as render, \
+                self.assertLogs("processor.views", "WARNING") as logs:
+            response = radar_tile(RequestFactory().get("/"), self.scan.id, 6, 50, 30)
+        self.assertEqual(len(logs.output), 2)  # the failed get and the failed set
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"png")
+        render.assert_called_once_with(os.path.join(self.media.name, "scan.tif"), 6, 50, 30)
@@ -0,0 +1,203 @@
+import os
+import json
+import fcntl
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from django.utils.timezone import localtime
+from processor.utils.cube_index import offset_of
+from processor.utils.datacube import DataCube, dequantize, scan_durations
+
+# Grid keys an accumulation state must share with the cube slices it sums
+GRID_KEYS = ("rows", "cols", "west", "north", "cellsize", "epsg")
+# Products are written for at most this much backlog; older states jump ahead
+ACCUMULATION_CATCH_UP = timedelta(days=1)
+
+
+def utc(timestamp: int) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+class SliceReader:
+    """
+    Rainfall (mm/h) of single datacube slices by timestamp, keeping each
+    day's memmap open for the duration of an update.
+    """
+
+    def __init__(self, cube: DataCube):
+        self.cube = cube
+        self._days = {}
+
+    def rate(self, timestamp: int) -> np.ndarray | None:
+        day = localtime(utc(timestamp)).date()
+        if day not in self._days:
+            self._days[day] = self.cube.open_day(day)
+        if self._days[day] is None:
+            return None
+        grid, times, mm = self._days[day]
+        offset = offset_of(times, timestamp)
+        if offset is None:
+            return None
+        return dequantize(DataCube.slice_at(grid, mm, offset))
+
+
+class RollingAccumulation:
+    """
+    Rainfall depth (mm) over the `hours` ending at `end`, maintained
+    incrementally: each scan contributes rate x duration (its scan_durations()
+    interval), so moving the window only adds the new slices, subtracts the
+    expired ones and corrects the few whose duration changed (a late scan
+    splits its neighbour's interval). Nothing is ever summed from scratch
+    unless a counted slice disappears from the cube.
+
+    The state is one file, root/{hours}h.npz: the float64 sum, the per-cell
+    count of contributing scans (0 = no data), the members with the seconds
+    they were counted for, the window end and the grid.
+    """
+
+    def __init__(self, root: str, hours: int, grid: dict, max_gap: int = 600):
+        self.root = str(root)
+        self.hours = hours
+        self.grid = {k: grid[k] for k in GRID_KEYS}
+        self.max_gap = max_gap
+        self.reset()
+
+    def reset(self) -> None:
+        self.end = None
+        self.members = {}  # timestamp → seconds counted
+        self.sum = np.zeros((self.grid["rows"], self.grid["cols"]), dtype=np.float64)
+        self.count = np.zeros((self.grid["rows"], self.grid["cols"]), dtype=np.int32)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.root, f"{self.hours}h.npz")
+
+    def load(self) -> "RollingAccumulation":
+        """
+        Reads the saved state; a missing one or one of another grid starts empty.
+        """
+        try:
+            with np.load(self.path) as state:
+                if json.loads(str(state["grid"])) != self.grid:
+                    return self
+                self.sum, self.count = state["sum"], state["count"]
+                self.members = dict(zip(state["stamps"].tolist(), state["seconds"].tolist()))
+                self.end = int(state["end"]) if state["end"] >= 0 else None
+        except (OSError, ValueError, KeyError):
+            self.reset()
+        return self
+
+    def save(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            sum=self.sum,
+            count=self.count,
+            stamps=np.array(list(self.members), dtype=np.int64),
+            seconds=np.array(list(self.members.values()), dtype=np.float64),
+            end=np.int64(-1 if self.end is None else self.end),
+            grid=np.array(json.dumps(self.grid, sort_keys=True)),
+        )
+        os.replace(tmp_path, self.path)
+
+    def target(self, stamps: np.ndarray, end: int) -> dict:
+        """
+        Members of the window (end - hours, end], from all known scan times (ascending).
+        """
+        lo = np.searchsorted(stamps, end - self.hours * 3600, side="right")
+        hi = np.searchsorted(stamps, end, side="right")
+        previous = int(stamps[lo - 1]) if lo > 0 else None
+        durations = scan_durations(stamps[lo:hi], previous, self.max_gap)
+        return dict(zip(stamps[lo:hi].tolist(), durations.tolist()))
+
+    def sync(self, stamps: np.ndarray, end: int, reader: SliceReader) -> int:
+        """
+        Moves the window to end at `end`, reading only the slices whose
+        membership or duration changed.
+
+        Returns:
+            int: Slices read
+        """
+        target = self.target(stamps, end)
+        changed = [
+            ts for ts in sorted(set(self.members) | set(target))
+            if self.members.get(ts, 0.0) != target.get(ts, 0.0)
+        ]
+
+        for ts in changed:
+            rate = reader.rate(ts)
+            if rate is None:
+                return self._rebuild(target, end, reader)
+            self._apply(rate, self.members.get(ts, 0.0), target.get(ts, 0.0))
+
+        self.members, self.end = target, end
+        if not self.members:
+            self.sum[:], self.count[:] = 0.0, 0  # leave no rounding residue behind
+        return len(changed)
+
+    def _rebuild(self, target: dict, end: int, reader: SliceReader) -> int:
+        # a slice vanished from the cube (rebuilt day): sum what is readable afresh
+        self.reset()
+        for ts, seconds in target.items():
+            rate = reader.rate(ts)
+            if rate is not None:
+                self._apply(rate, 0.0, seconds)
+                self.members[ts] = seconds
+        self.end = end
+        return len(target)
+
+    def _apply(self, rate: np.ndarray, old: float, new: float) -> None:
+        valid = ~np.isnan(rate)
+        self.sum[valid] += rate[valid].astype(np.float64) * ((new - old) / 3600)
+        if not old and new:
+            self.count[valid] += 1
+        elif old and not new:
+            self.count[valid] -= 1
+
+    @property
+    def data(self) -> np.ndarray:
+        """
+        Accumulated mm as float32, NaN where no scan had data.
+        """
+        return np.where(self.count > 0, np.maximum(self.sum, 0), np.nan).astype(np.float32)
+
+
+@contextmanager
+def accumulation_lock(root: str):
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def advance_accumulations(cube: DataCube, root: str, hours_list: list[int], until: datetime):
+    """
+    Steps the rolling accumulations through the scans stored since their
+    last update, saving each state after every step. Fresh states start at
+    the latest scan. Callers hold accumulation_lock().
+
+    Yields:
+        tuple: (window end timestamp, [RollingAccumulation moved to it])
+    """
+    accumulations = [RollingAccumulation(root, hours, cube.grid).load() for hours in hours_list]
+    if not accumulations:
+        return
+
+    ends = [acc.end for acc in accumulations if acc.end is not None]
+    since = max(utc(min(ends)), until - ACCUMULATION_CATCH_UP) if ends else until - ACCUMULATION_CATCH_UP
+    lookback = timedelta(hours=max(hours_list), seconds=accumulations[0].max_gap)
+    days = [day_stamps for _, day_stamps, _, _ in cube.window(since - lookback, until)]
+    if not days:
+        return
+    stamps = np.concatenate(days)
+
+    steps = stamps[stamps > since.timestamp()] if len(ends) == len(accumulations) else stamps[-1:]
+    reader = SliceReader(cube)
+    for end in steps.tolist():
+        moved = [acc for acc in accumulations if acc.end is None or end > acc.end]
+        for acc in moved:
+            acc.sync(stamps, end, reader)
+            acc.save()
+        if moved:
+            yield end, moved
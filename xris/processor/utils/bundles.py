@@ -0,0 +1,54 @@
+import os
+import hashlib
+from datetime import date
+from processor.utils.zip_archive import ZipArchive
+
+
+def catalog_signature(rows: list[tuple]) -> str:
+    """
+    Hash of a period's catalog rows (ids, paths, sizes, times), in order:
+    equal signatures mean the bundle would come out identical.
+    """
+    return hashlib.sha1(repr(rows).encode()).hexdigest()
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def bundle_name(kind: str, start: date, monthly: bool, signature: str) -> str:
+    """
+    Path (relative to the bundle root) of a bundle version. The signature is
+    part of the name, so a published file never changes.
+    """
+    stamp = f"{start:%Y%m}" if monthly else f"{start:%Y%m%d}"
+    return os.path.join(f"{start:%Y}", f"{start:%m}", f"{kind}_{stamp}_{signature[:12]}.zip")
+
+
+def write_bundle(root: str, rel_path: str, archive: ZipArchive) -> int:
+    """
+    Streams the archive to root/rel_path through a temporary file, so the
+    proxy never serves a partial bundle.
+
+    Returns:
+        int: Bundle size (bytes)
+    """
+    full_path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    tmp_path = f"{full_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as fh:
+            for chunk in archive:
+                fh.write(chunk)
+        os.replace(tmp_path, full_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return os.path.getsize(full_path)
+
+
+def remove_bundle(root: str, rel_path: str) -> None:
+    try:
+        os.remove(os.path.join(root, rel_path))
+    except FileNotFoundError:
+        pass
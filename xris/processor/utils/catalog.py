@@ -0,0 +1,119 @@
+import os
+import json
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+# Artefacts the scanner could not pair up, reported per kind
+ORPHAN_KINDS = ("unparsed", "csv_without_png", "csv_without_tiff", "png_without_csv", "tiff_without_csv")
+ORPHAN_SAMPLE_SIZE = 20
+
+
+def date_folder_watermarks(base_dir: str) -> dict:
+    """
+    Watermarks of the YYYY/MM/DD folders under a catalog directory.
+
+    Adding, removing or renaming a file bumps the mtime of its folder, so a
+    folder whose mtime is unchanged holds the same files as last time.
+
+    Returns:
+        dict: {"YYYY/MM/DD": mtime_ns}
+    """
+    watermarks = {}
+    for year in _subdirs(base_dir):
+        for month in _subdirs(year.path):
+            for day in _subdirs(month.path):
+                try:
+                    mtime_ns = day.stat().st_mtime_ns
+                except OSError:
+                    continue
+                watermarks[f"{year.name}/{month.name}/{day.name}"] = mtime_ns
+    return watermarks
+
+
+def _subdirs(path: str) -> list:
+    try:
+        with os.scandir(path) as it:
+            return sorted((e for e in it if e.is_dir(follow_symlinks=False)), key=lambda e: e.name)
+    except OSError:
+        return []
+
+
+def changed_date_folders(previous: dict, current: dict) -> set[str]:
+    """
+    Date folders that are new or were modified since the previous watermarks.
+    """
+    return {key for key, mtime_ns in current.items() if previous.get(key) != mtime_ns}
+
+
+def hold_watermarks(watermarks: dict, held: set[str]) -> dict:
+    """
+    The watermarks without the `held` folders, which the next incremental scan
+    therefore walks again: folders with files still empty (being written in
+    place), whose filling does not bump the folder mtime.
+    """
+    return {key: mtime_ns for key, mtime_ns in watermarks.items() if key not in held}
+
+
+def orphan_report() -> dict:
+    """
+    Empty orphan report: {kind: {"count": 0, "paths": []}} for ORPHAN_KINDS.
+    """
+    return {kind: {"count": 0, "paths": []} for kind in ORPHAN_KINDS}
+
+
+def add_orphans(report: dict, kind: str, paths) -> None:
+    """
+    Counts orphaned artefacts, keeping the first ORPHAN_SAMPLE_SIZE paths.
+    """
+    entry = report[kind]
+    for path in paths:
+        entry["count"] += 1
+        if len(entry["paths"]) < ORPHAN_SAMPLE_SIZE:
+            entry["paths"].append(path)
+
+
+def load_manifest(path: str) -> dict:
+    """
+    Reads the scan manifest; a missing, unreadable or outdated manifest yields
+    an empty one, which makes the next incremental scan a full one.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return {"version": MANIFEST_VERSION, "bases": {}}
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "bases": {}}
+    return manifest
+
+
+def save_manifest(watermarks: dict, path: str, full: bool = False) -> None:
+    """
+    Atomically writes the scan manifest.
+
+    Parameters:
+        watermarks (dict): {base dir name: {"YYYY/MM/DD": mtime_ns}}
+        path (str): Manifest file path.
+        full (bool): Whether the scan walked every folder.
+    """
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "scanned_at": datetime.now(timezone.utc).isoformat(),
+        "full": full,
+        "bases": watermarks,
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Cannot write catalog manifest {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -1,6 +1,14 @@
+from functools import lru_cache
 from pyproj import Proj
 from osgeo import osr
 
+
+@lru_cache(maxsize=8)
+def _utm_proj(zone: int) -> Proj:
+    # building a Proj dominates per-point conversions; reuse one per zone
+    return Proj(proj="utm", zone=zone, ellps="WGS84")
+
+
 class CoordinateSystem:
     @staticmethod
     def latlon2utm(lon: float, lat: float) -> dict:
@@ -12,8 +20,7 @@ class CoordinateSystem:
             raise ValueError("Invalid latitude or longitude")
 
         zone = int(lon // 6) + 31
-        proj = Proj(proj="utm", zone=zone, ellps="WGS84")
-        x, y = proj(lon, lat)
+        x, y = _utm_proj(zone)(lon, lat)
 
         if lat < 0:
             y += 10_000_000  # Apply false northing for southern hemisphere
@@ -21,6 +28,14 @@ class CoordinateSystem:
         epsg = 32600 + zone  # EPSG for WGS 84 / UTM zone
         return {"zone": zone, "epsg": epsg, "x": x, "y": y}
 
+    @staticmethod
+    def lonlat2zone(lon, lat, zone: int) -> tuple:
+        """
+        Projects lon/lat (scalars or arrays) into a given northern UTM zone,
+        e.g. the zone of a raster grid.
+        """
+        return _utm_proj(zone)(lon, lat)
+
     @staticmethod
     def utm2latlon(zone: int, hemisphere: str, x: float, y: float) -> dict:
         """
@@ -33,8 +48,7 @@ class CoordinateSystem:
         if hemisphere.upper() == "S":
             y -= 10_000_000
 
-        proj = Proj(proj="utm", zone=zone, ellps="WGS84")
-        lon, lat = proj(x, y, inverse=True)
+        lon, lat = _utm_proj(zone)(x, y, inverse=True)
         return {"longitude": lon, "latitude": lat}
 
     @staticmethod
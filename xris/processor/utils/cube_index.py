@@ -0,0 +1,39 @@
+import numpy as np
+
+# One int64 per datacube slice: the scan time in epoch seconds, in append order
+INDEX_DTYPE = np.dtype("<i8")
+
+
+def read_index(path: str) -> np.ndarray:
+    """
+    Timestamps of a day's slices (slice offset = position in the array).
+    """
+    try:
+        return np.fromfile(path, dtype=INDEX_DTYPE)
+    except FileNotFoundError:
+        return np.empty(0, dtype=INDEX_DTYPE)
+
+
+def append_index(path: str, timestamp: int) -> None:
+    with open(path, "ab") as fh:
+        fh.write(np.array([timestamp], dtype=INDEX_DTYPE).tobytes())
+
+
+def offset_of(times: np.ndarray, timestamp: int) -> int | None:
+    hits = np.flatnonzero(times == timestamp)
+    return int(hits[0]) if hits.size else None
+
+
+def window_offsets(times: np.ndarray, start: int, end: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Slices with start <= time <= end, in time order (scans may be appended
+    out of order by parallel workers).
+
+    Returns:
+        tuple: (slice offsets, their timestamps)
+    """
+    order = np.argsort(times, kind="stable")
+    ordered = times[order]
+    lo = np.searchsorted(ordered, start, side="left")
+    hi = np.searchsorted(ordered, end, side="right")
+    return order[lo:hi], ordered[lo:hi]
@@ -0,0 +1,336 @@
+import os
+import json
+import fcntl
+from datetime import date, datetime, timedelta
+import numpy as np
+from django.conf import settings
+from django.utils.timezone import localtime
+from processor.utils.cube_index import append_index, offset_of, read_index, window_offsets
+from processor.utils.polar2mesh import MESH_RESOLUTION, SITE_UTM_X, SITE_UTM_Y
+
+# Slices are stored as uint16 rainfall in CUBE_SCALE mm/h steps; CUBE_NODATA
+# marks cells outside the radar range (mesh value -1) or above the scale
+CUBE_DTYPE = np.dtype("<u2")
+CUBE_SCALE = 0.01
+CUBE_NODATA = 65535
+
+# Day file layout, recorded in its .json: 1 = slice-major (time, y, x), the
+# first cubes (their .json has no "layout" key); 2 = tiled, see DataCube
+CUBE_LAYOUT = 2
+
+
+def quantize(data: np.ndarray) -> np.ndarray:
+    codes = np.full(data.shape, CUBE_NODATA, dtype=CUBE_DTYPE)
+    valid = np.isfinite(data) & (data >= 0)
+    codes[valid] = np.minimum(np.rint(data[valid] / CUBE_SCALE), CUBE_NODATA - 1)
+    return codes
+
+
+def dequantize(codes: np.ndarray) -> np.ndarray:
+    """
+    Rainfall (mm/h) of stored codes, NaN where there is no data.
+    """
+    values = codes.astype(np.float32) * np.float32(CUBE_SCALE)
+    values[codes == CUBE_NODATA] = np.nan
+    return values
+
+
+def scan_durations(stamps: np.ndarray, previous: int | None = None, max_gap: int = 600) -> np.ndarray:
+    """
+    Seconds of rainfall each scan stands for: the time since the previous scan,
+    capped at `max_gap` so outages do not inflate totals.
+
+    Parameters:
+        stamps: Scan times (epoch seconds), ascending
+        previous: Time of the scan before stamps[0]; when unknown the first
+                  scan gets the median interval of the others
+        max_gap: Cap on any duration
+
+    Returns:
+        np.ndarray: float64 durations (seconds)
+    """
+    stamps = np.asarray(stamps, dtype=np.int64)
+    if stamps.size == 0:
+        return np.empty(0, dtype=np.float64)
+    gaps = np.diff(stamps).astype(np.float64)
+    if previous is not None:
+        first = float(stamps[0] - previous)
+    else:
+        first = float(np.median(gaps)) if gaps.size else float(max_gap)
+    return np.clip(np.concatenate([[first], gaps]), 0, max_gap)
+
+
+class DataCube:
+    """
+    Per-day rainfall datacubes: every interpolated mesh is stored as one time
+    slice of MEDIA_ROOT/datacube/YYYY/MM/YYYYMMDD.u16, readable with zero-copy
+    np.memmap slicing.
+
+    The day file is chunked in space so that a point's time series is one
+    contiguous run: shape (block_rows, block_cols, slots, block, block), i.e.
+    `block` x `block` cell tiles each holding all of the day's slices. It is
+    created sparse with room for `slots` slices.
+
+    Each day file has a sidecar .idx (slice timestamps, see cube_index) and a
+    .json grid description; days of an older layout are rebuilt in place by
+    upgrade() (build_datacube) or the next append, and read as missing until
+    then. All slices share one grid centred on the radar:
+    2 * radius_cells + 1 cells of MESH_RESOLUTION per side; meshes of longer
+    or shorter range are cropped or padded with CUBE_NODATA.
+    """
+
+    def __init__(self, root: str, radius_cells: int, epsg: int = 32648, slots: int = 1440, block: int = 32):
+        self.root = str(root)
+        self.radius_cells = radius_cells
+        self.epsg = epsg
+        self.slots = slots
+        self.block = block
+
+    @property
+    def grid(self) -> dict:
+        size = 2 * self.radius_cells + 1
+        half = (self.radius_cells + 0.5) * MESH_RESOLUTION
+        return {
+            "layout": CUBE_LAYOUT,
+            "rows": size,
+            "cols": size,
+            "west": SITE_UTM_X - half,
+            "north": SITE_UTM_Y + half,
+            "cellsize": MESH_RESOLUTION,
+            "epsg": self.epsg,
+            "block": self.block,
+            "slots": self.slots,
+            "dtype": CUBE_DTYPE.str,
+            "scale": CUBE_SCALE,
+            "nodata": CUBE_NODATA,
+        }
+
+    @staticmethod
+    def file_shape(grid: dict) -> tuple:
+        block = grid["block"]
+        return (-(-grid["rows"] // block), -(-grid["cols"] // block), grid["slots"], block, block)
+
+    def paths(self, day: date) -> dict:
+        base = os.path.join(self.root, f"{day:%Y}", f"{day:%m}", f"{day:%Y%m%d}")
+        return {ext: f"{base}.{ext}" for ext in ("u16", "idx", "json", "lock")}
+
+    def _rebuild(self, paths: dict, grid: dict) -> dict:
+        # converts a layout 1 day to the tiled layout (caller holds the day lock)
+        layout = grid.get("layout", 1)
+        if layout == CUBE_LAYOUT:
+            return grid
+        if layout != 1:
+            raise ValueError(f"Datacube {paths['json']} has unknown layout {layout}")
+
+        times = read_index(paths["idx"])
+        slice_bytes = grid["rows"] * grid["cols"] * CUBE_DTYPE.itemsize
+        try:
+            count = min(len(times), os.path.getsize(paths["u16"]) // slice_bytes)
+        except OSError:
+            count = 0
+
+        grid = {**grid, "layout": CUBE_LAYOUT, "block": self.block, "slots": max(self.slots, count)}
+        shape, block = self.file_shape(grid), self.block
+        tmp = {ext: f"{paths[ext]}.{os.getpid()}.tmp" for ext in ("u16", "idx", "json")}
+        try:
+            with open(tmp["u16"], "wb") as fh:
+                fh.truncate(int(np.prod(shape)) * CUBE_DTYPE.itemsize)
+            if count:
+                old = np.memmap(paths["u16"], dtype=CUBE_DTYPE, mode="r", shape=(count, grid["rows"], grid["cols"]))
+                new = np.memmap(tmp["u16"], dtype=CUBE_DTYPE, mode="r+", shape=shape)
+                tiles = np.full((shape[0] * block, shape[1] * block), CUBE_NODATA, dtype=CUBE_DTYPE)
+                for offset in range(count):
+                    tiles[:grid["rows"], :grid["cols"]] = old[offset]
+                    new[:, :, offset] = tiles.reshape(shape[0], block, shape[1], block).transpose(0, 2, 1, 3)
+                new.flush()
+                del old, new
+            # slices indexed but never written (a worker died mid-append) are dropped
+            times[:count].tofile(tmp["idx"])
+            with open(tmp["json"], "w", encoding="utf-8") as fh:
+                json.dump(grid, fh)
+            for ext in ("u16", "idx", "json"):
+                os.replace(tmp[ext], paths[ext])
+        finally:
+            for path in tmp.values():
+                if os.path.exists(path):
+                    os.remove(path)
+        return grid
+
+    def upgrade(self, day: date) -> bool:
+        """
+        Rebuilds a day stored in an older layout (append does the same before
+        writing). Meant for build_datacube, not for web requests.
+
+        Returns:
+            bool: Whether the day was rebuilt
+        """
+        paths = self.paths(day)
+        if not os.path.exists(paths["json"]):
+            return False
+        with open(paths["lock"], "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            with open(paths["json"], encoding="utf-8") as fh:
+                grid = json.load(fh)
+            if grid.get("layout", 1) == CUBE_LAYOUT:
+                return False
+            self._rebuild(paths, grid)
+        return True
+
+    def embed(self, data: np.ndarray) -> np.ndarray:
+        """
+        Quantizes a site-centred mesh onto the cube grid.
+        """
+        rows, cols = data.shape
+        if rows != cols or rows % 2 == 0:
+            raise ValueError(f"Mesh {rows}x{cols} is not centred on the radar site")
+
+        r, n = self.radius_cells, rows // 2
+        grid = np.full((2 * r + 1, 2 * r + 1), CUBE_NODATA, dtype=CUBE_DTYPE)
+        k = min(r, n)
+        grid[r - k:r + k + 1, r - k:r + k + 1] = quantize(data[n - k:n + k + 1, n - k:n + k + 1])
+        return grid
+
+    def append(self, dt: datetime, data: np.ndarray) -> int:
+        """
+        Stores a mesh as the slice of scan time `dt`, replacing the slice of a
+        reprocessed scan. Safe across worker processes (per-day file lock).
+
+        Returns:
+            int: Slice offset within the day
+        """
+        day = localtime(dt).date()
+        timestamp = int(dt.timestamp())
+        paths = self.paths(day)
+        os.makedirs(os.path.dirname(paths["u16"]), exist_ok=True)
+
+        with open(paths["lock"], "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            if os.path.exists(paths["json"]):
+                with open(paths["json"], encoding="utf-8") as fh:
+                    grid = self._rebuild(paths, json.load(fh))
+                cube = DataCube(self.root, (grid["rows"] - 1) // 2, grid["epsg"], grid["slots"], grid["block"])
+            else:
+                grid, cube = self.grid, self
+                with open(paths["u16"], "wb") as fh:
+                    fh.truncate(int(np.prod(self.file_shape(grid))) * CUBE_DTYPE.itemsize)
+                with open(paths["json"], "w", encoding="utf-8") as fh:
+                    json.dump(grid, fh)
+
+            times = read_index(paths["idx"])
+            offset = offset_of(times, timestamp)
+            if offset is None:
+                offset = len(times)
+            if offset >= grid["slots"]:
+                raise ValueError(f"Datacube {day} is full ({grid['slots']} slices)")
+
+            shape = self.file_shape(grid)
+            block = grid["block"]
+            tiles = np.full((shape[0] * block, shape[1] * block), CUBE_NODATA, dtype=CUBE_DTYPE)
+            tiles[:grid["rows"], :grid["cols"]] = cube.embed(data)
+            mm = np.memmap(paths["u16"], dtype=CUBE_DTYPE, mode="r+", shape=shape)
+            mm[:, :, offset] = tiles.reshape(shape[0], block, shape[1], block).transpose(0, 2, 1, 3)
+            mm.flush()
+            del mm
+
+            if offset == len(times):
+                append_index(paths["idx"], timestamp)
+
+        return offset
+
+    def open_day(self, day: date):
+        """
+        Read-only view of one day.
+
+        Returns:
+            tuple: (grid dict, slice timestamps, chunked np.memmap) or None
+        """
+        paths = self.paths(day)
+        try:
+            with open(paths["json"], encoding="utf-8") as fh:
+                grid = json.load(fh)
+        except FileNotFoundError:
+            return None
+        if grid.get("layout", 1) != CUBE_LAYOUT:
+            # rewriting a whole day is no job for a request: skip it until upgraded
+            return None
+
+        times = read_index(paths["idx"])
+        if len(times) == 0 or not os.path.exists(paths["u16"]):
+            return None
+        cube = np.memmap(paths["u16"], dtype=CUBE_DTYPE, mode="r", shape=self.file_shape(grid))
+        return grid, times, cube
+
+    @staticmethod
+    def slice_at(grid: dict, cube: np.ndarray, offset: int) -> np.ndarray:
+        """
+        The (rows, cols) codes of one slice, reassembled from its tiles.
+        """
+        n_by, n_bx, _, block, _ = cube.shape
+        tiles = cube[:, :, offset].transpose(0, 2, 1, 3).reshape(n_by * block, n_bx * block)
+        return tiles[:grid["rows"], :grid["cols"]]
+
+    def window(self, start: datetime, end: datetime):
+        """
+        Yields (grid, timestamps, slice offsets, memmap) for every stored day
+        overlapping [start, end], with the offsets in time order.
+        """
+        day, last = localtime(start).date(), localtime(end).date()
+        while day <= last:
+            opened = self.open_day(day)
+            if opened is not None:
+                grid, times, cube = opened
+                offsets, stamps = window_offsets(times, int(start.timestamp()), int(end.timestamp()))
+                if offsets.size:
+                    yield grid, stamps, offsets, cube
+            day += timedelta(days=1)
+
+    @staticmethod
+    def cells(grid: dict, x, y) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Grid (row, col) of projected x/y coordinates, and which of them fall
+        inside the grid.
+        """
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        finite = np.isfinite(x) & np.isfinite(y)
+        col = np.floor((np.where(finite, x, grid["west"]) - grid["west"]) / grid["cellsize"]).astype(np.int64)
+        row = np.floor((grid["north"] - np.where(finite, y, grid["north"])) / grid["cellsize"]).astype(np.int64)
+        inside = finite & (row >= 0) & (row < grid["rows"]) & (col >= 0) & (col < grid["cols"])
+        return row, col, inside
+
+    def point_series(self, x, y, start: datetime, end: datetime) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Rainfall at projected points over [start, end]: one memmap gather per
+        day for all points at once.
+
+        Parameters:
+            x, y: Projected (cube EPSG) coordinates of the points
+            start, end: Aware datetimes bounding the window
+
+        Returns:
+            tuple: (epoch-second timestamps (T,), mm/h values (T, P), NaN = no data / outside)
+        """
+        x, y = np.atleast_1d(x), np.atleast_1d(y)
+        stamps, values = [], []
+        for grid, day_stamps, offsets, cube in self.window(start, end):
+            row, col, inside = self.cells(grid, x, y)
+            codes = np.full((len(offsets), len(x)), CUBE_NODATA, dtype=CUBE_DTYPE)
+            if inside.any():
+                block = grid["block"]
+                r, c = row[inside], col[inside]
+                codes[:, inside] = cube[r // block, c // block, offsets[:, np.newaxis], r % block, c % block]
+            stamps.append(day_stamps)
+            values.append(dequantize(codes))
+
+        if not stamps:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(x)), dtype=np.float32)
+        return np.concatenate(stamps), np.concatenate(values)
+
+
+def site_cube() -> DataCube:
+    """
+    The datacube configured in settings (DATACUBE_DIR, DATACUBE_RADIUS_KM, DATACUBE_DAY_SLOTS).
+    """
+    zone = int(settings.PROCESSOR_LONGITUDE // 6) + 31
+    radius_cells = int(settings.DATACUBE_RADIUS_KM * 1000 / MESH_RESOLUTION)
+    return DataCube(settings.DATACUBE_DIR, radius_cells, epsg=32600 + zone, slots=settings.DATACUBE_DAY_SLOTS)
@@ -30,9 +30,11 @@ def has_enough_space(path, required_bytes=10 * 1024 * 1024):  # Default: 10MB
         return False
 
 
-def move_raw_files():
+def move_raw_files(filenames=None):
     """
     Move files from MEDIA_ROOT/rain-RT → MEDIA_ROOT/raw/YYYY/MM/DD/
+    Args:
+        filenames (list): only move these rain-RT files (default: all)
     """
     root = settings.MEDIA_ROOT
     src_dir = os.path.join(root, "rain-RT")
@@ -41,7 +43,7 @@ def move_raw_files():
     if not os.path.isdir(src_dir):
         return
 
-    for fn in os.listdir(src_dir):
+    for fn in (os.listdir(src_dir) if filenames is None else filenames):
         parts = fn.split("_")
         if len(parts) < 2:
             continue
@@ -1,9 +1,73 @@
-from osgeo import gdal
+from osgeo import gdal, osr
+from django.conf import settings
+import numpy as np
 import os
 
 gdal.UseExceptions()
 
 class ModGdal:
+    @staticmethod
+    def geotiff_options(profile: str | None = None) -> tuple[str, list[str]]:
+        """
+        GDAL driver and creation options of a GeoTIFF output profile.
+
+        Parameters:
+            profile (str): 'gtiff' (plain strip GeoTIFF) or 'cog' (Cloud-Optimized
+                GeoTIFF: 256x256 tiles, compression + predictor, overviews).
+                Defaults to settings.GEOTIFF_PROFILE.
+
+        Returns:
+            tuple: (driver name, creation options)
+        """
+        profile = (profile or settings.GEOTIFF_PROFILE).lower()
+        if profile == "gtiff":
+            return "GTiff", []
+        if profile != "cog":
+            raise ValueError(f"Unknown GeoTIFF profile: {profile}")
+
+        return "COG", [
+            f"COMPRESS={settings.GEOTIFF_COMPRESSION}",
+            f"LEVEL={settings.GEOTIFF_COMPRESSION_LEVEL}",
+            "PREDICTOR=YES",                # floating-point predictor for Float32
+            "BLOCKSIZE=256",
+            "OVERVIEWS=AUTO",
+            "OVERVIEW_RESAMPLING=NEAREST",  # keep rainfall classes and the -1 mask crisp
+            "NUM_THREADS=ALL_CPUS",
+            "BIGTIFF=IF_SAFER",
+        ]
+
+    @staticmethod
+    def is_cog(tiff_path: str) -> bool:
+        """
+        Whether a GeoTIFF already has the COG layout.
+        """
+        ds = gdal.Open(tiff_path)
+        try:
+            return ds.GetMetadata("IMAGE_STRUCTURE").get("LAYOUT") == "COG"
+        finally:
+            ds = None
+
+    @staticmethod
+    def tiff2cog(tiff_path: str) -> int:
+        """
+        Rewrites a GeoTIFF in place with the 'cog' profile.
+
+        Returns:
+            int: Size of the new file in bytes.
+        """
+        driver, options = ModGdal.geotiff_options("cog")
+        tmp_path = f"{tiff_path}.cog.tmp"
+        try:
+            gdal.Translate(tmp_path, tiff_path, options=gdal.TranslateOptions(
+                format=driver, creationOptions=options
+            ))
+            os.replace(tmp_path, tiff_path)
+        except RuntimeError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise RuntimeError(f"COG conversion failed: {e}")
+        return os.path.getsize(tiff_path)
+
     @staticmethod
     def ascii2tiff(epsg: int, ascii_path: str, tiff_path: str) -> None:
         """
@@ -18,9 +82,11 @@ class ModGdal:
             raise FileNotFoundError(f"Input file not found: {ascii_path}")
 
         try:
+            driver, options = ModGdal.geotiff_options()
             opts = gdal.TranslateOptions(
-                format="GTiff",
-                outputSRS=f"EPSG:{epsg}"
+                format=driver,
+                outputSRS=f"EPSG:{epsg}",
+                creationOptions=options
             )
             gdal.Translate(tiff_path, ascii_path, options=opts)
 
@@ -29,3 +95,39 @@ class ModGdal:
 
         if not os.path.exists(tiff_path):
             raise RuntimeError(f"GeoTIFF not created: {tiff_path}")
+
+    @staticmethod
+    def array2tiff(epsg: int, mesh: dict, tiff_path: str) -> None:
+        """
+        Writes an in-memory mesh to GeoTIFF through GDAL's MEM driver,
+        georeferenced like the ASCII mesh read by ascii2tiff.
+
+        Parameters:
+            epsg (int): EPSG code for the spatial reference system.
+            mesh (dict): Mesh bounds (north, south, east, west), size (rows, cols) and data.
+            tiff_path (str): Path to the GeoTIFF output file.
+        """
+        rows, cols = mesh["rows"], mesh["cols"]
+        geotransform = (
+            mesh["west"], (mesh["east"] - mesh["west"]) / cols, 0.0,
+            mesh["north"], 0.0, -(mesh["north"] - mesh["south"]) / rows,
+        )
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(epsg)
+
+        try:
+            mem_ds = gdal.GetDriverByName("MEM").Create("", cols, rows, 1, gdal.GDT_Float32)
+            mem_ds.SetGeoTransform(geotransform)
+            mem_ds.SetProjection(srs.ExportToWkt())
+            mem_ds.GetRasterBand(1).WriteArray(np.asarray(mesh["data"], dtype=np.float32))
+
+            os.makedirs(os.path.dirname(tiff_path), exist_ok=True)
+            driver, options = ModGdal.geotiff_options()
+            gdal.GetDriverByName(driver).CreateCopy(tiff_path, mem_ds, options=options)
+            mem_ds = None
+
+        except RuntimeError as e:
+            raise RuntimeError(f"GDAL write failed: {e}")
+
+        if not os.path.exists(tiff_path):
+            raise RuntimeError(f"GeoTIFF not created: {tiff_path}")
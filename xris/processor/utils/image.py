@@ -1,7 +1,48 @@
 from PIL import Image
 import numpy as np
+import io
 import os
 
+# Rainfall intensity scale (mm/h): colour i covers thresholds[i-1] <= v < thresholds[i]
+RAINFALL_THRESHOLDS = (1, 5, 10, 20, 30, 50, 80)
+RAINFALL_COLORS = (
+    (243, 243, 254),
+    (171, 213, 255),
+    (75, 151, 255),
+    (66, 91, 255),
+    (253, 249, 84),
+    (245, 164, 78),
+    (240, 77, 73),
+    (183, 54, 127),
+)
+
+PALETTES = {}
+
+
+def register_palette(name: str, thresholds, colors) -> None:
+    """
+    Registers a colour scale for the renderer.
+
+    Parameters:
+        name (str): Palette name passed to render_rgba() / ascii2img().
+        thresholds (sequence): Ascending class boundaries.
+        colors (sequence): One RGB tuple per class, len(thresholds) + 1.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    if thresholds.ndim != 1 or np.any(np.diff(thresholds) <= 0):
+        raise ValueError("Palette thresholds must be strictly ascending.")
+    if len(colors) != len(thresholds) + 1:
+        raise ValueError("Palette needs exactly one colour more than thresholds.")
+    PALETTES[name] = {"thresholds": thresholds, "colors": np.asarray(colors, dtype=np.uint8)}
+
+
+register_palette("rainfall", RAINFALL_THRESHOLDS, RAINFALL_COLORS)
+
+# Accumulated rainfall scale (mm), same colours as the intensity scale
+ACCUMULATION_THRESHOLDS = (1, 5, 10, 20, 40, 60, 100)
+register_palette("accumulation", ACCUMULATION_THRESHOLDS, RAINFALL_COLORS)
+
+
 def get_color(v: float) -> tuple[int, int, int]:
     """
     Maps a numeric value to an RGB tuple based on rainfall intensity scale.
@@ -23,30 +64,103 @@ def get_color(v: float) -> tuple[int, int, int]:
     else:
         return (183, 54, 127)
 
-def ascii2img(data: np.ndarray, png_path: str, alpha: int = 200) -> None:
+
+def palette_lut(palette: str = "rainfall", alpha: int = 200) -> np.ndarray:
+    """
+    RGBA lookup table of a palette: one row per colour class, followed by
+    the fully transparent entry used for cells <= 0.
+    """
+    colors = PALETTES[palette]["colors"]
+    lut = np.zeros((len(colors) + 1, 4), dtype=np.uint8)
+    lut[:-1, :3] = colors
+    lut[:-1, 3] = alpha
+    return lut
+
+
+def classify(data: np.ndarray, palette: str = "rainfall") -> np.ndarray:
+    """
+    Colour class of every cell; cells <= 0 get the transparent class
+    (len(colors)). NaN falls into the top class, like get_color().
     """
-    Converts a 2D NumPy array to an RGBA PNG image.
+    thresholds = PALETTES[palette]["thresholds"]
+    classes = np.digitize(data, thresholds).astype(np.uint8)
+    classes[data <= 0] = len(thresholds) + 1
+    return classes
+
+
+def render_rgba(data: np.ndarray, palette: str = "rainfall", alpha: int = 200) -> np.ndarray:
+    """
+    Colours a 2D array in one vectorized pass.
+
+    Returns:
+        np.ndarray: (rows, cols, 4) uint8 RGBA buffer.
+    """
+    if data.ndim != 2:
+        raise ValueError("Input data must be a 2D array.")
+    return palette_lut(palette, alpha)[classify(data, palette)]
+
+
+def _palette_image(indices: np.ndarray, lut: np.ndarray) -> Image.Image:
+    rows, cols = indices.shape
+    img = Image.frombuffer(
+        "P", (cols, rows), np.ascontiguousarray(indices, dtype=np.uint8).tobytes(), "raw", "P", 0, 1
+    )
+    img.putpalette(lut[:, :3].tobytes())
+    return img
+
+
+def save_palette_png(indices: np.ndarray, lut: np.ndarray, png_path: str, optimize: bool = True) -> None:
+    """
+    Writes colour indices as an indexed-colour PNG: the RGB entries of `lut`
+    become the PLTE chunk and its alpha column the tRNS chunk.
+
+    Parameters:
+        indices (np.ndarray): 2D uint8 array of rows into `lut`.
+        lut (np.ndarray): (n <= 256, 4) uint8 RGBA palette.
+        png_path (str): Output file path for the PNG image.
+        optimize (bool): Spend extra time on compression (files written once and kept).
+    """
+    img = _palette_image(indices, lut)
+
+    try:
+        os.makedirs(os.path.dirname(png_path), exist_ok=True)
+        # optimize: zlib level 9 and the smallest bit depth for the palette size
+        img.save(png_path, "PNG", optimize=optimize, transparency=lut[:, 3].tobytes())
+    except Exception as e:
+        raise IOError(f"Failed to save PNG image to {png_path}: {e}")
+
+
+def palette_png_bytes(indices: np.ndarray, lut: np.ndarray) -> bytes:
+    """
+    Encodes colour indices as an indexed-colour PNG in memory, see save_palette_png().
+    """
+    buf = io.BytesIO()
+    _palette_image(indices, lut).save(buf, "PNG", optimize=True, transparency=lut[:, 3].tobytes())
+    return buf.getvalue()
+
+
+def ascii2img(data: np.ndarray, png_path: str, alpha: int = 200, palette: str = "rainfall",
+              indexed: bool = True) -> None:
+    """
+    Converts a 2D NumPy array to a PNG image.
 
     Parameters:
         data (np.ndarray): 2D array of numeric values.
         png_path (str): Output file path for the PNG image.
         alpha (int): Alpha value for non-zero cells (0-255).
+        palette (str): Registered colour scale, see register_palette().
+        indexed (bool): Write an indexed-colour PNG (default) instead of 32-bit RGBA.
     """
     if data.ndim != 2:
         raise ValueError("Input data must be a 2D array.")
 
+    if indexed:
+        save_palette_png(classify(data, palette), palette_lut(palette, alpha), png_path)
+        return
+
+    rgba = render_rgba(data, palette, alpha)
     rows, cols = data.shape
-    img = Image.new("RGBA", (cols, rows), (0, 0, 0, 0))
-    pixels = img.load()
-
-    for y in range(rows):
-        for x in range(cols):
-            val = data[y, x]
-            if val <= 0:
-                pixels[x, y] = (0, 0, 0, 0)
-            else:
-                r, g, b = get_color(val)
-                pixels[x, y] = (r, g, b, alpha)
+    img = Image.frombuffer("RGBA", (cols, rows), rgba.tobytes(), "raw", "RGBA", 0, 1)
 
     try:
         os.makedirs(os.path.dirname(png_path), exist_ok=True)
@@ -0,0 +1,152 @@
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime, timezone
+import numpy as np
+from PIL import Image
+from processor.utils.image import PALETTES, palette_lut, save_palette_png
+
+# Bump when frame extraction or the loop encodings change: new versions and frame keys
+LOOP_VERSION = 1
+LOOP_ASSETS = {"webp": "loop.webp", "gif": "loop.gif", "strip": "strip.png"}
+
+
+def png_frame(png_path: str, size: int, palette: str = "rainfall") -> np.ndarray:
+    """
+    A scan PNG as a `size` x `size` array of palette class indices (the rows
+    of palette_lut(), the last one transparent): decoded and quantized once,
+    then cached and reused by every loop the scan appears in.
+
+    Scan PNGs are drawn from the palette, so their colours map back to the
+    classes exactly; indexed and older RGBA renderings both work.
+    """
+    with Image.open(png_path) as img:
+        rgba = np.asarray(img.convert("RGBA"))
+
+    colors = PALETTES[palette]["colors"].astype(np.uint32)
+    transparent = len(colors)
+    keys = (colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2]
+    pixels = (rgba[..., 0].astype(np.uint32) << 16) | (rgba[..., 1].astype(np.uint32) << 8) | rgba[..., 2]
+
+    order = np.argsort(keys)
+    pos = np.clip(np.searchsorted(keys[order], pixels), 0, len(keys) - 1)
+    indices = np.where(keys[order][pos] == pixels, order[pos], transparent).astype(np.uint8)
+    indices[rgba[..., 3] == 0] = transparent
+
+    return np.asarray(Image.fromarray(indices, "L").resize((size, size), Image.NEAREST))
+
+
+def png_stamp(png_path: str) -> tuple:
+    """
+    (size, mtime_ns) of a scan PNG, (None, None) when it is missing: a
+    re-rendered PNG keeps its id and path but changes its stamp.
+    """
+    try:
+        st = os.stat(png_path)
+    except OSError:
+        return None, None
+    return st.st_size, st.st_mtime_ns
+
+
+def loop_version(scans: list[tuple], size: int, frame_ms: int) -> str:
+    """
+    Content hash of a loop: its scans (id, png path, png size, png mtime_ns)
+    and encoding parameters.
+    """
+    payload = json.dumps([LOOP_VERSION, size, frame_ms, scans])
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def write_loop(root: str, version: str, frames: list[np.ndarray], times: list[datetime],
+               frame_ms: int, columns: int, palette: str = "rainfall", alpha: int = 200) -> dict:
+    """
+    Encodes cached frames as root/<version>/{loop.webp, loop.gif, strip.png}
+    plus manifest.json, and points root/latest.json at it.
+
+    The strip is a sprite sheet of `columns` frames per row (one request for
+    the whole loop); the WebP / GIF are the same frames animated. Frames are
+    already palette indices, so nothing is re-quantized.
+
+    Returns:
+        dict: The manifest
+    """
+    lut = palette_lut(palette, alpha)
+    size = frames[0].shape[0]
+    out_dir = os.path.join(root, version)
+    tmp_dir = f"{out_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    rows = -(-len(frames) // columns)
+    sheet = np.full((rows * size, columns * size), len(lut) - 1, dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        r, c = divmod(i, columns)
+        sheet[r * size:(r + 1) * size, c * size:(c + 1) * size] = frame
+    # re-encoded with every scan: default zlib effort (optimize costs ~6x for ~3%)
+    save_palette_png(sheet, lut, os.path.join(tmp_dir, LOOP_ASSETS["strip"]), optimize=False)
+
+    rgba = [Image.fromarray(lut[frame], "RGBA") for frame in frames]
+    rgba[0].save(
+        os.path.join(tmp_dir, LOOP_ASSETS["webp"]), "WEBP",
+        save_all=True, append_images=rgba[1:], duration=frame_ms, loop=0, lossless=True, method=2,
+    )
+
+    # GIF: same palette, binary transparency on the last entry
+    paletted = []
+    for frame in frames:
+        img = Image.fromarray(frame, "P")
+        img.putpalette(lut[:, :3].tobytes())
+        paletted.append(img)
+    paletted[0].save(
+        os.path.join(tmp_dir, LOOP_ASSETS["gif"]), "GIF",
+        save_all=True, append_images=paletted[1:], duration=frame_ms, loop=0,
+        transparency=len(lut) - 1, disposal=2, optimize=False,
+    )
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "frame_ms": frame_ms,
+        "frame_size": size,
+        "columns": columns,
+        "times": [t.isoformat() for t in times],
+        "sizes": {kind: os.path.getsize(os.path.join(tmp_dir, name)) for kind, name in LOOP_ASSETS.items()},
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh)
+
+    # published atomically: a version directory is complete once it exists
+    try:
+        os.rename(tmp_dir, out_dir)
+    except OSError:  # already built by a concurrent run
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    _write_json(os.path.join(root, "latest.json"), manifest)
+    return manifest
+
+
+def read_latest(root: str) -> dict | None:
+    try:
+        with open(os.path.join(root, "latest.json"), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def prune_loops(root: str, keep: int) -> int:
+    """
+    Removes all but the `keep` newest loop versions (clients may still be
+    playing the previous ones). Returns the number removed.
+    """
+    with os.scandir(root) as it:
+        versions = [e for e in it if e.is_dir(follow_symlinks=False) and not e.name.endswith(".tmp")]
+    versions.sort(key=lambda e: e.stat().st_mtime_ns, reverse=True)
+    for entry in versions[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+    return len(versions[keep:])
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh)
+    os.replace(tmp_path, path)
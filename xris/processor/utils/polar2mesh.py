@@ -0,0 +1,353 @@
+import os
+import re
+import shutil
+import hashlib
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Constants hard-coded in polar2mesh/echo_com7.f. The site coordinates are
+# REAL*4 literals in the Fortran source, so keep their single-precision value.
+SITE_UTM_X = float(np.float32(247817.59))   # UTM zone 48N easting of the radar
+SITE_UTM_Y = float(np.float32(238483.95))   # UTM zone 48N northing of the radar
+MESH_RESOLUTION = 100.0                     # output cell size (m)
+MESH_NODATA = -1.0                          # value of cells outside the radar range
+MESH_DECIMALS = 3                           # precision of the Fortran f0.3 output
+MESH_HEADER_DECIMALS = 4                    # precision of the bounds in the mesh header
+
+# The mesh side of the interpolation depends on the beam / gate geometry only
+# (not on the jittering azimuths); keep the last few tables per worker and
+# persist them as .npy, at most WEIGHT_DIR_SIZE geometries, most recently used.
+WEIGHTS_VERSION = 2
+WEIGHT_ARRAYS = ("cells", "index", "radial", "phase")
+WEIGHT_CACHE_SIZE = 4
+WEIGHT_DIR_SIZE = 8
+_WEIGHT_CACHE = {}
+
+
+class _Records:
+    """
+    Fortran list-directed reader over CSV/SSV lines: every read starts on a
+    new record, may continue over following records and drops what is left.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.pos = 0
+
+    def read(self, count: int) -> list[str]:
+        values = []
+        while len(values) < count:
+            if self.pos >= len(self.lines):
+                raise ValueError(f"Unexpected end of scan at line {self.pos + 1}")
+            values.extend(self.lines[self.pos].replace(",", " ").split())
+            self.pos += 1
+        return values[:count]
+
+
+def read_polar_scan(path: str) -> dict:
+    """
+    Reads a radar scan CSV (or the SSV produced by TranslateFormat.to_ssv)
+    the same way polar2mesh does.
+
+    Returns a dict with the header geometry (np, nr, dr, oset), the beam
+    azimuths/elevations and the rainfall matrix `xmp` of shape (nr - 1, np).
+    """
+    with open(path, "r", encoding="utf-8") as fh:
+        lines = fh.read().splitlines()
+    return parse_polar_scan(lines)
+
+
+def parse_polar_scan(lines: list[str]) -> dict:
+    """
+    Parses the lines of a radar scan, see read_polar_scan().
+    """
+    records = _Records(lines)
+    head = records.read(1)[0]
+    lat = float(records.read(1)[0])
+    lon = float(records.read(1)[0])
+    n_beams = int(float(records.read(1)[0]))
+    n_gates = int(float(records.read(1)[0]))
+    dr = float(records.read(1)[0])
+    oset = float(records.read(1)[0])
+    azi = np.array(records.read(n_beams), dtype=np.float64)
+    ele = np.array(records.read(n_beams), dtype=np.float64)
+
+    rows = [records.read(n_beams) for _ in range(n_gates - 1)]
+    xmp = np.array(rows, dtype=np.float64).reshape(n_gates - 1, n_beams)
+
+    return {
+        "head": head,
+        "lat": lat,
+        "lon": lon,
+        "np": n_beams,
+        "nr": n_gates,
+        "dr": dr,
+        "oset": oset,
+        "azi": azi,
+        "ele": ele,
+        "xmp": xmp,
+    }
+
+
+def _beam_phases(azi: np.ndarray, oset: float) -> np.ndarray:
+    """
+    Azimuth (degrees from north, clockwise) → phase (degrees from east,
+    counter-clockwise), including the radar offset correction.
+    """
+    azi = oset + azi
+    azi = np.where(azi < 0, azi + 360.0, azi)
+    azi = np.where(azi > 360.0, azi - 360.0, azi)
+    return np.where(azi <= 90.0, 90.0 - azi, 450.0 - azi)
+
+
+def geometry_key(scan: dict) -> str:
+    """
+    Identifies the geometry of the cached tables: beam and gate counts, gate
+    spacing and the mesh resolution. Azimuths and offset are applied per scan.
+    """
+    return hashlib.sha1(
+        f"{WEIGHTS_VERSION}:{scan['np']}:{scan['nr']}:{scan['dr']!r}:{MESH_RESOLUTION!r}".encode()
+    ).hexdigest()[:20]
+
+
+def beam_azimuths(scan: dict) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Beams sorted by phase (subroutine order, a stable selection sort).
+
+    Returns:
+        tuple: (beam permutation, (np + 2) sorted phases in radians padded
+               with one beam interval on both sides)
+    """
+    n_beams = scan["np"]
+    phase = _beam_phases(scan["azi"], scan["oset"])
+    order = np.argsort(phase, kind="stable")
+
+    dp = 2.0 * np.pi / n_beams
+    azi = np.empty(n_beams + 2, dtype=np.float64)
+    azi[1:n_beams + 1] = np.pi * phase[order] / 180.0
+    azi[0] = azi[1] - dp
+    azi[n_beams + 1] = azi[n_beams] + dp
+    return order, azi
+
+
+def compute_weights(scan: dict) -> dict:
+    """
+    Precomputes the mesh side of the polar → mesh mapping of echo_com7.f.
+
+    Returns:
+        dict: `cells` (flat mesh indices inside the radar range), `index`
+              (4, n) flat indices into the padded polar field, `radial` (2, n)
+              distances to the inner / outer gate and `phase` (n) of each cell.
+    """
+    n_beams, n_gates, dr = scan["np"], scan["nr"], scan["dr"]
+    reso = MESH_RESOLUTION
+    dp = 2.0 * np.pi / n_beams
+
+    # --- local Cartesian grid, rows from north to south
+    max_range = n_gates * dr
+    nod = int(max_range / reso)
+    xl = (np.arange(-nod, nod + 1) * reso)[np.newaxis, :]
+    yl = (np.arange(nod, -nod - 1, -1) * reso)[:, np.newaxis]
+    xl, yl = np.broadcast_arrays(xl, yl)
+
+    rl = np.sqrt(xl * xl + yl * yl)
+    inside = (rl <= max_range) & (rl > 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pl = np.select(
+            [
+                (xl > 0) & (yl >= 0),
+                (xl <= 0) & (yl > 0),
+                (xl < 0) & (yl <= 0),
+                (xl >= 0) & (yl < 0),
+            ],
+            [
+                np.arctan(yl / xl),
+                np.arctan(-xl / yl) + np.pi / 2.0,
+                np.arctan(yl / xl) + np.pi,
+                np.arctan(-xl / yl) + 3.0 * np.pi / 2.0,
+            ],
+        )
+
+    rl, pl = rl[inside], pl[inside]
+    ir = (rl / dr).astype(np.intp)
+    ip = (pl / dp).astype(np.intp)
+
+    stride = n_beams + 2
+    index = np.stack([
+        (ir + 1) * stride + ip + 1,
+        ir * stride + ip + 1,
+        (ir + 1) * stride + ip,
+        ir * stride + ip,
+    ]).astype(np.int32)
+
+    return {
+        "cells": np.flatnonzero(inside).astype(np.int32),
+        "index": index,
+        "radial": np.stack([rl - ir * dr, rl - (ir + 1) * dr]),
+        "phase": pl,
+    }
+
+
+def scan_weights(tables: dict, azi: np.ndarray, n_beams: int) -> np.ndarray:
+    """
+    Terms of the Fortran interpolation for the sorted beam phases `azi`, signs
+    folded in so that w0*x0 + w1*x1 + w2*x2 + w3*x3 evaluates exactly like rint.
+    """
+    ip = tables["index"][3] % (n_beams + 2)
+    inner, outer = tables["radial"]
+    lower, upper = tables["phase"] - azi[ip], tables["phase"] - azi[ip + 1]
+    return np.stack([inner * lower, -(outer * lower), -(inner * upper), outer * upper])
+
+
+def _load_weights(path: str) -> dict | None:
+    try:
+        return {name: np.load(os.path.join(path, f"{name}.npy")) for name in WEIGHT_ARRAYS}
+    except (OSError, ValueError):
+        return None
+
+
+def _prune_weights(cache_dir: str, keep: int) -> None:
+    # drops all but the `keep` most recently used geometries
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.endswith(".tmp") or not os.path.isdir(path):
+            continue
+        try:
+            entries.append((os.stat(path).st_mtime, path))
+        except OSError:
+            pass
+    for _, path in sorted(entries, reverse=True)[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _save_weights(weights: dict, path: str) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    for name in WEIGHT_ARRAYS:
+        np.save(os.path.join(tmp_path, f"{name}.npy"), weights[name])
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # another worker stored the same geometry first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def mesh_weights(scan: dict, cache_dir: str | None = None) -> dict:
+    """
+    Returns the cached tables for the scan geometry (see compute_weights),
+    from the per-process cache, the .npy files under `cache_dir`, or freshly
+    computed.
+    """
+    key = geometry_key(scan)
+    weights = _WEIGHT_CACHE.get(key)
+    if weights is not None:
+        return weights
+
+    path = os.path.join(cache_dir, key) if cache_dir else None
+    if path and os.path.isdir(path):
+        weights = _load_weights(path)
+        if weights is not None:
+            try:
+                os.utime(path)  # most recently used
+            except OSError:
+                pass
+    if weights is None:
+        weights = compute_weights(scan)
+        if path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                _save_weights(weights, path)
+                _prune_weights(cache_dir, WEIGHT_DIR_SIZE)
+            except OSError as e:
+                logger.warning(f"Cannot store polar2mesh weights in {path}: {e}")
+
+    while len(_WEIGHT_CACHE) >= WEIGHT_CACHE_SIZE:
+        _WEIGHT_CACHE.pop(next(iter(_WEIGHT_CACHE)))
+    _WEIGHT_CACHE[key] = weights
+    return weights
+
+
+def polar2mesh(scan: dict, cache_dir: str | None = None) -> dict:
+    """
+    Vectorized port of polar2mesh/echo_com7.f: interpolates a polar scan onto
+    the 100 m UTM mesh centred on the radar site.
+
+    Parameters:
+        scan (dict): Parsed scan as returned by read_polar_scan().
+        cache_dir (str): Optional directory persisting the weight tables.
+
+    Returns:
+        dict: Mesh bounds (north, south, east, west), size (rows, cols) and the
+              `data` array ordered north→south / west→east, cells outside the
+              radar range set to MESH_NODATA.
+    """
+    n_beams, n_gates, dr = scan["np"], scan["nr"], scan["dr"]
+    weights = mesh_weights(scan, cache_dir)
+    order, azi = beam_azimuths(scan)
+
+    # --- polar field padded like the Fortran COMMON array: rows 0..nr+1, beams 0..np+1
+    xmp = np.zeros((n_gates + 2, n_beams + 2), dtype=np.float64)
+    xmp[1:n_gates, 1:n_beams + 1] = scan["xmp"][:, order]
+
+    # value at the origin: sequential mean of the first gate
+    axmp0 = np.add.accumulate(xmp[1, 1:n_beams + 1])[-1] / n_beams
+    xmp[0, 1:n_beams + 1] = axmp0
+    xmp[1:n_gates + 1, 0] = xmp[1:n_gates + 1, n_beams]
+    xmp[1:n_gates + 1, n_beams + 1] = xmp[1:n_gates + 1, 1]
+
+    # --- single gather-and-multiply
+    terms = scan_weights(weights, azi, n_beams) * xmp.ravel()[weights["index"]]
+    rint = ((terms[0] + terms[1]) + terms[2]) + terms[3]
+    rint = rint / dr / (2.0 * np.pi / n_beams)
+
+    nod = int(n_gates * dr / MESH_RESOLUTION)
+    data = np.full((2 * nod + 1, 2 * nod + 1), MESH_NODATA, dtype=np.float64)
+    data.ravel()[weights["cells"]] = rint
+    data[nod, nod] = axmp0
+
+    return _mesh(n_gates, dr, np.round(data, MESH_DECIMALS))
+
+
+def _mesh(n_gates: int, dr: float, data: np.ndarray) -> dict:
+    """
+    Wraps mesh data with the GRASS ASCII header values written by polar2mesh,
+    rounded like the header so in-memory meshes georeference like mesh files.
+    """
+    utm_range = n_gates * dr + 0.5 * MESH_RESOLUTION
+    rows, cols = data.shape
+    return {
+        "north": round(SITE_UTM_Y + utm_range, MESH_HEADER_DECIMALS),
+        "south": round(SITE_UTM_Y - utm_range, MESH_HEADER_DECIMALS),
+        "east": round(SITE_UTM_X + utm_range, MESH_HEADER_DECIMALS),
+        "west": round(SITE_UTM_X - utm_range, MESH_HEADER_DECIMALS),
+        "rows": rows,
+        "cols": cols,
+        "data": data,
+    }
+
+
+def write_mesh(mesh: dict, mesh_path: str) -> None:
+    """
+    Writes a mesh in the GRASS ASCII grid layout polar2mesh produces, so it
+    can be fed to ModGdal.ascii2tiff and np.loadtxt(..., skiprows=6).
+    """
+    header = (
+        f"north: {mesh['north']:.4f}\n"
+        f"south: {mesh['south']:.4f}\n"
+        f"east: {mesh['east']:.4f}\n"
+        f"west: {mesh['west']:.4f}\n"
+        f"rows: {mesh['rows']}\n"
+        f"cols: {mesh['cols']}\n"
+    )
+    body = "\n".join(" ".join(row) for row in np.char.mod("%.3f", mesh["data"]))
+    # gfortran's f0.3 has no leading zero: 0.500 → .500, -0.250 → -.250
+    body = re.sub(r"(?<![0-9])0\.", ".", body)
+
+    with open(mesh_path, "w", encoding="utf-8") as fh:
+        fh.write(header)
+        fh.write(body)
+        fh.write("\n")
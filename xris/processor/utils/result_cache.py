@@ -0,0 +1,197 @@
+import os
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache, caches
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ("local_hits", "redis_hits", "misses")
+COUNTER_FLUSH_SECONDS = 10
+
+
+class ResultCache:
+    """
+    Two-tier cache for values derived from files that never change once
+    ingested (radar CSVs). Entries are keyed on path, size and mtime, so a
+    rewritten file is simply a new key.
+
+    Tier 1 is an in-process LRU bounded by `local_max_bytes`; tier 2 is the
+    `alias` Django cache (a Redis with maxmemory + allkeys-lru, which enforces
+    the shared byte budget). Values are stored pickled; anything larger than
+    `max_item_bytes` is returned but not cached.
+    """
+
+    def __init__(self, name: str, alias: str, local_max_bytes: int, max_item_bytes: int, timeout: int):
+        self.name = name
+        self.alias = alias
+        self.local_max_bytes = local_max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.timeout = timeout
+
+        self._local = OrderedDict()  # key → pickled value
+        self._local_bytes = 0
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(COUNTER_FIELDS, 0)
+        self._flushed_at = time.monotonic()
+
+    @staticmethod
+    def file_key(full_path: str, variant: str) -> str | None:
+        """
+        Cache key of `variant` computed from the file, or None if it is missing.
+        """
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            return None
+        digest = hashlib.sha1(f"{full_path}|{st.st_size}|{st.st_mtime_ns}".encode()).hexdigest()
+        return f"{variant}:{digest}"
+
+    def get_or_compute(self, full_path: str, variant: str, compute):
+        """
+        Returns the cached `variant` of the file, calling `compute()` on a miss.
+
+        Parameters:
+            full_path: Absolute path of the source file
+            variant: What was derived from it, including any parameters (e.g. "downsampled:100")
+            compute: Zero-argument callable producing the value
+        """
+        key = self.file_key(full_path, variant)
+        if key is None:
+            return compute()
+        return self.get_or_compute_key(key, compute)
+
+    def get_or_compute_key(self, key: str, compute):
+        """
+        Same as get_or_compute() for values keyed on their content (e.g. a geometry hash).
+        """
+        with self._lock:
+            data = self._local.get(key)
+            if data is not None:
+                self._local.move_to_end(key)
+        if data is not None:
+            self._count("local_hits")
+            return pickle.loads(data)
+
+        try:
+            data = caches[self.alias].get(key)
+        except Exception as e:  # the cache tier is optional; fall back to computing
+            logger.warning(f"Result cache '{self.alias}' unavailable: {e}")
+            data = None
+        if data is not None:
+            self._count("redis_hits")
+            self._store_local(key, data)
+            return pickle.loads(data)
+
+        self._count("misses")
+        value = compute()
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) <= self.max_item_bytes:
+            self._store_local(key, data)
+            try:
+                caches[self.alias].set(key, data, timeout=self.timeout)
+            except Exception as e:
+                logger.warning(f"Result cache '{self.alias}' unavailable: {e}")
+        return value
+
+    def _store_local(self, key: str, data: bytes) -> None:
+        if len(data) > self.local_max_bytes:
+            return
+        with self._lock:
+            if key in self._local:
+                return
+            self._local[key] = data
+            self._local_bytes += len(data)
+            while self._local_bytes > self.local_max_bytes:
+                _, evicted = self._local.popitem(last=False)
+                self._local_bytes -= len(evicted)
+
+    def _count(self, field: str) -> None:
+        # counted in-process and added to the shared counters every few seconds,
+        # so a hit costs no round trip
+        with self._lock:
+            self._counts[field] += 1
+            if time.monotonic() - self._flushed_at < COUNTER_FLUSH_SECONDS:
+                return
+            counts, self._counts = self._counts, dict.fromkeys(COUNTER_FIELDS, 0)
+            self._flushed_at = time.monotonic()
+        self._flush(counts)
+
+    def _flush(self, counts: dict) -> None:
+        for field, n in counts.items():
+            if not n:
+                continue
+            key = f"result_cache:{self.name}:{field}"
+            try:
+                if not cache.add(key, n, timeout=None):
+                    cache.incr(key, n)
+            except Exception as e:
+                logger.warning(f"Cannot update result cache counter {key}: {e}")
+
+    def stats(self) -> dict:
+        """
+        Shared hit/miss counters plus this process's local tier (admin display).
+        """
+        with self._lock:
+            counts, self._counts = self._counts, dict.fromkeys(COUNTER_FIELDS, 0)
+            self._flushed_at = time.monotonic()
+            local_entries, local_bytes = len(self._local), self._local_bytes
+        self._flush(counts)
+
+        keys = {f"result_cache:{self.name}:{field}": field for field in COUNTER_FIELDS}
+        try:
+            values = {keys[k]: v for k, v in cache.get_many(list(keys)).items()}
+        except Exception as e:
+            logger.warning(f"Cannot read result cache counters for {self.name}: {e}")
+            values = {}
+        totals = {field: int(values.get(field, 0)) for field in COUNTER_FIELDS}
+        lookups = sum(totals.values())
+        return {
+            **totals,
+            "lookups": lookups,
+            "hit_rate": round((lookups - totals["misses"]) / lookups * 100, 1) if lookups else 0.0,
+            "local_entries": local_entries,
+            "local_mb": round(local_bytes / (1024 ** 2), 2),
+            "local_max_mb": round(self.local_max_bytes / (1024 ** 2), 2),
+        }
+
+
+# Quantized radar loop frames (processor.utils.loop), shared through the tiles Redis
+frame_cache = ResultCache(
+    name="frames",
+    alias="tiles",
+    local_max_bytes=settings.RADAR_LOOP_FRAME_CACHE_LOCAL_MB * 1024 * 1024,
+    max_item_bytes=settings.ANALYSIS_CACHE_MAX_ITEM_MB * 1024 * 1024,
+    timeout=settings.TILE_CACHE_TIMEOUT,
+)
+
+# Analyses of the radar CSVs (data explorer): downsampled / quantized matrices and stats
+analysis_cache = ResultCache(
+    name="analysis",
+    alias="analysis",
+    local_max_bytes=settings.ANALYSIS_CACHE_LOCAL_MB * 1024 * 1024,
+    max_item_bytes=settings.ANALYSIS_CACHE_MAX_ITEM_MB * 1024 * 1024,
+    timeout=settings.ANALYSIS_CACHE_TIMEOUT,
+)
+
+# CRC-32s of downloaded files (processor.utils.zip_archive): tiny, one per archive member
+crc_cache = ResultCache(
+    name="crc",
+    alias="analysis",
+    local_max_bytes=settings.CRC_CACHE_LOCAL_MB * 1024 * 1024,
+    max_item_bytes=settings.ANALYSIS_CACHE_MAX_ITEM_MB * 1024 * 1024,
+    timeout=settings.ANALYSIS_CACHE_TIMEOUT,
+)
+
+# Rasterized zones of the zonal statistics (processor.utils.zonal), keyed on geometry and grid
+zone_mask_cache = ResultCache(
+    name="zone_masks",
+    alias="analysis",
+    local_max_bytes=settings.ZONE_MASK_CACHE_LOCAL_MB * 1024 * 1024,
+    max_item_bytes=settings.ANALYSIS_CACHE_MAX_ITEM_MB * 1024 * 1024,
+    timeout=settings.ANALYSIS_CACHE_TIMEOUT,
+)
@@ -0,0 +1,105 @@
+import re
+import numpy as np
+from dateutil import parser
+
+# Radar scan CSV layout: 10 header lines (scan id, lat, lon, beams, gates,
+# gate spacing, offset, azimuths, elevations, first gate) then the matrix
+HEADER_LINES = 10
+MIN_DATA_ROWS = 10
+
+
+def is_float(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def read_scan_lines(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as fh:
+        return fh.read().splitlines()
+
+
+def data_row_count(lines: list[str]) -> int:
+    """
+    Non-empty lines after the scan id line; the processor skips scans with
+    fewer than MIN_DATA_ROWS.
+    """
+    return sum(1 for ln in lines if ln.strip()) - 1
+
+
+def parse_header(lines: list[str]) -> dict:
+    """
+    Scan datetime plus the single-value header lines (lat, lon, alt).
+    """
+    metadata = {}
+    try:
+        raw_line = lines[0].strip().split(',')[0]
+        parsed_dt = parser.parse(raw_line, dayfirst=False, fuzzy=True)
+        metadata["datetime"] = parsed_dt.strftime("%Y-%m-%d %H:%M:%S")
+    except Exception:
+        metadata["datetime"] = "Unknown"
+
+    for line in lines[1:HEADER_LINES]:
+        parts = [x.strip() for x in re.split(r"[,\t]", line) if x.strip()]
+        if len(parts) == 1 and is_float(parts[0]):
+            val = float(parts[0])
+            for key in ["lat", "lon", "alt"]:
+                if key not in metadata:
+                    metadata[key] = val
+                    break
+    return metadata
+
+
+def parse_matrix(lines: list[str], fill_value: float = 0.0, fast: bool = True) -> np.ndarray:
+    """
+    Loads the matrix block (lines after the header) as a 2D float array.
+
+    Comma or tab separated; trailing separators and blank lines are ignored
+    and short rows are padded with `fill_value`. The fast path hands the block
+    to np.loadtxt (or, for ragged rows, converts all tokens at once); blocks
+    with non-numeric tokens fall back to the token-by-token reader, which drops
+    such tokens.
+
+    Raises:
+        ValueError: If the block holds no numeric data.
+    """
+    rows = [ln.strip().replace("\t", ",").rstrip(",") for ln in lines[HEADER_LINES:]]
+    rows = [row for row in rows if row]
+
+    if fast and rows:
+        try:
+            return np.loadtxt(rows, delimiter=",", comments=None, dtype=np.float64, ndmin=2)
+        except ValueError:
+            pass
+        try:
+            return _ragged_matrix(rows, fill_value)
+        except ValueError:
+            pass
+
+    return _token_matrix(rows, fill_value)
+
+
+def _ragged_matrix(rows: list[str], fill_value: float) -> np.ndarray:
+    values = np.array(",".join(rows).split(","), dtype=np.float64)
+    counts = np.array([row.count(",") + 1 for row in rows])
+    arr = np.full((len(rows), counts.max()), fill_value, dtype=np.float64)
+    arr[np.arange(arr.shape[1]) < counts[:, np.newaxis]] = values
+    return arr
+
+
+def _token_matrix(rows: list[str], fill_value: float) -> np.ndarray:
+    matrix = []
+    max_len = 0
+    for line in rows:
+        row = [float(x) for x in re.split(r"[,\t]", line) if is_float(x)]
+        if row:
+            max_len = max(max_len, len(row))
+            matrix.append(row)
+
+    if not matrix:
+        raise ValueError("No valid matrix data")
+
+    matrix = [r + [fill_value] * (max_len - len(r)) for r in matrix]
+    return np.array(matrix)
@@ -0,0 +1,115 @@
+import numpy as np
+from processor.utils.scan_csv import parse_header, parse_matrix, read_scan_lines
+
+# Rainfall classes of the data explorer (mm/h): label i covers threshold_i <= v < threshold_(i-1)
+RAINFALL_CLASSES = [
+    (80, "Extreme"),
+    (50, "Heavy"),
+    (30, "Very High"),
+    (20, "Moderate"),
+    (10, "Mild"),
+    (5,  "Light"),
+    (1,  "Very Light"),
+    (0,  "None"),
+]
+
+# Top-left block of the matrix shown in the data explorer
+PREVIEW_ROWS = 20
+PREVIEW_COLS = 50
+
+# Integer codes of a quantized matrix; the top code marks NaN cells
+QUANTIZED_DTYPES = {"uint8": np.uint8, "uint16": np.uint16}
+
+
+def read_xmpr_csv(full_path: str) -> tuple[dict, np.ndarray]:
+    """
+    Reads a radar scan CSV the way the data explorer presents it: datetime and
+    the single-value header lines as metadata, the rows from line 11 on as the
+    matrix (ragged rows padded with 0.0).
+
+    Returns:
+        tuple: (metadata dict, 2D float array)
+    """
+    lines = read_scan_lines(full_path)
+    return parse_header(lines), parse_matrix(lines)
+
+
+def matrix_statistics(arr: np.ndarray) -> dict:
+    """
+    Summary statistics of a rainfall matrix: min/max/mean/std, non-zero share,
+    the RAINFALL_CLASSES distribution (% of cells), row means and the preview block.
+    """
+    nonzero_count = int(np.count_nonzero(arr))
+    total_cells = arr.size
+
+    rain_distribution = {}
+    for i, (threshold, label) in enumerate(RAINFALL_CLASSES):
+        upper = RAINFALL_CLASSES[i - 1][0] if i > 0 else float('inf')
+        mask = (arr >= threshold) & (arr < upper)
+        rain_distribution[label] = round(np.count_nonzero(mask) / total_cells * 100, 2)
+
+    return {
+        "shape": list(arr.shape),
+        "min": float(np.min(arr)),
+        "max": float(np.max(arr)),
+        "mean": float(np.mean(arr)),
+        "std": float(np.std(arr)),
+        "nonzero_count": nonzero_count,
+        "nonzero_percent": round(nonzero_count / total_cells * 100, 2),
+        "rain_distribution": rain_distribution,
+        "row_means": np.mean(arr, axis=1).tolist(),
+        "preview": arr[:PREVIEW_ROWS, :PREVIEW_COLS].tolist(),
+    }
+
+
+def downsample_matrix(arr: np.ndarray, max_size: int) -> np.ndarray:
+    """
+    Block-averages the matrix so neither side exceeds `max_size` cells.
+
+    Parameters:
+        arr: 2D rainfall matrix
+        max_size: Largest allowed side after downsampling
+
+    Returns:
+        np.ndarray: The matrix itself when it already fits, else the block means (float32)
+    """
+    factor = -(-max(arr.shape) // max(max_size, 1))
+    if factor <= 1:
+        return arr
+
+    rows, cols = arr.shape
+    out_rows, out_cols = -(-rows // factor), -(-cols // factor)
+    padded = np.full((out_rows * factor, out_cols * factor), np.nan, dtype=np.float32)
+    padded[:rows, :cols] = arr
+    blocks = padded.reshape(out_rows, factor, out_cols, factor)
+    # every block holds at least one real cell, so nanmean never sees an empty slice
+    return np.nanmean(blocks, axis=(1, 3))
+
+
+def quantize_matrix(arr: np.ndarray, dtype: str = "uint16") -> tuple[np.ndarray, dict]:
+    """
+    Linearly maps the matrix onto unsigned integer codes: value = offset + code * scale.
+
+    Parameters:
+        arr: 2D rainfall matrix
+        dtype: "uint8" or "uint16"
+
+    Returns:
+        tuple: (code array, {"dtype", "shape", "scale", "offset", "nodata"})
+    """
+    np_dtype = QUANTIZED_DTYPES[dtype]
+    nodata = int(np.iinfo(np_dtype).max)
+    valid = np.isfinite(arr)
+    low = float(arr[valid].min()) if valid.any() else 0.0
+    high = float(arr[valid].max()) if valid.any() else 0.0
+    scale = (high - low) / (nodata - 1) or 1.0
+
+    codes = np.full(arr.shape, nodata, dtype=np_dtype)
+    codes[valid] = np.rint((arr[valid] - low) / scale).astype(np_dtype)
+    return codes, {
+        "dtype": dtype,
+        "shape": list(arr.shape),
+        "scale": scale,
+        "offset": low,
+        "nodata": nodata,
+    }
@@ -0,0 +1,67 @@
+from osgeo import gdal
+from processor.utils.image import classify, palette_lut, palette_png_bytes
+from processor.utils.polar2mesh import MESH_NODATA
+
+gdal.UseExceptions()
+
+TILE_SIZE = 256
+WEB_MERCATOR_EXTENT = 20037508.342789244  # half the EPSG:3857 world width (m)
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """
+    EPSG:3857 bounds (minx, miny, maxx, maxy) of an XYZ tile (origin top-left).
+    """
+    size = 2 * WEB_MERCATOR_EXTENT / (1 << z)
+    minx = -WEB_MERCATOR_EXTENT + x * size
+    maxy = WEB_MERCATOR_EXTENT - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+class TileCoordConverter:
+    """
+    URL converter for z/x/y that also reverses the literal {z}/{x}/{y} placeholders,
+    so the XYZ template of a scan comes straight from reverse(). Placeholders never
+    resolve: to_python rejects them and the request 404s.
+    """
+    regex = r"[0-9]+|\{[zxy]\}"
+
+    def to_python(self, value: str) -> int:
+        return int(value)
+
+    def to_url(self, value) -> str:
+        return str(value)
+
+
+def render_tile(tiff_path: str, z: int, x: int, y: int, palette: str = "rainfall", alpha: int = 200) -> bytes:
+    """
+    Renders one 256x256 Web-Mercator tile of a scan GeoTIFF with the rainfall
+    palette. GDAL reads from the COG overviews when zoomed out; cells outside
+    the radar range stay transparent.
+
+    Parameters:
+        tiff_path (str): Scan GeoTIFF (UTM mesh, -1 outside the radar range).
+        z, x, y (int): XYZ tile coordinates.
+        palette (str): Registered colour scale, see register_palette().
+        alpha (int): Alpha value of rainfall cells (0-255).
+
+    Returns:
+        bytes: Indexed-colour PNG.
+    """
+    ds = gdal.Warp(
+        "", tiff_path,
+        format="MEM",
+        dstSRS="EPSG:3857",
+        outputBounds=tile_bounds(z, x, y),
+        width=TILE_SIZE,
+        height=TILE_SIZE,
+        resampleAlg="near",
+        srcNodata=MESH_NODATA,
+        dstNodata=MESH_NODATA,
+    )
+    try:
+        data = ds.GetRasterBand(1).ReadAsArray()
+    finally:
+        ds = None
+
+    return palette_png_bytes(classify(data, palette), palette_lut(palette, alpha))
@@ -0,0 +1,132 @@
+import os
+import time
+import logging
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # non-Linux hosts: DirectoryWatcher polls instead
+    INotify = None
+
+logger = logging.getLogger(__name__)
+
+
+class SettledFiles:
+    """
+    Debounces files that are still being written: a file is ready once its
+    size and mtime have not changed for `settle_seconds`.
+    """
+
+    def __init__(self, settle_seconds: float):
+        self.settle_seconds = settle_seconds
+        self.pending = {}  # path → (size, mtime_ns, unchanged since)
+
+    def add(self, path: str) -> None:
+        if path not in self.pending:
+            self.pending[path] = (-1, -1, time.monotonic())
+
+    def ready(self) -> list[str]:
+        """
+        Returns (and forgets) the pending files that have settled; files that
+        disappeared in the meantime are dropped.
+        """
+        now = time.monotonic()
+        settled = []
+        for path, (size, mtime_ns, since) in list(self.pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self.pending[path] = (st.st_size, st.st_mtime_ns, now)
+            elif st.st_size > 0 and now - since >= self.settle_seconds:
+                settled.append(path)
+                del self.pending[path]
+        return settled
+
+
+class DirectoryWatcher:
+    """
+    Reports files created in or moved into a set of directory trees, with
+    inotify when available and by periodically listing the trees otherwise.
+
+    inotify drops events when its queue overflows, so the trees are listed
+    again on overflow and every `sweep_interval` seconds as a safety net.
+    """
+
+    def __init__(self, roots: list[str], poll_interval: float, use_inotify: bool = True,
+                 sweep_interval: float | None = None):
+        self.roots = roots
+        self.poll_interval = poll_interval
+        self.sweep_interval = sweep_interval
+        self.inotify = INotify() if use_inotify and INotify is not None else None
+        self.watches = {}  # wd → directory
+        self._swept = time.monotonic()
+        if self.inotify is not None:
+            for root in roots:
+                self._watch_tree(root)
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self.inotify is not None else "polling"
+
+    def _watch_tree(self, root: str) -> None:
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+        for dirpath, _, _ in os.walk(root):
+            try:
+                self.watches[self.inotify.add_watch(dirpath, mask)] = dirpath
+            except OSError as e:
+                logger.warning(f"Cannot watch {dirpath}: {e}")
+
+    def list_files(self) -> list[str]:
+        """
+        Every file currently under the roots (initial sweep and polling mode).
+        """
+        return [
+            os.path.join(dirpath, name)
+            for root in self.roots
+            for dirpath, _, files in os.walk(root)
+            for name in files
+        ]
+
+    def sweep(self) -> list[str]:
+        """
+        Re-watches every directory (folders created while events were lost)
+        and returns every file under the roots.
+        """
+        for root in self.roots:
+            self._watch_tree(root)
+        self._swept = time.monotonic()
+        return self.list_files()
+
+    def wait(self, timeout: float) -> list[str]:
+        """
+        Blocks for up to `timeout` seconds and returns the paths that changed.
+        """
+        if self.inotify is None:
+            time.sleep(min(timeout, self.poll_interval))
+            return self.list_files()
+
+        events = self.inotify.read(timeout=int(timeout * 1000))
+        if any(event.mask & flags.Q_OVERFLOW for event in events):
+            logger.warning("inotify queue overflowed, re-listing the watched trees")
+            return self.sweep()
+        if self.sweep_interval and time.monotonic() - self._swept >= self.sweep_interval:
+            return self.sweep()
+
+        paths = []
+        for event in events:
+            directory = self.watches.get(event.wd)
+            if directory is None or not event.name:
+                continue
+            path = os.path.join(directory, event.name)
+            if event.mask & flags.ISDIR:
+                # new date folder: watch it and pick up what already landed in it
+                self._watch_tree(path)
+                paths.extend(
+                    os.path.join(dirpath, name) for dirpath, _, files in os.walk(path) for name in files
+                )
+            else:
+                paths.append(path)
+        return paths
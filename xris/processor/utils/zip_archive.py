@@ -0,0 +1,388 @@
+import os
+import re
+import zlib
+import struct
+import hashlib
+from datetime import datetime
+from django.http import HttpResponse, StreamingHttpResponse
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+# Already compressed formats: deflating them costs CPU for ~0% gain, so they are stored
+STORED_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".tif", ".tiff", ".webp", ".gif", ".zip", ".gz"})
+READ_CHUNK = 1024 * 1024
+# Classic field limits: larger sizes, offsets and counts go to the ZIP64 records
+ZIP32_LIMIT = 0xFFFFFFFF
+ZIP32_MAX_MEMBERS = 0xFFFF
+
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")        # 30 bytes + name (+ ZIP64_EXTRA)
+DATA_DESCRIPTOR = struct.Struct("<IIII")            # 16 bytes
+CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")  # 46 bytes + name (+ ZIP64 extra)
+END_RECORD = struct.Struct("<IHHHHIIH")             # 22 bytes
+ZIP64_EXTRA = struct.Struct("<HHQQ")                # 20 bytes, local header sizes
+ZIP64_DATA_DESCRIPTOR = struct.Struct("<IIQQ")      # 24 bytes
+ZIP64_END_RECORD = struct.Struct("<IQHHIIQQQQ")     # 56 bytes
+ZIP64_END_LOCATOR = struct.Struct("<IIQI")          # 20 bytes
+
+# Bit 3: CRC and sizes follow the data (data descriptor); bit 11: UTF-8 names
+FLAGS = 0x0008 | 0x0800
+VERSION = 20
+ZIP64_VERSION = 45
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def compression_for(name: str, deflate_level: int) -> int:
+    """
+    Per-extension policy: images and other compressed formats are stored,
+    everything else (CSV) is deflated unless `deflate_level` is 0.
+    """
+    if deflate_level <= 0 or os.path.splitext(name)[1].lower() in STORED_EXTENSIONS:
+        return ZIP_STORED
+    return ZIP_DEFLATED
+
+
+def dos_datetime(dt: datetime) -> tuple[int, int]:
+    """
+    (time, date) fields of `dt` in MS-DOS format (2 s resolution, 1980+).
+    """
+    if dt.year < 1980:
+        return 0, (1 << 5) | 1
+    return (dt.hour << 11) | (dt.minute << 5) | (dt.second // 2), ((dt.year - 1980) << 9) | (dt.month << 5) | dt.day
+
+
+class ZipArchive:
+    """
+    ZIP of files on disk, streamed without temporary files or a seekable
+    output. Each member is a local header, its data and a data descriptor
+    carrying the CRC; the central directory follows. Members that may reach
+    4 GiB, offsets past it and more than 65,534 members use the ZIP64 fields
+    and end records.
+
+    Members are stored or deflated per compression_for(). When all of them
+    are stored the layout is fully determined by the member list (names,
+    sizes, timestamps): the exact length is known before a byte is read
+    (`size`) and any byte range can be produced by seeking into the member
+    files (iter_range()). Only the CRCs need the file contents; they are
+    computed while streaming and kept in `crc_cache` (a ResultCache keyed on
+    path, size and mtime), so resumed downloads do not re-read finished members.
+    """
+
+    def __init__(self, deflate_level: int = 6, crc_cache=None):
+        self.deflate_level = deflate_level
+        self.crc_cache = crc_cache
+        self.members = []  # (full path, encoded name, size, mtime ns, method, dos time, dos date)
+        self._crcs = {}  # member index → CRC-32
+
+    def add(self, full_path: str, arcname: str, date_time: datetime | None = None) -> bool:
+        """
+        Queues a file under `arcname`, stamped with `date_time` (default: its mtime).
+
+        Returns:
+            bool: False if the file is missing
+        """
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            return False
+        if date_time is None:
+            date_time = datetime.fromtimestamp(st.st_mtime)
+
+        name = arcname.encode("utf-8")
+        method = compression_for(arcname, self.deflate_level)
+        self.members.append((full_path, name, st.st_size, st.st_mtime_ns, method, *dos_datetime(date_time)))
+        return True
+
+    @staticmethod
+    def is_zip64(member: tuple) -> bool:
+        """
+        Whether a member's sizes need the ZIP64 fields, decided before its data
+        is written: deflate may grow incompressible input by a few bytes per
+        16 KiB block.
+        """
+        size, method = member[2], member[4]
+        bound = size + (size // 16384 + 1) * 5 if method == ZIP_DEFLATED else size
+        return bound >= ZIP32_LIMIT
+
+    @property
+    def seekable(self) -> bool:
+        return all(member[4] == ZIP_STORED for member in self.members)
+
+    @property
+    def size(self) -> int | None:
+        """
+        Exact archive length, or None if a member is deflated.
+        """
+        if not self.seekable:
+            return None
+        return sum(length for length, _ in self.segments())
+
+    @property
+    def etag(self) -> str:
+        """
+        Strong ETag of the archive bytes: changes with any member's name,
+        size, mtime, compression or timestamp.
+        """
+        digest = hashlib.sha1(repr((self.deflate_level, [m[1:] for m in self.members])).encode())
+        return f'"{digest.hexdigest()}"'
+
+    def crc(self, index: int) -> int:
+        """
+        CRC-32 of a member's file: from this archive's stream, the cache or
+        a read of the file.
+        """
+        if index not in self._crcs:
+            full_path, _, size = self.members[index][:3]
+
+            def compute():
+                crc = 0
+                for chunk in read_exactly(full_path, size):
+                    crc = zlib.crc32(chunk, crc)
+                return crc
+
+            self._crcs[index] = self.crc_cache.get_or_compute(full_path, "crc32", compute) if self.crc_cache else compute()
+        return self._crcs[index]
+
+    def _remember_crc(self, index: int, crc: int) -> None:
+        self._crcs[index] = crc
+        if self.crc_cache is not None:
+            self.crc_cache.get_or_compute(self.members[index][0], "crc32", lambda: crc)
+
+    @classmethod
+    def _local_header(cls, member: tuple) -> bytes:
+        _, name, _, _, method, dos_time, dos_date = member
+        if not cls.is_zip64(member):
+            return LOCAL_HEADER.pack(0x04034B50, VERSION, FLAGS, method, dos_time, dos_date, 0, 0, 0, len(name), 0) + name
+        # sizes are in the data descriptor; the extra field only marks them as 64-bit
+        return LOCAL_HEADER.pack(
+            0x04034B50, ZIP64_VERSION, FLAGS, method, dos_time, dos_date, 0,
+            ZIP32_LIMIT, ZIP32_LIMIT, len(name), ZIP64_EXTRA.size,
+        ) + name + ZIP64_EXTRA.pack(0x0001, 16, 0, 0)
+
+    @classmethod
+    def _descriptor(cls, member: tuple) -> struct.Struct:
+        return ZIP64_DATA_DESCRIPTOR if cls.is_zip64(member) else DATA_DESCRIPTOR
+
+    @classmethod
+    def _central_header(cls, member: tuple, crc: int, compressed: int, offset: int) -> bytes:
+        _, name, size, _, method, dos_time, dos_date = member
+        zip64 = cls.is_zip64(member)
+        # values that do not fit move to the ZIP64 extra field, in this order
+        wide = [size, compressed] if zip64 else []
+        if offset >= ZIP32_LIMIT:
+            wide.append(offset)
+        extra = struct.pack(f"<HH{len(wide)}Q", 0x0001, 8 * len(wide), *wide) if wide else b""
+        version = ZIP64_VERSION if wide else VERSION
+        if zip64:
+            size = compressed = ZIP32_LIMIT
+        return CENTRAL_HEADER.pack(
+            0x02014B50, version, version, FLAGS, method, dos_time, dos_date,
+            crc, compressed, size, len(name), len(extra), 0, 0, 0, 0, min(offset, ZIP32_LIMIT),
+        ) + name + extra
+
+    @classmethod
+    def _central_size(cls, member: tuple, offset: int) -> int:
+        wide = 2 * cls.is_zip64(member) + (offset >= ZIP32_LIMIT)
+        return CENTRAL_HEADER.size + len(member[1]) + (4 + 8 * wide if wide else 0)
+
+    @staticmethod
+    def _end_records(count: int, central_size: int, central_offset: int) -> bytes:
+        """
+        End of central directory record, preceded by the ZIP64 end record and
+        locator when the count, size or offset do not fit its fields.
+        """
+        end = END_RECORD.pack(
+            0x06054B50, 0, 0, min(count, ZIP32_MAX_MEMBERS), min(count, ZIP32_MAX_MEMBERS),
+            min(central_size, ZIP32_LIMIT), min(central_offset, ZIP32_LIMIT), 0,
+        )
+        if count < ZIP32_MAX_MEMBERS and central_size < ZIP32_LIMIT and central_offset < ZIP32_LIMIT:
+            return end
+        return ZIP64_END_RECORD.pack(
+            0x06064B50, ZIP64_END_RECORD.size - 12, ZIP64_VERSION, ZIP64_VERSION, 0, 0,
+            count, count, central_size, central_offset,
+        ) + ZIP64_END_LOCATOR.pack(0x07064B50, 0, central_offset + central_size, 1) + end
+
+    @staticmethod
+    def _end_size(count: int, central_size: int, central_offset: int) -> int:
+        if count < ZIP32_MAX_MEMBERS and central_size < ZIP32_LIMIT and central_offset < ZIP32_LIMIT:
+            return END_RECORD.size
+        return ZIP64_END_RECORD.size + ZIP64_END_LOCATOR.size + END_RECORD.size
+
+    def _directory(self, entries: list[tuple], central_offset: int) -> bytes:
+        """
+        Central directory and end records of (member, crc, compressed size,
+        offset) entries, the directory starting at `central_offset`.
+        """
+        central = b"".join(self._central_header(*entry) for entry in entries)
+        return central + self._end_records(len(entries), len(central), central_offset)
+
+    def __iter__(self):
+        if self.seekable:
+            yield from self.iter_range(0, self.size)
+            return
+
+        offset = 0
+        entries = []
+        for index, member in enumerate(self.members):
+            full_path, size, method = member[0], member[2], member[4]
+            header = self._local_header(member)
+            yield header
+
+            crc, written = 0, 0
+            compressor = zlib.compressobj(self.deflate_level, zlib.DEFLATED, -15) if method == ZIP_DEFLATED else None
+            for chunk in read_exactly(full_path, size):
+                crc = zlib.crc32(chunk, crc)
+                if compressor is not None:
+                    chunk = compressor.compress(chunk)
+                written += len(chunk)
+                if chunk:
+                    yield chunk
+            if compressor is not None:
+                tail = compressor.flush()
+                written += len(tail)
+                yield tail
+            self._remember_crc(index, crc)
+
+            descriptor = self._descriptor(member)
+            yield descriptor.pack(0x08074B50, crc, written, size)
+            entries.append((member, crc, written, offset))
+            offset += len(header) + written + descriptor.size
+
+        yield self._directory(entries, offset)
+
+    def segments(self):
+        """
+        The stored layout as (length, produce(lo, hi)) pieces in archive
+        order; produce yields bytes lo:hi of the piece. Headers and the
+        directory sizes need no file access, so offsets are plain sums.
+        """
+        offset = 0
+        entries = []
+        for index, member in enumerate(self.members):
+            size = member[2]
+            header = self._local_header(member)
+            descriptor = self._descriptor(member)
+            yield len(header), lambda lo, hi, header=header: [header[lo:hi]]
+            yield size, lambda lo, hi, index=index: self._read_data(index, lo, hi)
+            yield descriptor.size, lambda lo, hi, index=index, size=size, descriptor=descriptor: [
+                descriptor.pack(0x08074B50, self.crc(index), size, size)[lo:hi]
+            ]
+            entries.append((index, member, offset))
+            offset += len(header) + size + descriptor.size
+
+        central_size = sum(self._central_size(member, at) for _, member, at in entries)
+        yield central_size + self._end_size(len(entries), central_size, offset), lambda lo, hi: [
+            self._directory([(member, self.crc(index), member[2], at) for index, member, at in entries], offset)[lo:hi]
+        ]
+
+    def _read_data(self, index: int, lo: int, hi: int):
+        full_path, _, size = self.members[index][:3]
+        if lo > 0 or hi < size or index in self._crcs:
+            yield from read_exactly(full_path, hi - lo, lo)
+            return
+        # the whole member is streamed: its CRC comes for free
+        crc = 0
+        for chunk in read_exactly(full_path, size):
+            crc = zlib.crc32(chunk, crc)
+            yield chunk
+        self._remember_crc(index, crc)
+
+    def iter_range(self, start: int, stop: int):
+        """
+        Yields archive bytes [start, stop) of a stored (seekable) archive,
+        reading only the member files the range covers.
+        """
+        if not self.seekable:
+            raise ValueError("Byte ranges need an archive of stored members")
+        offset = 0
+        for length, produce in self.segments():
+            lo, hi = max(start - offset, 0), min(stop - offset, length)
+            if lo < hi:
+                for chunk in produce(lo, hi):
+                    if chunk:
+                        yield chunk
+            offset += length
+            if offset >= stop:
+                return
+
+
+def read_exactly(full_path: str, size: int, start: int = 0):
+    """
+    Yields `size` bytes of the file from `start` in READ_CHUNK pieces; a file
+    that shrank since it was sized raises OSError (the lengths are already
+    promised to the client).
+    """
+    with open(full_path, "rb") as fh:
+        fh.seek(start)
+        remaining = size
+        while remaining:
+            chunk = fh.read(min(READ_CHUNK, remaining))
+            if not chunk:
+                raise OSError(f"{full_path} is shorter than its {size} bytes")
+            remaining -= len(chunk)
+            yield chunk
+
+
+def parse_range(header: str, size: int):
+    """
+    (start, stop) of a single-range "bytes=" header against `size` bytes.
+
+    Returns:
+        tuple | None | bool: The range, None to ignore the header (absent,
+                             malformed or multi-range) or False if unsatisfiable
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:  # suffix: the last N bytes
+        n = int(last)
+        return (max(size - n, 0), size) if n else False
+    start = int(first)
+    stop = min(int(last) + 1, size) if last else size
+    if last and int(last) < start:
+        return None
+    return (start, stop) if start < size else False
+
+
+def archive_response(request, archive: ZipArchive, filename: str, on_start=None):
+    """
+    Streams the archive as an attachment. Stored archives carry
+    Content-Length and an ETag and answer Range / If-Range with 206, so
+    interrupted downloads resume; `on_start` runs only for responses that
+    begin at byte 0 (download logging).
+    """
+    size = archive.size
+    byte_range = None
+    if size is not None and request.method in ("GET", "HEAD"):
+        if_range = request.headers.get("If-Range")
+        if not if_range or if_range == archive.etag:
+            byte_range = parse_range(request.headers.get("Range", ""), size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    def stream():
+        if request.method == "HEAD":
+            return
+        if byte_range is None or byte_range[0] == 0:
+            if on_start is not None:
+                on_start()
+        if byte_range is None:
+            yield from archive
+        else:
+            yield from archive.iter_range(*byte_range)
+
+    response = StreamingHttpResponse(stream(), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    if size is not None:
+        response["Accept-Ranges"] = "bytes"
+        response["ETag"] = archive.etag
+        if byte_range is None:
+            response["Content-Length"] = size
+        else:
+            response.status_code = 206
+            response["Content-Range"] = f"bytes {byte_range[0]}-{byte_range[1] - 1}/{size}"
+            response["Content-Length"] = byte_range[1] - byte_range[0]
+    return response
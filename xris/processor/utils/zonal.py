@@ -0,0 +1,201 @@
+import json
+import hashlib
+from datetime import datetime
+import numpy as np
+from processor.utils.coordinates import CoordinateSystem
+from processor.utils.datacube import CUBE_NODATA, CUBE_SCALE, DataCube, scan_durations
+from processor.utils.result_cache import zone_mask_cache
+
+# Cells × scans gathered from the datacube at once
+ZONAL_BATCH_VALUES = 8_000_000
+# Cells per zone-weight matrix (zones × cells float32)
+ZONAL_CHUNK_CELLS = 65_536
+
+
+def geojson_zones(geojson: dict) -> list[dict]:
+    """
+    Splits a GeoJSON Geometry, Feature or FeatureCollection into zones.
+
+    Returns:
+        list: {"id", "geometry"} per (Multi)Polygon; ids come from the feature
+              id, its "id"/"name" property or its position
+    """
+    if geojson.get("type") == "FeatureCollection":
+        features = geojson.get("features") or []
+    elif geojson.get("type") == "Feature":
+        features = [geojson]
+    else:
+        features = [{"type": "Feature", "geometry": geojson, "properties": {}}]
+
+    zones = []
+    for i, feature in enumerate(features):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") not in ("Polygon", "MultiPolygon"):
+            raise ValueError(f"Zone {i}: only Polygon and MultiPolygon geometries are supported")
+        props = feature.get("properties") or {}
+        zone_id = feature.get("id", props.get("id", props.get("name", i)))
+        zones.append({"id": zone_id, "geometry": geometry})
+    return zones
+
+
+def geometry_rings(geometry: dict) -> list[np.ndarray]:
+    polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+    rings = [np.asarray(ring, dtype=np.float64)[:, :2] for polygon in polygons for ring in polygon]
+    if not rings or any(len(ring) < 3 for ring in rings):
+        raise ValueError("Polygon rings need at least 3 positions")
+    for ring in rings:
+        lon, lat = ring[:, 0], ring[:, 1]
+        # out-of-range positions would project to inf
+        if not (np.isfinite(ring).all() and (np.abs(lon) <= 180).all() and (np.abs(lat) <= 90).all()):
+            raise ValueError("Positions must be lon/lat within [-180, 180] / [-90, 90]")
+    return rings
+
+
+def rasterize(rings: list[np.ndarray], grid: dict) -> np.ndarray:
+    """
+    Flat indices of the grid cells whose centre lies inside the rings
+    (even-odd rule, so holes and multipolygons need no special casing).
+
+    Parameters:
+        rings: Rings as (n, 2) arrays of grid x/y coordinates
+        grid: Datacube grid (rows, cols, west, north, cellsize)
+    """
+    edges = np.concatenate([np.column_stack([ring, np.roll(ring, -1, axis=0)]) for ring in rings])
+    x0, y0, x1, y1 = edges.T
+    cell, rows, cols = grid["cellsize"], grid["rows"], grid["cols"]
+
+    # only the rows the polygon spans
+    r_first = max(int(np.floor((grid["north"] - edges[:, [1, 3]].max()) / cell - 0.5)), 0)
+    r_last = min(int(np.ceil((grid["north"] - edges[:, [1, 3]].min()) / cell - 0.5)), rows - 1)
+
+    indices = []
+    for r in range(r_first, r_last + 1):
+        yc = grid["north"] - (r + 0.5) * cell
+        crossing = (y0 <= yc) != (y1 <= yc)
+        if not crossing.any():
+            continue
+        xs = x0[crossing] + (yc - y0[crossing]) * (x1[crossing] - x0[crossing]) / (y1[crossing] - y0[crossing])
+        xs = np.sort(xs)
+        starts = np.clip(np.ceil((xs[0::2] - grid["west"]) / cell - 0.5), 0, cols).astype(np.int64)
+        stops = np.clip(np.floor((xs[1::2] - grid["west"]) / cell - 0.5) + 1, 0, cols).astype(np.int64)
+        for a, b in zip(starts, stops):
+            if a < b:
+                indices.append(np.arange(r * cols + a, r * cols + b, dtype=np.int64))
+
+    return np.unique(np.concatenate(indices)) if indices else np.empty(0, dtype=np.int64)
+
+
+def zone_mask(geometry: dict, grid: dict) -> np.ndarray:
+    """
+    rasterize() of a lon/lat geometry onto the grid, cached by the geometry
+    and grid hash so a basin is rasterized once.
+    """
+    signature = json.dumps(
+        [geometry, {k: grid[k] for k in ("rows", "cols", "west", "north", "cellsize", "epsg")}],
+        sort_keys=True,
+    )
+    key = f"zone_mask:{hashlib.sha1(signature.encode()).hexdigest()}"
+
+    def compute():
+        zone = grid["epsg"] - 32600
+        rings = []
+        for ring in geometry_rings(geometry):
+            x, y = CoordinateSystem.lonlat2zone(ring[:, 0], ring[:, 1], zone)
+            rings.append(np.column_stack([x, y]))
+        return rasterize(rings, grid).astype(np.int32)
+
+    return zone_mask_cache.get_or_compute_key(key, compute)
+
+
+def zone_chunks(masks: list[np.ndarray]):
+    """
+    Union of the zone masks and, per chunk of union cells, the dense 0/1 zone
+    weights (zones × cells) and each zone's columns within the chunk.
+
+    Returns:
+        tuple: (union cell indices, [(start, stop, weights, columns per zone)])
+    """
+    union, member = np.unique(np.concatenate(masks), return_inverse=True)
+    bounds = np.cumsum([0] + [len(m) for m in masks])
+    # members of one zone are ascending (its mask is sorted), so a chunk's share is a slice
+    zone_cols = [member[bounds[z]:bounds[z + 1]] for z in range(len(masks))]
+
+    chunks = []
+    for a in range(0, len(union), ZONAL_CHUNK_CELLS):
+        b = min(a + ZONAL_CHUNK_CELLS, len(union))
+        weights = np.zeros((len(masks), b - a), dtype=np.float32)
+        columns = []
+        for z, cols in enumerate(zone_cols):
+            lo, hi = np.searchsorted(cols, [a, b])
+            columns.append(cols[lo:hi] - a)
+            weights[z, columns[-1]] = 1
+        chunks.append((a, b, weights, columns))
+    return union, chunks
+
+
+def zonal_series(cube: DataCube, geometries: list[dict], start: datetime, end: datetime) -> dict:
+    """
+    Per-scan mean / max / wet coverage of every zone and its accumulated depth
+    over [start, end]. Each batch of scans is gathered once for the union of
+    all zones; sums and counts are zone-weight matrix products.
+
+    Returns:
+        dict: "stamps" (T,), "cells" (Z,), "mean"/"max"/"coverage" (Z, T) with
+              NaN where a zone had no valid cells, "accumulated_mm" (Z,)
+    """
+    n_zones = len(geometries)
+    stamps, means, maxs, coverage = [], [], [], []
+    cells = np.zeros(n_zones, dtype=np.int64)
+
+    for grid, day_stamps, offsets, mm in cube.window(start, end):
+        masks = [zone_mask(geometry, grid) for geometry in geometries]
+        cells = np.array([len(m) for m in masks], dtype=np.int64)
+        n_scans = len(offsets)
+        sums = np.zeros((n_scans, n_zones), dtype=np.float32)
+        n_valid, n_wet = sums.copy(), sums.copy()
+        peak = np.zeros((n_scans, n_zones), dtype=np.uint16)
+
+        if cells.any():
+            union, chunks = zone_chunks(masks)
+            block = grid["block"]
+            row, col = union // grid["cols"], union % grid["cols"]
+            by, bx, iy, ix = row // block, col // block, row % block, col % block
+
+            step = max(1, ZONAL_BATCH_VALUES // len(union))
+            for i in range(0, n_scans, step):
+                batch = offsets[i:i + step]
+                codes = mm[by, bx, batch[:, np.newaxis], iy, ix]
+                for a, b, weights, columns in chunks:
+                    # stays in codes (nodata → 0); CUBE_SCALE is applied to the results
+                    valid = codes[:, a:b] != CUBE_NODATA
+                    filled = np.where(valid, codes[:, a:b], 0)
+                    sums[i:i + step] += filled.astype(np.float32) @ weights.T
+                    n_valid[i:i + step] += valid.astype(np.float32) @ weights.T
+                    n_wet[i:i + step] += (filled > 0).astype(np.float32) @ weights.T
+                    by_cell = np.ascontiguousarray(filled.T)
+                    for z, cols in enumerate(columns):
+                        if cols.size:
+                            np.maximum(peak[i:i + step, z], by_cell[cols].max(axis=0), out=peak[i:i + step, z])
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means.append(sums * np.float32(CUBE_SCALE) / n_valid)
+            coverage.append(n_wet / n_valid * 100)
+        maxs.append(np.where(n_valid > 0, peak * np.float32(CUBE_SCALE), np.nan).astype(np.float32))
+        stamps.append(day_stamps)
+
+    if not stamps:
+        empty = np.empty((n_zones, 0), dtype=np.float32)
+        return {"stamps": np.empty(0, dtype=np.int64), "cells": cells, "mean": empty, "max": empty,
+                "coverage": empty, "accumulated_mm": np.zeros(n_zones)}
+
+    stamps = np.concatenate(stamps)
+    mean = np.concatenate(means).T
+    hours = scan_durations(stamps) / 3600
+    return {
+        "stamps": stamps,
+        "cells": cells,
+        "mean": mean,
+        "max": np.concatenate(maxs).T,
+        "coverage": np.concatenate(coverage).T,
+        "accumulated_mm": np.nansum(mean * hours, axis=1),
+    }
@@ -1,4 +1,6 @@
 import os
+import re
+import logging
 import calendar
 from datetime import datetime
 from django.conf import settings
@@ -7,14 +9,23 @@ from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from allauth.account.decorators import verified_email_required
 from django.contrib import messages
-from django.http import StreamingHttpResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.urls import reverse
 from django.utils.http import urlencode
-from django.core.cache import cache
-import zipstream
+from django.utils.timezone import localtime
+from django.core.cache import cache, caches
+from django.views.decorators.http import etag, require_GET
 from main.models import ProjectConfig
+from datasets.models import ArchiveBundle, XmprData
 from processor.models import RainMapImage, RainMapDownloadLog
+from processor.utils.loop import LOOP_ASSETS, LOOP_VERSION, read_latest
+from processor.utils.tiles import render_tile
+from processor.utils.result_cache import crc_cache
+from processor.utils.zip_archive import ZipArchive, archive_response
 from subscriptions.models import Subscription, SubscriptionPackage
 
+logger = logging.getLogger(__name__)
+
 
 def get_client_ip(request):
     xff = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -68,6 +79,7 @@ def rainmap_data(request):
         'month_choices': month_choices,
         'max_file_count': getattr(settings, 'XMPR_MAX_FILE_COUNT', 100),
         'max_total_size': getattr(settings, 'XMPR_MAX_TOTAL_SIZE_MB', 500),
+        'bundle_groups': ArchiveBundle.groups(ArchiveBundle.KIND_RAINMAP, year, month),
         'query_string': urlencode({k: v for k, v in {
             'search': search,
             'date_from': date_from,
@@ -120,19 +132,20 @@ def download_rainmap_data(request):
         )
         return redirect('processor:rainmap_data')
 
-    # --- Zip stream generator ---
-    def zip_generator():
-        z = zipstream.ZipFile(mode='w', compression=zipstream.ZIP_DEFLATED)
-        for entry in qs:
-            if not entry.image:
-                continue
-            full_path = os.path.join(settings.MEDIA_ROOT, entry.image.name)
-            if not os.path.exists(full_path):
-                continue
-
-            arcname = f"{entry.time:%Y/%m/%d}/{os.path.basename(full_path)}"
-            z.write(full_path, arcname)
-
+    # --- ZIP layout: JPEGs are stored in time order, so the archive is sized up front and resumable ---
+    archive = ZipArchive(deflate_level=settings.DOWNLOAD_ZIP_DEFLATE_LEVEL, crc_cache=crc_cache)
+    written = []
+    for entry in qs.order_by('time', 'id'):
+        if not entry.image:
+            continue
+        full_path = os.path.join(settings.MEDIA_ROOT, entry.image.name)
+        arcname = f"{entry.time:%Y/%m/%d}/{os.path.basename(full_path)}"
+        if archive.add(full_path, arcname, localtime(entry.time)):
+            written.append(entry)
+
+    # --- Download logs (once per download, not per resumed range) ---
+    def log_downloads():
+        for entry in written:
             # Log download (avoid duplicates within 5s)
             log_key = f"rainmap_log_{user.id}_{entry.id}"
             if not cache.get(log_key):
@@ -143,9 +156,96 @@ def download_rainmap_data(request):
                 )
                 cache.set(log_key, True, timeout=5)
 
-        yield from z
-
     zip_filename = f"rainmaps_{datetime.now():%Y%m%d_%H%M%S}.zip"
-    response = StreamingHttpResponse(zip_generator(), content_type='application/zip')
-    response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
+    return archive_response(request, archive, zip_filename, on_start=log_downloads)
+
+
+# Bump when the palette or the tile rendering changes: new ETags and cache keys
+TILE_VERSION = 1
+
+
+def tile_etag(request, scan, z, x, y):
+    # scans never change once processed, so the tile address is a strong validator
+    return f"{scan}-{z}-{x}-{y}-v{TILE_VERSION}"
+
+
+@require_GET
+@etag(tile_etag)
+def radar_tile(request, scan, z, x, y):
+    """
+    XYZ Web-Mercator tile of a scan GeoTIFF rendered with the rainfall palette.
+    Rendered tiles are kept in the 'tiles' cache; browsers revalidate with the ETag.
+    """
+    if not (settings.TILE_MIN_ZOOM <= z <= settings.TILE_MAX_ZOOM) or not (0 <= x < 1 << z and 0 <= y < 1 << z):
+        raise Http404("Tile out of range")
+
+    tile_cache = caches['tiles']
+    cache_key = f"tile:v{TILE_VERSION}:{scan}:{z}:{x}:{y}"
+    try:
+        png = tile_cache.get(cache_key)
+    except Exception as e:
+        # an unreachable tile cache must not take the map down: render uncached
+        logger.warning(f"Tile cache unavailable: {e}")
+        png = None
+
+    if png is None:
+        tiff = XmprData.objects.filter(id=scan).values_list('tiff', flat=True).first()
+        full_path = os.path.join(settings.MEDIA_ROOT, tiff) if tiff else None
+        if not full_path or not os.path.isfile(full_path):
+            raise Http404("Scan not found")
+
+        png = render_tile(full_path, z, x, y)
+        try:
+            tile_cache.set(cache_key, png, timeout=settings.TILE_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Cannot cache tile {cache_key}: {e}")
+
+    response = HttpResponse(png, content_type='image/png')
+    response['Cache-Control'] = f"public, max-age={settings.TILE_BROWSER_MAX_AGE}, immutable"
     return response
+
+
+LOOP_CONTENT_TYPES = {"loop.webp": "image/webp", "loop.gif": "image/gif", "strip.png": "image/png"}
+
+
+@require_GET
+def radar_loop(request):
+    """
+    Manifest of the current radar loop (frame times, layout, asset URLs).
+    Short-lived, since it moves with every scan; the assets it names are not.
+    """
+    manifest = read_latest(settings.RADAR_LOOP_DIR)
+    if manifest is None:
+        raise Http404("No radar loop yet")
+
+    manifest["assets"] = {
+        kind: reverse('radar_loop_asset', args=[manifest["version"], name]) for kind, name in LOOP_ASSETS.items()
+    }
+    response = JsonResponse(manifest)
+    response['Cache-Control'] = f"public, max-age={settings.RADAR_LOOP_MANIFEST_MAX_AGE}"
+    return response
+
+
+def loop_asset_etag(request, version, name):
+    # a loop version is content-addressed: the URL is a strong validator
+    return f"{version}-{name}-v{LOOP_VERSION}"
+
+
+@require_GET
+@etag(loop_asset_etag)
+def radar_loop_asset(request, version, name):
+    """
+    One encoding of a loop version (animated WebP / GIF or the sprite strip),
+    cached by browsers and the CDN for a year.
+    """
+    if name not in LOOP_CONTENT_TYPES or not re.fullmatch(r"[0-9a-f]{16}", version):
+        raise Http404("Unknown loop asset")
+
+    path = os.path.join(settings.RADAR_LOOP_DIR, version, name)
+    if not os.path.isfile(path):
+        raise Http404("Loop version expired")
+
+    response = FileResponse(open(path, 'rb'), content_type=LOOP_CONTENT_TYPES[name])
+    response['Cache-Control'] = f"public, max-age={settings.TILE_BROWSER_MAX_AGE}, immutable"
+    return response
+
@@ -15,6 +15,7 @@ from pathlib import Path
 from dotenv import load_dotenv
 from datetime import timedelta
 from urllib.parse import urlparse
+from celery.schedules import crontab
 from corsheaders.defaults import default_headers
 
 # ------------------------------------------------------------------------------  
@@ -164,11 +165,32 @@ DATABASES = {
 # ------------------------------------------------------------------------------
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
+# Rendered map tiles; point at a Redis with maxmemory-policy allkeys-lru (see docker-compose 'tilecache')
+TILE_CACHE_URL = os.getenv('TILE_CACHE_URL', REDIS_URL)
+# Analysis results of the radar CSVs, second tier behind each process's LRU (docker-compose 'analysiscache')
+ANALYSIS_CACHE_URL = os.getenv('ANALYSIS_CACHE_URL', REDIS_URL)
+ANALYSIS_CACHE_LOCAL_MB = int(os.getenv('ANALYSIS_CACHE_LOCAL_MB', 64))
+ANALYSIS_CACHE_MAX_ITEM_MB = int(os.getenv('ANALYSIS_CACHE_MAX_ITEM_MB', 8))
+ANALYSIS_CACHE_TIMEOUT = int(os.getenv('ANALYSIS_CACHE_TIMEOUT', 30 * 24 * 3600))
+# Per-process LRUs of download CRC-32s and zone masks, kept apart from the analysis LRU (same Redis)
+CRC_CACHE_LOCAL_MB = int(os.getenv('CRC_CACHE_LOCAL_MB', 4))
+ZONE_MASK_CACHE_LOCAL_MB = int(os.getenv('ZONE_MASK_CACHE_LOCAL_MB', 32))
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
         'LOCATION': REDIS_URL,
-    }
+    },
+    'tiles': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': TILE_CACHE_URL,
+        'KEY_PREFIX': 'tiles',
+    },
+    'analysis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': ANALYSIS_CACHE_URL,
+        'KEY_PREFIX': 'analysis',
+    },
 }
 
 CHANNEL_LAYERS = {
@@ -191,6 +213,15 @@ MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
 # Maximum xmpr file counts and size
 XMPR_MAX_FILE_COUNT = 100
 XMPR_MAX_TOTAL_SIZE_MB = 500  # in MB
+# Bulk download ZIPs: PNG / JPEG / TIFF are always stored; CSVs are deflated at this level.
+# 0 stores everything: the archive is sized up front and resumable (Range / If-Range)
+DOWNLOAD_ZIP_DEFLATE_LEVEL = int(os.getenv('DOWNLOAD_ZIP_DEFLATE_LEVEL', 0))
+
+# Largest side (cells) of a downsampled or binary matrix returned by the analyze endpoint
+XMPR_ANALYZE_MAX_SIZE = int(os.getenv('XMPR_ANALYZE_MAX_SIZE', 600))
+# Analyze requests that would read more CSVs than this run as a Celery group the explorer polls
+XMPR_ANALYZE_INLINE_MAX = int(os.getenv('XMPR_ANALYZE_INLINE_MAX', 2))
+XMPR_ANALYZE_JOB_TIMEOUT = 3600  # seconds a job stays pollable
 
 # Lat/lon for UTM conversion  
 PROCESSOR_LATITUDE = 2.155930  
@@ -257,6 +288,89 @@ MEDIA_URL = os.getenv('MEDIA_URL', '/media/')
 MEDIA_ROOT = Path(os.getenv('MEDIA_ROOT', BASE_DIR.parent / 'RadarPagoh'))
 # Path to polar2mesh binary
 POLAR2MESH_PATH = Path(os.getenv('POLAR2MESH_PATH', BASE_DIR / 'polar2mesh/polar2mesh')) 
+# Polar → mesh interpolation: 'fortran' runs the binary above, 'numpy' runs processor.utils.polar2mesh in-process
+POLAR2MESH_ENGINE = os.getenv('POLAR2MESH_ENGINE', 'fortran').lower()
+# Interpolation weight tables (.npy) keyed by scan geometry
+POLAR2MESH_CACHE_DIR = Path(os.getenv('POLAR2MESH_CACHE_DIR', MEDIA_ROOT / 'cache' / 'polar2mesh'))
+# Per-day (time, y, x) rainfall cubes appended by the pipeline for point / region / accumulation queries
+DATACUBE_ENABLED = os.getenv('DATACUBE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+DATACUBE_DIR = Path(os.getenv('DATACUBE_DIR', MEDIA_ROOT / 'datacube'))
+DATACUBE_RADIUS_KM = float(os.getenv('DATACUBE_RADIUS_KM', 60))
+# Slices a day file has room for (sparse until written)
+DATACUBE_DAY_SLOTS = int(os.getenv('DATACUBE_DAY_SLOTS', 1440))
+# Limits of the point time-series endpoint (datasets/timeseries/)
+TIMESERIES_MAX_POINTS = int(os.getenv('TIMESERIES_MAX_POINTS', 100))
+TIMESERIES_MAX_DAYS = int(os.getenv('TIMESERIES_MAX_DAYS', 31))
+# Polygons per zonal statistics request (datasets/zonal-stats/; window limited by TIMESERIES_MAX_DAYS)
+ZONAL_MAX_ZONES = int(os.getenv('ZONAL_MAX_ZONES', 50))
+# Rolling accumulation products (windows in hours, empty disables); summed incrementally from the datacube
+ACCUMULATION_HOURS = [int(h) for h in os.getenv('ACCUMULATION_HOURS', '1,3,24').split(',') if h.strip()]
+# Running sums of the accumulation windows (products go to MEDIA_ROOT/images/accumulation)
+ACCUMULATION_STATE_DIR = Path(os.getenv('ACCUMULATION_STATE_DIR', MEDIA_ROOT / 'accumulation'))
+# Scan pipeline: 'disk' round-trips SSV/mesh files through MEDIA_ROOT/temp, 'memory' keeps the mesh array in-process
+PROCESSOR_PIPELINE = os.getenv('PROCESSOR_PIPELINE', 'disk').lower()
+# GeoTIFF output: 'gtiff' (plain strips) or 'cog' (tiled, compressed, with overviews)
+GEOTIFF_PROFILE = os.getenv('GEOTIFF_PROFILE', 'gtiff').lower()
+GEOTIFF_COMPRESSION = os.getenv('GEOTIFF_COMPRESSION', 'DEFLATE').upper()  # or ZSTD
+GEOTIFF_COMPRESSION_LEVEL = int(os.getenv('GEOTIFF_COMPRESSION_LEVEL', 6))
+# Radar tile endpoint (/tiles/<scan>/<z>/<x>/<y>.png)
+TILE_MIN_ZOOM = int(os.getenv('TILE_MIN_ZOOM', 5))
+TILE_MAX_ZOOM = int(os.getenv('TILE_MAX_ZOOM', 12))
+TILE_CACHE_TIMEOUT = int(os.getenv('TILE_CACHE_TIMEOUT', 7 * 24 * 3600))
+TILE_BROWSER_MAX_AGE = 365 * 24 * 3600
+# Animated loop of the latest scans (/loops/latest.json → immutable /loops/<version>/loop.webp|loop.gif|strip.png)
+RADAR_LOOP_FRAMES = int(os.getenv('RADAR_LOOP_FRAMES', 24))
+RADAR_LOOP_FRAME_SIZE = int(os.getenv('RADAR_LOOP_FRAME_SIZE', 480))  # px per side
+RADAR_LOOP_FRAME_MS = int(os.getenv('RADAR_LOOP_FRAME_MS', 250))
+RADAR_LOOP_COLUMNS = int(os.getenv('RADAR_LOOP_COLUMNS', 6))  # frames per row of the sprite strip
+RADAR_LOOP_DIR = Path(os.getenv('RADAR_LOOP_DIR', MEDIA_ROOT / 'loops'))
+RADAR_LOOP_KEEP = int(os.getenv('RADAR_LOOP_KEEP', 3))  # versions kept for clients still playing them
+RADAR_LOOP_MANIFEST_MAX_AGE = int(os.getenv('RADAR_LOOP_MANIFEST_MAX_AGE', 30))
+# Per-process LRU of quantized loop frames, in front of the tiles Redis
+RADAR_LOOP_FRAME_CACHE_LOCAL_MB = int(os.getenv('RADAR_LOOP_FRAME_CACHE_LOCAL_MB', 32))
+# Prebuilt per-day / per-month archive bundles, rebuilt nightly for the days whose catalog changed
+BUNDLE_DIR = Path(os.getenv('BUNDLE_DIR', MEDIA_ROOT / 'bundles'))
+BUNDLE_LOOKBACK_DAYS = int(os.getenv('BUNDLE_LOOKBACK_DAYS', 40))
+BUNDLE_MONTHLY = os.getenv('BUNDLE_MONTHLY', 'True').lower() in ('true', '1', 'yes')  # complete months only
+BUNDLE_BUILD_HOUR = int(os.getenv('BUNDLE_BUILD_HOUR', 2))
+# Internal proxy location mapped to BUNDLE_DIR (e.g. nginx 'internal' alias): bundles are then
+# sent with X-Accel-Redirect; empty streams them from Django (development)
+BUNDLE_ACCEL_REDIRECT = os.getenv('BUNDLE_ACCEL_REDIRECT', '')
+# CSVs per process_csv_batch subtask of the move_and_process_files chord
+PROCESSOR_BATCH_SIZE = int(os.getenv('PROCESSOR_BATCH_SIZE', 8))
+# How long a dispatched CSV stays claimed before another run may pick it up (s)
+PROCESSOR_CLAIM_TIMEOUT = int(os.getenv('PROCESSOR_CLAIM_TIMEOUT', 30 * 60))
+
+# Catalog scanner: only walk date folders changed since the last scan (watermarks in the manifest)
+CATALOG_INCREMENTAL = os.getenv('CATALOG_INCREMENTAL', 'True').lower() in ('true', '1', 'yes')
+CATALOG_MANIFEST_PATH = Path(os.getenv('CATALOG_MANIFEST_PATH', MEDIA_ROOT / 'cache' / 'catalog_manifest.json'))
+# Rows per bulk INSERT of the catalog scanner
+CATALOG_BULK_BATCH_SIZE = int(os.getenv('CATALOG_BULK_BATCH_SIZE', 500))
+
+# Ingestion daemon (manage.py watch_rain_rt)
+XMPR_WATCH_SETTLE_SECONDS = float(os.getenv('XMPR_WATCH_SETTLE_SECONDS', 2))
+XMPR_WATCH_POLL_INTERVAL = float(os.getenv('XMPR_WATCH_POLL_INTERVAL', 5))
+# inotify mode re-lists the trees every N poll intervals, in case events were dropped
+XMPR_WATCH_SWEEP_INTERVALS = int(os.getenv('XMPR_WATCH_SWEEP_INTERVALS', 12))
+# Let page views kick off the pipeline; turn off when the ingestion daemon runs
+XMPR_TRIGGER_ON_REQUEST = os.getenv('XMPR_TRIGGER_ON_REQUEST', 'True').lower() in ('true', '1', 'yes')
+
+# Celery (read by xris/celery.py with the CELERY_ namespace)
+# Chords need a result backend; django_celery_results stores them in the DB
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'django-db')
+CELERY_RESULT_EXTENDED = True
+# Worker processes per node (default: number of CPUs)
+CELERY_WORKER_CONCURRENCY = int(os.getenv('CELERY_WORKER_CONCURRENCY') or 0) or None  # empty = default
+# Long-running scan tasks: don't let one worker hoard queued batches
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
+# Synced into django_celery_beat's periodic tasks by the beat service (--scheduler django)
+CELERY_BEAT_SCHEDULE = {
+    'build-archive-bundles': {
+        'task': 'processor.tasks.build_archive_bundles',
+        'schedule': crontab(hour=BUNDLE_BUILD_HOUR, minute=15),
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -15,11 +15,15 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, register_converter
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.decorators.csrf import csrf_exempt
 from graphene_django.views import GraphQLView
+from processor.views import radar_loop, radar_loop_asset, radar_tile
+from processor.utils.tiles import TileCoordConverter
+
+register_converter(TileCoordConverter, 'tile')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -29,6 +33,9 @@ urlpatterns = [
     path('subscriptions/', include('subscriptions.urls')),
     path('accounts/', include('allauth.urls')),
     path("graphql", csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path('tiles/<int:scan>/<tile:z>/<tile:x>/<tile:y>.png', radar_tile, name='radar_tile'),
+    path('loops/latest.json', radar_loop, name='radar_loop'),
+    path('loops/<str:version>/<str:name>', radar_loop_asset, name='radar_loop_asset'),
 ]
 
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)